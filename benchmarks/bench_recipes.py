@@ -0,0 +1,237 @@
+"""
+End-to-end benchmark of the recipes on the instructor impl, backed by `fake_llm.FakeLLM`.
+
+    python benchmarks/bench_recipes.py --recipes inferred questions --sizes 50 200 \
+        --concurrency 10 50 --latency lognormal:0.05,0.5 --baseline results/previous.json
+
+Every (recipe, size, concurrency) case runs in a fresh process, so peak RSS is the case's own.
+Results are written to `benchmarks/results/<timestamp>.json`; with `--baseline`, cases that are
+slower or bigger than in a previous results file by more than `--threshold` are reported.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
+
+RECIPES = ("inferred", "reasoned", "questions", "inverted")
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Lower is better for all compared metrics except throughput
+COMPARED = {"examples_per_second": -1, "p50_latency": 1, "p99_latency": 1, "peak_rss_mb": 1}
+
+
+def dataset(size: int) -> list[Any]:
+    from hypellm import Example
+
+    return [
+        Example(
+            inputs=f"Patient {i} presents with symptom {i % 17} and lab result {i * 7 % 101}.",
+            outputs=f"diagnosis_{i % 5}",
+        )
+        for i in range(size)
+    ]
+
+
+class LoopLag:
+    """Measures how late the event loop wakes up a task sleeping in short intervals."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags: list[float] = []
+
+    async def run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - start - self.interval))
+
+
+async def run_recipe(recipe: str, data: list[Any], concurrency: int):
+    from hypellm import recipes
+
+    if recipe == "inferred":
+        return await recipes.inferred(data, concurrency=concurrency)
+    if recipe == "reasoned":
+        return await recipes.reasoned(data, concurrency=concurrency)
+    if recipe == "questions":
+        return await recipes.questions(data, concurrency=concurrency)
+    if recipe == "inverted":
+        return await recipes.inverted(data, concurrency=concurrency)
+    raise ValueError(f"Unknown recipe {recipe!r}")
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_case(recipe: str, size: int, concurrency: int, fake_options: dict[str, Any]) -> dict:
+    """Run one case in the current process and return its measurements."""
+    os.environ.setdefault("HYPELLM_MODEL", "fake")
+    os.environ.setdefault("HYPELLM_API_KEY", "fake")
+
+    from fake_llm import FakeLLM, install
+    from hypellm import metrics, settings
+    from hypellm.metrics import percentile
+
+    fake = FakeLLM(**fake_options)
+    install(fake)
+    settings.concurrency = concurrency
+    data = dataset(size)
+
+    # Warm up imports, schemas and prompt memos, which would otherwise block the first case
+    asyncio.run(run_recipe("questions", data[:1], 1))
+
+    events = []
+    hook = metrics.add_hook(events.append)
+
+    async def main() -> float:
+        lag = LoopLag()
+        monitor = asyncio.create_task(lag.run())
+        start = time.perf_counter()
+        try:
+            await run_recipe(recipe, data, concurrency)
+        finally:
+            elapsed = time.perf_counter() - start
+            monitor.cancel()
+        case["loop_lag_p99"] = percentile(lag.lags, 0.99)
+        case["loop_lag_max"] = max(lag.lags, default=0.0)
+        return elapsed
+
+    case: dict[str, Any] = {"recipe": recipe, "size": size, "concurrency": concurrency}
+    try:
+        elapsed = asyncio.run(main())
+    finally:
+        metrics.remove_hook(hook)
+
+    latencies = [event.latency for event in events if event.error is None]
+    case.update(
+        seconds=elapsed,
+        examples_per_second=size / elapsed,
+        calls=len(events),
+        provider_calls=fake.calls,
+        errors=sum(event.error is not None for event in events),
+        retries=sum(event.rate_limit_retries + event.validation_retries for event in events),
+        p50_latency=percentile(latencies, 0.5),
+        p99_latency=percentile(latencies, 0.99),
+        mean_queue_wait=sum(event.queue_wait for event in events) / max(1, len(events)),
+        prompt_tokens=sum(event.prompt_tokens for event in events),
+        completion_tokens=sum(event.completion_tokens for event in events),
+        peak_rss_mb=peak_rss_mb(),
+    )
+    return case
+
+
+def run_isolated(recipe: str, size: int, concurrency: int, fake_options: dict[str, Any]) -> dict:
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(1, mp_context=context) as pool:
+        return pool.submit(run_case, recipe, size, concurrency, fake_options).result()
+
+
+def environment() -> dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(cases: list[dict], baseline: list[dict], threshold: float) -> list[str]:
+    """Describe every metric that regressed by more than `threshold` against `baseline`."""
+    previous = {(c["recipe"], c["size"], c["concurrency"]): c for c in baseline}
+    regressions = []
+    for case in cases:
+        before = previous.get((case["recipe"], case["size"], case["concurrency"]))
+        if before is None:
+            continue
+        for metric, sign in COMPARED.items():
+            if not before.get(metric):
+                continue
+            change = (case[metric] - before[metric]) / before[metric]
+            if sign * change > threshold:
+                regressions.append(
+                    f"{case['recipe']} size={case['size']} concurrency={case['concurrency']}: "
+                    f"{metric} {before[metric]:.3f} -> {case[metric]:.3f} ({change:+.0%})"
+                )
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--recipes", nargs="+", choices=RECIPES, default=list(RECIPES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[50, 200])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[10, 50])
+    parser.add_argument("--latency", default="lognormal:0.05,0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--prompt-tokens", type=int, default=None)
+    parser.add_argument("--completion-tokens", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    fake_options = {
+        "latency": args.latency,
+        "error_rate": args.error_rate,
+        "prompt_tokens": args.prompt_tokens,
+        "completion_tokens": args.completion_tokens,
+        "seed": args.seed,
+    }
+
+    print(
+        f"{'recipe':<10} {'size':>6} {'conc.':>6} {'ex/s':>8} {'p50 s':>7} {'p99 s':>7} "
+        f"{'lag p99':>8} {'RSS MB':>8} {'calls':>6} {'errors':>6}"
+    )
+    cases = []
+    for recipe in args.recipes:
+        for size in args.sizes:
+            for concurrency in args.concurrency:
+                case = run_isolated(recipe, size, concurrency, fake_options)
+                cases.append(case)
+                print(
+                    f"{recipe:<10} {size:>6} {concurrency:>6} "
+                    f"{case['examples_per_second']:>8.1f} {case['p50_latency']:>7.3f} "
+                    f"{case['p99_latency']:>7.3f} {case['loop_lag_p99'] * 1000:>6.1f}ms "
+                    f"{case['peak_rss_mb']:>8.1f} {case['calls']:>6} {case['errors']:>6}",
+                    flush=True,
+                )
+
+    output = args.output or RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(
+            {"environment": environment(), "fake_llm": fake_options, "cases": cases}, indent=2
+        )
+    )
+    print(f"\nWrote {output}")
+
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text())["cases"]
+        regressions = compare(cases, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
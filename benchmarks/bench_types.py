@@ -0,0 +1,36 @@
+"""
+Microbenchmark for constructing, copying and serializing examples.
+
+    python benchmarks/bench_types.py [number of examples]
+"""
+
+import sys
+import timeit
+
+from hypellm.types import Example
+
+
+def main(n: int = 100_000):
+    records = [
+        {"inputs": f"What is {i} + {i}?", "outputs": str(2 * i), "reasoning": [f"{i} + {i}"]}
+        for i in range(n)
+    ]
+    examples = Example.from_records(records)
+
+    cases = {
+        "Example(**record)": lambda: [Example(**record) for record in records],
+        "Example.model_validate": lambda: [Example.model_validate(r) for r in records],
+        "Example.from_records": lambda: Example.from_records(records),
+        "Example.trusted": lambda: [Example.trusted(**record) for record in records],
+        "update": lambda: [e.update(reasoning=["step"]) for e in examples],
+        "model_dump_json": lambda: [e.model_dump_json(exclude_none=True) for e in examples],
+        "json (cached)": lambda: [e.json() for e in examples],
+    }
+
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=1, repeat=3))
+        print(f"{name:<24} {seconds * 1e6 / n:8.2f} us/example")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
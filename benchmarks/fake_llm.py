@@ -0,0 +1,193 @@
+"""
+Deterministic stand-in for `litellm.acompletion`, for benchmarking the real instructor impl
+without a provider.
+
+Responses are tool calls synthesized from the requested response model's JSON schema, after a
+latency drawn from a seeded distribution. A share of the calls can fail with HTTP 429s, which
+go through the same rate limiter retries as real ones.
+"""
+
+import asyncio
+import json
+import math
+import random
+import sys
+from typing import Any, Optional
+
+from openai.types.chat import ChatCompletion
+
+
+class Latency:
+    """
+    A latency distribution in seconds, parsed from `<kind>:<params>`.
+
+        constant:0.2          always 0.2s
+        uniform:0.1,0.3       between 0.1s and 0.3s
+        exponential:0.2       mean of 0.2s
+        lognormal:0.2,0.5     median of 0.2s, sigma of 0.5
+    """
+
+    KINDS = {"constant": 1, "uniform": 2, "exponential": 1, "lognormal": 2}
+
+    def __init__(self, spec: str):
+        kind, _, params = spec.partition(":")
+        assert kind in self.KINDS, f"latency must be one of {', '.join(self.KINDS)}"
+        self.kind = kind
+        self.params = [float(p) for p in params.split(",")] if params else []
+        assert len(self.params) == self.KINDS[kind], f"{kind} latency takes {self.KINDS[kind]}"
+        assert all(p >= 0 for p in self.params), "latency parameters must not be negative"
+        self.spec = spec
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "constant":
+            return self.params[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        if self.kind == "exponential":
+            return rng.expovariate(1 / self.params[0]) if self.params[0] else 0.0
+        median, sigma = self.params
+        return rng.lognormvariate(math.log(median), sigma) if median else 0.0
+
+    def __repr__(self) -> str:
+        return f"Latency({self.spec!r})"
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+
+class FakeLLM:
+    """
+    Async completion function answering every call with a schema-valid tool call.
+
+    Args:
+        latency: Distribution of the time each call takes
+        error_rate: Share of calls that fail with a 429 instead of answering
+        prompt_tokens: Reported prompt tokens, estimated from the messages if None
+        completion_tokens: Reported completion tokens, estimated from the answer if None
+        list_length: Number of items in every list of the answer
+        words: Number of words in every string of the answer
+        seed: Seed of the latency, error and content draws
+    """
+
+    def __init__(
+        self,
+        latency: str = "lognormal:0.2,0.5",
+        error_rate: float = 0.0,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        list_length: int = 3,
+        words: int = 8,
+        seed: int = 0,
+    ):
+        assert 0 <= error_rate < 1, "error_rate must be between 0 and 1"
+        self.latency = Latency(latency)
+        self.error_rate = error_rate
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.list_length = list_length
+        self.words = words
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+
+    async def __call__(self, **kwargs) -> ChatCompletion:
+        self.calls += 1
+        delay = self.latency.sample(self.rng)
+        failed = self.rng.random() < self.error_rate
+        await asyncio.sleep(delay)
+        if failed:
+            self.errors += 1
+            raise FakeRateLimitError("Rate limit exceeded")
+
+        function = kwargs["tools"][0]["function"]
+        arguments = json.dumps(self.fill(function["parameters"], function["parameters"]))
+        prompt_tokens = self.prompt_tokens
+        if prompt_tokens is None:
+            prompt_tokens = len(json.dumps(kwargs["messages"])) // 4
+        completion_tokens = self.completion_tokens
+        if completion_tokens is None:
+            completion_tokens = len(arguments) // 4
+
+        return ChatCompletion.model_validate(
+            {
+                "id": f"fake-{self.calls}",
+                "object": "chat.completion",
+                "created": 0,
+                "model": kwargs.get("model") or "fake",
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {
+                            "role": "assistant",
+                            "tool_calls": [
+                                {
+                                    "id": "call",
+                                    "type": "function",
+                                    "function": {"name": function["name"], "arguments": arguments},
+                                }
+                            ],
+                        },
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        )
+
+    def fill(self, schema: dict[str, Any], root: dict[str, Any], index: int = 0) -> Any:
+        """A value matching `schema`, with `id` integers numbering the items of their list."""
+        if "$ref" in schema:
+            schema = root["$defs"][schema["$ref"].rsplit("/", 1)[-1]]
+        if "anyOf" in schema:
+            options = [option for option in schema["anyOf"] if option.get("type") != "null"]
+            return self.fill(options[0], root, index)
+
+        kind = schema.get("type", "string")
+        if kind == "object":
+            required = set(schema.get("required", ()))
+            return {
+                name: self.fill(prop, root, index)
+                for name, prop in schema.get("properties", {}).items()
+                if name in required or not self.is_nested(prop)
+            }
+        if kind == "array":
+            return [self.fill(schema.get("items", {}), root, i) for i in range(self.list_length)]
+        if kind == "integer":
+            return index
+        if kind == "number":
+            return float(index)
+        if kind == "boolean":
+            return True
+        return " ".join(f"word{self.rng.randrange(1000)}" for _ in range(self.words))
+
+    @staticmethod
+    def is_nested(schema: dict[str, Any]) -> bool:
+        """Whether an optional property holds models, which are left out to keep answers small."""
+        text = json.dumps(schema)
+        return '"$ref"' in text or '"object"' in text
+
+
+def install(fake: FakeLLM):
+    """Route the instructor impl's completions to `fake`, with caching and throttling disabled."""
+    import instructor
+
+    from hypellm import settings
+    from hypellm.metrics import on_parse_error
+
+    import hypellm.impl.instructor  # noqa: F401
+
+    base = sys.modules["hypellm.impl.instructor.base"]
+    client = instructor.from_litellm(fake.__call__, model="fake")
+    client.on("parse:error", on_parse_error)
+    base.get_client = lambda: client
+
+    settings.cache_dir = None
+    settings.journal_path = None
+    settings.requests_per_minute = None
+    settings.tokens_per_minute = None
+    settings.show_progress = False
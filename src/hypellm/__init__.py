@@ -1,10 +1,12 @@
 from .types import Example, Prompt, ReasoningSteps, IO, DataModel
 from .settings import settings
+from .store import ExampleStore
 from . import recipes
 
 __all__ = [
     "DataModel",
     "Example",
+    "ExampleStore",
     "IO",
     "Prompt",
     "ReasoningSteps",
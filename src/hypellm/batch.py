@@ -0,0 +1,332 @@
+"""
+Batch API execution: completions are collected into waves and sent as provider batch jobs.
+
+With `settings.batch_api`, the instructor impl's client sends its requests to a
+`BatchCollector` instead of `litellm.acompletion`. Requests that arrive within
+`settings.batch_window` seconds of each other are written to a JSONL request file in the
+OpenAI batch format, submitted to a `BatchService` and polled until the job is done. Each
+response is then handed back to instructor as a regular completion to be parsed and validated,
+so validation retries simply join the next wave. Multi-stage recipes run as successive waves,
+since every stage waits for the responses of the previous one.
+"""
+
+import asyncio
+import json
+import logging
+import shutil
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Optional, Protocol
+
+from hypellm.settings import settings
+
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletion
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# Arguments of a litellm call that configure the client rather than the request body
+CLIENT_ARGUMENTS = {"api_key", "api_version", "base_url", "api_base", "timeout", "max_retries"}
+
+
+class BatchService(Protocol):
+    """A provider batch API, or a stand-in for one."""
+
+    async def submit(self, requests: Path) -> str:
+        """Submit a JSONL request file and return the batch id."""
+        ...
+
+    async def status(self, batch_id: str) -> str:
+        """The batch status, e.g. "in_progress", "completed", "failed" or "expired"."""
+        ...
+
+    async def results(self, batch_id: str, path: Path):
+        """Write the JSONL output (and error) lines of a finished batch to `path`."""
+        ...
+
+
+class BatchRequestError(Exception):
+    """A request of a batch that came back with an error instead of a completion."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LiteLLMBatchService:
+    """Batch API of an OpenAI-compatible provider, through litellm's files and batches API."""
+
+    def __init__(self, custom_llm_provider: str = "openai", **kwargs: Any):
+        self.custom_llm_provider = custom_llm_provider
+        self.kwargs = kwargs
+        self.output_files: dict[str, list[str]] = {}
+
+    async def submit(self, requests: Path) -> str:
+        import litellm
+
+        with requests.open("rb") as f:
+            file = await litellm.acreate_file(
+                file=f,
+                purpose="batch",
+                custom_llm_provider=self.custom_llm_provider,
+                **self.kwargs,
+            )
+        batch = await litellm.acreate_batch(
+            completion_window="24h",
+            endpoint="/v1/chat/completions",
+            input_file_id=file.id,
+            custom_llm_provider=self.custom_llm_provider,
+            **self.kwargs,
+        )
+        return batch.id
+
+    async def status(self, batch_id: str) -> str:
+        import litellm
+
+        batch = await litellm.aretrieve_batch(
+            batch_id=batch_id, custom_llm_provider=self.custom_llm_provider, **self.kwargs
+        )
+        self.output_files[batch_id] = [
+            file_id for file_id in (batch.output_file_id, batch.error_file_id) if file_id
+        ]
+        return batch.status
+
+    async def results(self, batch_id: str, path: Path):
+        import litellm
+
+        with path.open("wb") as f:
+            for file_id in self.output_files.pop(batch_id, []):
+                content = await litellm.afile_content(
+                    file_id=file_id, custom_llm_provider=self.custom_llm_provider, **self.kwargs
+                )
+                f.write(content.content.rstrip(b"\n") + b"\n")
+
+
+class LocalBatchService:
+    """
+    File-based fake batch service, for tests and dry runs.
+
+    Each batch is a directory under `directory`. A batch completes `delay` seconds after it was
+    submitted, at which point `respond` is called with the body of each request and returns the
+    response body (a chat completion as a dict). Exceptions raised by `respond` become errors
+    of the corresponding requests.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        respond: Callable[[dict[str, Any]], dict[str, Any]],
+        delay: float = 0.0,
+    ):
+        self.directory = Path(directory)
+        self.respond = respond
+        self.delay = delay
+        self.batches: list[str] = []
+
+    async def submit(self, requests: Path) -> str:
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        batch = self.directory / batch_id
+        batch.mkdir(parents=True)
+        shutil.copy(requests, batch / "input.jsonl")
+        (batch / "status.json").write_text(
+            json.dumps({"status": "in_progress", "submitted": time.time()})
+        )
+        self.batches.append(batch_id)
+        return batch_id
+
+    async def status(self, batch_id: str) -> str:
+        batch = self.directory / batch_id
+        state = json.loads((batch / "status.json").read_text())
+        if state["status"] == "in_progress" and time.time() - state["submitted"] >= self.delay:
+            self._run(batch)
+            state["status"] = "completed"
+            (batch / "status.json").write_text(json.dumps(state))
+        return state["status"]
+
+    async def results(self, batch_id: str, path: Path):
+        shutil.copy(self.directory / batch_id / "output.jsonl", path)
+
+    def _run(self, batch: Path):
+        with (batch / "input.jsonl").open() as requests, (batch / "output.jsonl").open("w") as out:
+            for line in requests:
+                request = json.loads(line)
+                try:
+                    response = {"status_code": 200, "body": self.respond(request["body"])}
+                    error = None
+                except Exception as e:
+                    response = None
+                    error = {"code": type(e).__name__, "message": str(e)}
+                out.write(
+                    json.dumps(
+                        {"custom_id": request["custom_id"], "response": response, "error": error}
+                    )
+                    + "\n"
+                )
+
+
+class BatchCollector:
+    """
+    Drop-in async completion function that queues requests and sends them in batch waves.
+
+    A wave is submitted once no request has arrived for `window` seconds, or as soon as it
+    holds `max_requests` requests. Request and result files are kept in `directory`, or in a
+    temporary directory that is removed once the wave is done.
+    """
+
+    def __init__(
+        self,
+        service: BatchService,
+        window: float = 1.0,
+        max_requests: int = 50_000,
+        poll_interval: float = 30.0,
+        directory: Optional[Path] = None,
+    ):
+        assert window >= 0, "window must not be negative"
+        assert max_requests > 0, "max_requests must be greater than 0"
+
+        self.service = service
+        self.window = window
+        self.max_requests = max_requests
+        self.poll_interval = poll_interval
+        self.directory = Path(directory) if directory is not None else None
+        self.waves: list[int] = []
+        self._queue: list[tuple[str, dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def __call__(self, **kwargs: Any) -> "ChatCompletion":
+        body = {key: value for key, value in kwargs.items() if key not in CLIENT_ARGUMENTS}
+        # Batch APIs take the provider's own model name, without litellm's provider prefix
+        body["model"] = body["model"].split("/", 1)[-1]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((f"request-{uuid.uuid4().hex}", body, future))
+
+        if self._timer is not None:
+            self._timer.cancel()
+        if len(self._queue) >= self.max_requests:
+            self._flush()
+        else:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        self._timer = None
+        queue, self._queue = self._queue, []
+        if queue:
+            task = asyncio.ensure_future(self._run_wave(queue))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_wave(self, queue: list[tuple[str, dict[str, Any], asyncio.Future]]):
+        from openai.types.chat import ChatCompletion
+
+        self.waves.append(len(queue))
+        wave = len(self.waves)
+        directory = self.directory or Path(tempfile.mkdtemp(prefix="hypellm-batch-"))
+        directory.mkdir(parents=True, exist_ok=True)
+        requests = directory / f"wave-{wave}-{uuid.uuid4().hex[:8]}.jsonl"
+        futures = {custom_id: future for custom_id, _, future in queue}
+
+        try:
+            with requests.open("w") as f:
+                for custom_id, body, _ in queue:
+                    line = {
+                        "custom_id": custom_id,
+                        "method": "POST",
+                        "url": "/v1/chat/completions",
+                        "body": body,
+                    }
+                    f.write(json.dumps(line, default=str) + "\n")
+
+            batch_id = await self.service.submit(requests)
+            logger.info("Submitted batch wave %d (%s) with %d requests", wave, batch_id, len(queue))
+            while (status := await self.service.status(batch_id)) not in TERMINAL_STATUSES:
+                await asyncio.sleep(self.poll_interval)
+
+            results = requests.with_suffix(".results.jsonl")
+            if status != "failed":
+                await self.service.results(batch_id, results)
+            logger.info("Batch wave %d (%s) is %s", wave, batch_id, status)
+
+            if results.exists():
+                with results.open() as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        result = json.loads(line)
+                        future = futures.pop(result["custom_id"], None)
+                        if future is None or future.done():
+                            continue
+                        response = result.get("response") or {}
+                        if result.get("error") or response.get("status_code", 200) != 200:
+                            error = result.get("error") or response.get("body", {}).get("error")
+                            future.set_exception(
+                                BatchRequestError(
+                                    json.dumps(error), status_code=response.get("status_code")
+                                )
+                            )
+                        else:
+                            future.set_result(ChatCompletion.model_validate(response["body"]))
+
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(
+                        BatchRequestError(f"Request missing from {status} batch {batch_id}")
+                    )
+        except BaseException as e:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        finally:
+            if self.directory is None:
+                shutil.rmtree(directory, ignore_errors=True)
+
+
+_service: Optional[BatchService] = None
+_collectors: dict[tuple, BatchCollector] = {}
+
+
+def use_batch_service(service: Optional[BatchService]):
+    """Send batch waves to `service` instead of the provider's batch API through litellm."""
+    global _service
+    _service = service
+
+
+def get_batch_service() -> BatchService:
+    if _service is not None:
+        return _service
+    provider, _, _ = settings.model.partition("/")
+    kwargs = {"api_key": settings.api_key}
+    if settings.base_url is not None:
+        kwargs["api_base"] = str(settings.base_url)
+    return LiteLLMBatchService(provider if provider in ("openai", "azure") else "openai", **kwargs)
+
+
+def get_batch_collector() -> BatchCollector:
+    """The collector for the current batch settings and service, created on first use."""
+    service = get_batch_service()
+    key = (
+        id(_service),
+        settings.model,
+        settings.batch_window,
+        settings.batch_max_requests,
+        settings.batch_poll_interval,
+        settings.batch_dir,
+    )
+    if key not in _collectors:
+        _collectors[key] = BatchCollector(
+            service,
+            window=settings.batch_window,
+            max_requests=settings.batch_max_requests,
+            poll_interval=settings.batch_poll_interval,
+            directory=settings.batch_dir,
+        )
+    return _collectors[key]
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional, Union
+
+from pydantic_core import to_jsonable_python
+
+
+class CacheMiss(KeyError):
+    """Raised when a read-only cache has no entry for a request."""
+
+
+class ResponseCache:
+    """
+    Persistent, content-addressed cache of LLM responses backed by SQLite.
+
+    Entries are keyed by a stable hash of the request inputs and evicted by age (`max_age`,
+    in seconds) and total size (`max_size`, in bytes, least recently used first). A read-only
+    cache never writes and raises `CacheMiss` instead of computing missing entries, which
+    makes it possible to replay recorded runs offline.
+    """
+
+    EVICT_EVERY = 100
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        max_size: Optional[int] = None,
+        max_age: Optional[float] = None,
+        readonly: bool = False,
+    ):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.max_age = max_age
+        self.readonly = readonly
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(
+            self.directory / "responses.sqlite3",
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        if not readonly:
+            self.evict()
+
+    @staticmethod
+    def key(**inputs: Any) -> str:
+        payload = json.dumps(to_jsonable_python(inputs), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.max_age is not None and now - row[1] > self.max_age):
+                self.misses += 1
+                return None
+            self.hits += 1
+            if not self.readonly:
+                self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key: str, value: str):
+        if self.readonly:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode()), now, now),
+            )
+            self._writes += 1
+            evict = self._writes % self.EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    async def get_or_set(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        if (value := self.get(key)) is not None:
+            return value
+        if self.readonly:
+            raise CacheMiss(key)
+        value = await compute()
+        self.set(key, value)
+        return value
+
+    def evict(self):
+        with self._lock:
+            if self.max_age is not None:
+                self._db.execute(
+                    "DELETE FROM responses WHERE created < ?", (time.time() - self.max_age,)
+                )
+            if self.max_size is not None:
+                (total,) = self._db.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM responses"
+                ).fetchone()
+                if total > self.max_size:
+                    rows = self._db.execute(
+                        "SELECT key, size FROM responses ORDER BY accessed"
+                    ).fetchall()
+                    evicted = []
+                    for key, size in rows:
+                        if total <= self.max_size:
+                            break
+                        evicted.append((key,))
+                        total -= size
+                    self._db.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,227 @@
+import re
+import zlib
+from typing import TYPE_CHECKING, AsyncIterable, Callable, Iterable, Optional, Union
+
+from hypellm.helpers import aiterate
+from hypellm.types import DataModel
+
+if TYPE_CHECKING:
+    import numpy as np
+
+CONTRACTIONS = {
+    "what's": "what is",
+    "who's": "who is",
+    "where's": "where is",
+    "when's": "when is",
+    "how's": "how is",
+    "why's": "why is",
+    "that's": "that is",
+    "it's": "it is",
+    "there's": "there is",
+    "can't": "cannot",
+    "won't": "will not",
+    "n't": " not",
+    "'re": " are",
+    "'ve": " have",
+    "'ll": " will",
+    "'d": " would",
+}
+_CONTRACTION = re.compile("|".join(re.escape(c) for c in CONTRACTIONS))
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_PRIME = (1 << 31) - 1
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError(
+            "QuestionDeduper requires numpy, install it with `pip install hypellm[dedupe]`"
+        ) from None
+    return numpy
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, expand contractions and strip punctuation and extra whitespace."""
+    question = question.lower().replace("’", "'")
+    if "'" in question:
+        question = _CONTRACTION.sub(lambda m: CONTRACTIONS[m.group(0)], question)
+    question = _PUNCTUATION.sub(" ", question)
+    return " ".join(question.split())
+
+
+class QuestionDeduper:
+    """
+    Incrementally merges near-duplicate questions and their answer lists.
+
+    Questions are normalized, then clustered either by MinHash/LSH over character shingles
+    (estimated Jaccard similarity) or, if `embed` is given, by cosine similarity of their
+    embeddings against each cluster's first question. `embed` takes a list of strings and
+    returns a 2D NumPy array with one row per string. Memory grows with the number of
+    distinct questions, not with the number of questions added.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        embed: Optional[Callable[[list[str]], "np.ndarray"]] = None,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 4,
+        batch_size: int = 256,
+    ):
+        np = _numpy()
+
+        assert 0 < threshold <= 1, "threshold must be between 0 and 1"
+        assert num_perm % bands == 0, "num_perm must be divisible by bands"
+
+        self.threshold = threshold
+        self.embed = embed
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.batch_size = batch_size
+
+        rng = np.random.default_rng(42)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+
+        self.questions: list[str] = []
+        self.answers: list[list[DataModel]] = []
+        self._answer_keys: list[set[str]] = []
+        self._exact: dict[str, int] = {}
+        self._signatures: list["np.ndarray"] = []
+        self._buckets: dict[tuple[int, bytes], list[int]] = {}
+        self._vectors: Optional["np.ndarray"] = None
+        self._pending: list[tuple[str, str, list[DataModel]]] = []
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def add(self, question: str, answers: Iterable[DataModel]):
+        normalized = normalize_question(question)
+        answers = list(answers)
+        if normalized in self._exact:
+            self._merge(self._exact[normalized], answers)
+        elif self.embed is None:
+            self._add_minhash(question, normalized, answers)
+        else:
+            self._pending.append((question, normalized, answers))
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def update(self, mapping: dict[str, list[DataModel]]):
+        for question, answers in mapping.items():
+            self.add(question, answers)
+
+    def flush(self):
+        """Cluster questions buffered for embedding."""
+        np = _numpy()
+
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        vectors = np.asarray(self.embed([normalized for _, normalized, _ in pending]), dtype=float)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+
+        for (question, normalized, answers), vector in zip(pending, vectors):
+            if normalized in self._exact:
+                self._merge(self._exact[normalized], answers)
+                continue
+            if self._vectors is not None:
+                similarities = self._vectors[: len(self.questions)] @ vector
+                best = int(similarities.argmax())
+                if similarities[best] >= self.threshold:
+                    self._exact[normalized] = best
+                    self._merge(best, answers)
+                    continue
+            cluster = self._new_cluster(question, normalized, answers)
+            if self._vectors is None:
+                self._vectors = np.empty((self.batch_size, len(vector)))
+            elif cluster >= len(self._vectors):
+                self._vectors = np.concatenate([self._vectors, np.empty_like(self._vectors)])
+            self._vectors[cluster] = vector
+
+    def result(self) -> dict[str, list[DataModel]]:
+        """Mapping from each cluster's first question to the merged answers of the cluster."""
+        self.flush()
+        return dict(zip(self.questions, self.answers))
+
+    def signature(self, normalized: str) -> "np.ndarray":
+        np = _numpy()
+
+        size = self.shingle_size
+        shingles = {normalized[i : i + size] for i in range(max(1, len(normalized) - size + 1))}
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode()) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def _add_minhash(self, question: str, normalized: str, answers: list[DataModel]):
+        signature = self.signature(normalized)
+        bands = [
+            (band, signature[band * self.rows : (band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+        candidates = {cluster for key in bands for cluster in self._buckets.get(key, ())}
+        best, best_similarity = None, self.threshold
+        for cluster in candidates:
+            similarity = float((self._signatures[cluster] == signature).mean())
+            if similarity >= best_similarity:
+                best, best_similarity = cluster, similarity
+
+        if best is not None:
+            self._exact[normalized] = best
+            self._merge(best, answers)
+            return
+
+        cluster = self._new_cluster(question, normalized, answers)
+        self._signatures.append(signature)
+        for key in bands:
+            self._buckets.setdefault(key, []).append(cluster)
+
+    def _new_cluster(self, question: str, normalized: str, answers: list[DataModel]) -> int:
+        cluster = len(self.questions)
+        self.questions.append(question)
+        self.answers.append([])
+        self._answer_keys.append(set())
+        self._exact[normalized] = cluster
+        self._merge(cluster, answers)
+        return cluster
+
+    def _merge(self, cluster: int, answers: list[DataModel]):
+        merged, keys = self.answers[cluster], self._answer_keys[cluster]
+        for answer in answers:
+            if (key := answer.json()) not in keys:
+                keys.add(key)
+                merged.append(answer)
+
+
+async def dedupe_questions(
+    stream: Union[
+        Iterable[tuple[list[str], DataModel]], AsyncIterable[tuple[list[str], DataModel]]
+    ],
+    deduper: Optional[QuestionDeduper] = None,
+) -> dict[str, list[DataModel]]:
+    """
+    Build a deduplicated question mapping from the output of `recipes.questions_stream`.
+
+    Args:
+        stream: `(questions, datum)` pairs, e.g. from `recipes.questions_stream`
+        deduper: Optional configured deduper, defaults to MinHash/LSH with default settings
+
+    Returns:
+        A dictionary mapping each distinct question to the data that contain the answer
+    """
+    if deduper is None:
+        deduper = QuestionDeduper()
+
+    async for questions, datum in aiterate(stream):
+        for question in questions:
+            deduper.add(question, [datum])
+
+    return deduper.result()
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Awaitable, Callable, Optional
+
+from hypellm.ratelimit import is_rate_limit_error
+from hypellm.settings import Endpoint, settings
+from hypellm.types import T
+
+logger = logging.getLogger(__name__)
+
+
+def is_endpoint_error(error: BaseException) -> bool:
+    """
+    Whether `error`, or any exception it was raised from, is the endpoint's fault.
+
+    Rate limits, server errors, timeouts and connection failures count against an endpoint and
+    are worth failing over; anything else (e.g. a response that fails validation) would fail
+    the same way everywhere.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if is_rate_limit_error(error):
+            return True
+        status = getattr(error, "status_code", None)
+        if isinstance(status, int) and status >= 500:
+            return True
+        name = type(error).__name__
+        if any(kind in name for kind in ("Connect", "Timeout", "ServiceUnavailable")):
+            return True
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def endpoint_name(endpoint: Endpoint) -> str:
+    return endpoint.name or str(endpoint.base_url or endpoint.model or "default")
+
+
+class EndpointState:
+    """Routing and health state of one endpoint in an `EndpointPool`."""
+
+    def __init__(self, endpoint: Endpoint):
+        self.endpoint = endpoint
+        self.name = endpoint_name(endpoint)
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def load(self) -> float:
+        return (self.outstanding + 1) / self.endpoint.weight
+
+    def __repr__(self) -> str:
+        return (
+            f"EndpointState({self.name!r}, outstanding={self.outstanding}, "
+            f"requests={self.requests}, errors={self.errors}, ejections={self.ejections})"
+        )
+
+
+class EndpointPool:
+    """
+    Routes calls across several endpoints (keys, regions, or compatible local servers).
+
+    Each call goes to the healthy endpoint with the fewest outstanding requests relative to its
+    weight. An endpoint that fails `failure_threshold` times in a row is ejected for
+    `ejection_time` seconds, doubling with each consecutive ejection up to `max_ejection_time`.
+    Calls that fail because of the endpoint are retried once on every other endpoint before
+    the last error is raised. If every endpoint is ejected, the one due back first is used.
+    """
+
+    def __init__(
+        self,
+        endpoints: list[Endpoint],
+        failure_threshold: int = 3,
+        ejection_time: float = 30.0,
+        max_ejection_time: float = 300.0,
+    ):
+        assert endpoints, "endpoints must not be empty"
+        assert failure_threshold > 0, "failure_threshold must be greater than 0"
+
+        self.states = [EndpointState(endpoint) for endpoint in endpoints]
+        self.failure_threshold = failure_threshold
+        self.ejection_time = ejection_time
+        self.max_ejection_time = max_ejection_time
+        self._lock = threading.Lock()
+
+    def acquire(self, exclude: tuple[EndpointState, ...] = ()) -> Optional[EndpointState]:
+        """Pick an endpoint and count a request against it, or None if all are excluded."""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [state for state in self.states if state not in exclude]
+            if not candidates:
+                return None
+            healthy = [state for state in candidates if state.healthy(now)]
+            if healthy:
+                state = min(healthy, key=EndpointState.load)
+            else:
+                state = min(candidates, key=lambda state: state.ejected_until)
+            state.outstanding += 1
+            state.requests += 1
+            return state
+
+    def release(
+        self, state: EndpointState, error: Optional[BaseException] = None, record: bool = True
+    ):
+        """Finish a request, recording its outcome in the endpoint's health if `record` is set."""
+        with self._lock:
+            state.outstanding -= 1
+            if not record:
+                return
+            if error is None:
+                state.consecutive_failures = 0
+                state.ejections = 0
+                return
+
+            state.errors += 1
+            state.consecutive_failures += 1
+            if state.consecutive_failures >= self.failure_threshold:
+                ejection = min(self.max_ejection_time, self.ejection_time * 2**state.ejections)
+                state.ejected_until = time.monotonic() + ejection
+                state.ejections += 1
+                state.consecutive_failures = 0
+                logger.warning(
+                    "Ejecting endpoint %s for %.0fs after %s: %s",
+                    state.name,
+                    ejection,
+                    type(error).__name__,
+                    error,
+                )
+
+    async def run(self, call: Callable[[Endpoint], Awaitable[T]]) -> T:
+        """Await `call(endpoint)`, failing over to other endpoints on endpoint errors."""
+        tried: tuple[EndpointState, ...] = ()
+        while (state := self.acquire(exclude=tried)) is not None:
+            tried += (state,)
+            try:
+                result = await call(state.endpoint)
+            except asyncio.CancelledError:
+                self.release(state, record=False)
+                raise
+            except BaseException as e:
+                failed = is_endpoint_error(e)
+                self.release(state, error=e if failed else None)
+                if not failed or len(tried) == len(self.states):
+                    raise
+                logger.info("Endpoint %s failed with %s, failing over", state.name, e)
+            else:
+                self.release(state)
+                return result
+
+    def __repr__(self) -> str:
+        return f"EndpointPool({self.states})"
+
+
+_pools: dict[tuple, EndpointPool] = {}
+
+
+def get_endpoint_pool() -> Optional[EndpointPool]:
+    """The pool for `settings.endpoints`, or None if a single endpoint is configured."""
+    if not settings.endpoints:
+        return None
+    key = (
+        tuple(settings.endpoints),
+        settings.endpoint_failure_threshold,
+        settings.endpoint_ejection_time,
+    )
+    if key not in _pools:
+        _pools[key] = EndpointPool(
+            settings.endpoints,
+            failure_threshold=settings.endpoint_failure_threshold,
+            ejection_time=settings.endpoint_ejection_time,
+        )
+    return _pools[key]
@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from hypellm.settings import settings
+from hypellm.types import T
+
+
+class Hedger:
+    """
+    Hedges slow calls: once a call has taken longer than the `percentile` of recent latencies,
+    a duplicate is started and whichever finishes first wins, the other being cancelled.
+
+    Hedging only starts after `min_samples` latencies have been seen, and at most `budget`
+    times the number of calls are duplicated, which caps the extra spend. The latency of a
+    cancelled call is recorded as the time it had run, so stragglers keep raising the
+    percentile instead of disappearing from the window.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        budget: float = 0.05,
+        min_samples: int = 20,
+        window: int = 1000,
+    ):
+        assert 0 < percentile < 1, "percentile must be between 0 and 1"
+        assert 0 <= budget <= 1, "budget must be between 0 and 1"
+        assert min_samples > 0, "min_samples must be greater than 0"
+
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def delay(self) -> Optional[float]:
+        """How long to wait before hedging, or None while there are too few samples."""
+        with self._lock:
+            if len(self.latencies) < self.min_samples:
+                return None
+            latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(self.percentile * len(latencies)))]
+
+    def record(self, latency: float):
+        with self._lock:
+            self.latencies.append(latency)
+
+    def _try_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.budget * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[T]],
+        on_hedge: Optional[Callable[[], None]] = None,
+    ) -> T:
+        """Await `call()`, hedging it with a second `call()` if it is slow."""
+        with self._lock:
+            self.calls += 1
+
+        delay = self.delay()
+        primary = self._start(call)
+        backup: Optional[asyncio.Task[T]] = None
+        # Whatever ends this call, including its cancellation, cancels the calls it started
+        try:
+            if delay is None:
+                return await primary
+
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self._try_hedge():
+                return await primary
+
+            if on_hedge is not None:
+                on_hedge()
+            backup = self._start(call)
+            pending = {primary, backup}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self.hedge_wins += 1
+                        return task.result()
+            # Both failed, so report the original call's error
+            return primary.result()
+        finally:
+            for task in (primary, backup):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def _start(self, call: Callable[[], Awaitable[T]]) -> "asyncio.Task[T]":
+        started = time.monotonic()
+
+        async def timed() -> T:
+            try:
+                return await call()
+            finally:
+                self.record(time.monotonic() - started)
+
+        return asyncio.ensure_future(timed())
+
+    def __repr__(self) -> str:
+        return (
+            f"Hedger(calls={self.calls}, hedges={self.hedges}, hedge_wins={self.hedge_wins}, "
+            f"delay={self.delay()})"
+        )
+
+
+_hedgers: dict[tuple, Hedger] = {}
+
+
+def get_hedger(name: Optional[str] = None) -> Optional[Hedger]:
+    """
+    The hedger for calls named `name` (e.g. a recipe), or None if hedging is disabled.
+
+    Each name has its own latency window, since recipes send prompts of very different sizes.
+    """
+    if not settings.hedge:
+        return None
+    key = (name, settings.hedge_percentile, settings.hedge_budget, settings.hedge_min_samples)
+    if key not in _hedgers:
+        _hedgers[key] = Hedger(
+            percentile=settings.hedge_percentile,
+            budget=settings.hedge_budget,
+            min_samples=settings.hedge_min_samples,
+        )
+    return _hedgers[key]
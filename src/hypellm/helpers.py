@@ -1,25 +1,80 @@
 import asyncio
+import atexit
+import contextvars
+import multiprocessing
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor
 from concurrent.futures import ThreadPoolExecutor
-from typing import AsyncIterator, Callable, Optional, Coroutine, Any, Union
+from concurrent.futures import wait as wait_futures
+from functools import lru_cache, partial, wraps
+from itertools import islice
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Sized,
+    Union,
+)
 
 import anyio
 import asyncer
 
-try:
-    from tqdm import tqdm
-    from tqdm.asyncio import tqdm_asyncio
-except ImportError:
-    tqdm = None
-
+from hypellm.journal import get_journal, journal_phase, journaled
+from hypellm.metrics import aggregator, scope
+from hypellm.results import FailureBudget, ItemError, Result, attempt
 from hypellm.settings import settings
-from hypellm.types import Example, T_ParamSpec, T_Retval
+from hypellm.store import ExampleStore
+from hypellm.tokens import apacked, fits
+from hypellm.types import Example, T, T_ParamSpec, T_Retval
+
+
+def progress_bar() -> Optional[type]:
+    """The tqdm progress bar class, imported on first use, or None if progress is disabled."""
+    if not settings.show_progress:
+        return None
+    try:
+        from tqdm.asyncio import tqdm_asyncio
+    except ImportError:
+        return None
+    return tqdm_asyncio
+
+
+_worker = threading.local()
+
+
+def report_phase(progress: Any, phase: Optional[str]):
+    """Print the call metrics of `phase` below its finished progress bar."""
+    if phase is not None and (report := aggregator.report(phase)):
+        progress.write(report)
 
 
 def syncify(
     async_function: Callable[T_ParamSpec, Coroutine[Any, Any, T_Retval]],
     raise_sync_error: bool = False,
 ) -> Callable[T_ParamSpec, T_Retval]:
-    return asyncer.syncify(async_function, raise_sync_error)
+    run = asyncer.syncify(async_function, raise_sync_error)
+
+    @wraps(async_function)
+    def wrapper(*args, **kwargs) -> T_Retval:
+        # Inside `asyncify`, run on the event loop that is waiting for this thread
+        loop = getattr(_worker, "loop", None)
+        if loop is None:
+            return run(*args, **kwargs)
+        coro = async_function(*args, **kwargs)
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    return wrapper
 
 
 def asyncify(
@@ -28,7 +83,29 @@ def asyncify(
     cancellable: Union[bool, None] = None,
     limiter: Optional[anyio.CapacityLimiter] = None,
 ) -> Callable[T_ParamSpec, Coroutine[Any, Any, T_Retval]]:
-    return asyncer.asyncify(sync_function, cancellable=cancellable, limiter=limiter)
+    """
+    Run `sync_function` in the shared thread pool, see `shared_executor`.
+
+    With `cancellable` or `limiter`, anyio's worker threads are used instead.
+    """
+    if cancellable is not None or limiter is not None:
+        return asyncer.asyncify(sync_function, cancellable=cancellable, limiter=limiter)
+
+    def run(loop: asyncio.AbstractEventLoop, *args, **kwargs) -> T_Retval:
+        previous, _worker.loop = getattr(_worker, "loop", None), loop
+        try:
+            return sync_function(*args, **kwargs)
+        finally:
+            _worker.loop = previous
+
+    @wraps(sync_function)
+    async def wrapper(*args, **kwargs) -> T_Retval:
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        call = partial(context.run, run, loop, *args, **kwargs)
+        return await loop.run_in_executor(shared_executor(), call)
+
+    return wrapper
 
 
 async def as_completed(
@@ -36,8 +113,8 @@ async def as_completed(
     *,
     timeout: Optional[float] = None,
 ) -> AsyncIterator[tuple[int, T_Retval]]:
-    if settings.show_progress and tqdm_asyncio is not None:
-        generator = tqdm_asyncio.as_completed(tasks, timeout=timeout, total=len(tasks))
+    if (tqdm := progress_bar()) is not None:
+        generator = tqdm.as_completed(tasks, timeout=timeout, total=len(tasks))
     else:
         generator = asyncio.as_completed(tasks, timeout=timeout)
 
@@ -46,55 +123,451 @@ async def as_completed(
 
 
 async def gather(
-    tasks: list[Coroutine[Any, Any, T_Retval]],
+    tasks: list[Union[Coroutine[Any, Any, T_Retval], Callable[[], Awaitable[T_Retval]]]],
     *,
     timeout: Optional[float] = None,
+    envelope: bool = False,
+    retries: Optional[int] = None,
+    failure_budget: Optional[float] = None,
+    dead_letters: Optional[list[ItemError]] = None,
 ) -> list[T_Retval]:
-    with anyio.move_on_after(timeout):
-        if settings.show_progress and tqdm_asyncio is not None:
-            return await tqdm_asyncio.gather(*tasks, total=len(tasks))
+    """
+    Run `tasks` concurrently, returning their results in order.
+
+    By default the first failure cancels the remaining tasks and is raised, and so is a
+    `TimeoutError` if `timeout` expires. With `envelope`, every task instead results in a
+    `Result` holding its value or its `ItemError`: tasks given as coroutine functions are
+    retried up to `retries` times (default `settings.item_retries`) with jittered backoff,
+    tasks still running at the timeout fail with a `TimeoutError`, and the run is only
+    aborted with `FailureBudgetExceeded` once more tasks failed than `failure_budget` allows
+    (default `settings.failure_budget`). Failed tasks are also appended to `dead_letters`.
+    """
+    if envelope:
+        budget = FailureBudget(
+            settings.failure_budget if failure_budget is None else failure_budget,
+            len(tasks),
+            dead_letters,
+        )
+        tasks = [
+            attempt(task, index, retries=retries)
+            if callable(task)
+            else attempt(lambda task=task: task, index, retries=0)
+            for index, task in enumerate(tasks)
+        ]
+    else:
+        tasks = [task() if callable(task) else task for task in tasks]
+
+    futures = [asyncio.ensure_future(task) for task in tasks]
+    progress = None
+    if (tqdm := progress_bar()) is not None:
+        progress = tqdm(total=len(futures))
+        for future in futures:
+            future.add_done_callback(lambda future: future.cancelled() or progress.update())
+
+    try:
+        if not envelope:
+            done, pending = await asyncio.wait(
+                futures, timeout=timeout, return_when=asyncio.FIRST_EXCEPTION
+            )
+            for future in futures:
+                if future in done and future.exception() is not None:
+                    raise future.exception()
+            if pending:
+                raise asyncio.TimeoutError(f"{len(pending)} of {len(futures)} tasks timed out")
+            return [future.result() for future in futures]
+
+        # Results are recorded as they arrive, so an exceeded budget cancels the rest early
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        results: list[Optional[Result]] = [None] * len(futures)
+        indices = {future: index for index, future in enumerate(futures)}
+        pending = set(futures)
+        while pending:
+            remaining = deadline - loop.time() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            for future in done:
+                results[indices[future]] = future.result()
+                budget.record(future.result())
+
+        for future in sorted(pending, key=indices.__getitem__):
+            index = indices[future]
+            error = asyncio.TimeoutError(f"Timed out after {timeout}s")
+            results[index] = Result(index, error=ItemError(index, None, error, 1))
+            budget.record(results[index])
+        return results
+    finally:
+        for future in futures:
+            future.cancel()
+        if progress is not None:
+            progress.close()
+
+
+async def aiterate(data: Union[Iterable[T], AsyncIterable[T]]) -> AsyncIterator[T]:
+    """Iterate over an iterable or async iterable asynchronously."""
+    if isinstance(data, AsyncIterable):
+        async for item in data:
+            yield item
+    else:
+        for item in data:
+            yield item
+
+
+async def atake(iterator: AsyncIterator[T], n: int) -> list[T]:
+    """Consume up to `n` items from `iterator`, leaving the rest for later iteration."""
+    items = []
+    while len(items) < n:
+        try:
+            items.append(await iterator.__anext__())
+        except StopAsyncIteration:
+            break
+    return items
+
+
+async def abatched(
+    data: Union[Iterable[T], AsyncIterable[T]],
+    batch_size: int,
+) -> AsyncIterator[list[T]]:
+    """Lazily split an iterable or async iterable into lists of up to `batch_size` items."""
+    if isinstance(data, AsyncIterable):
+        batch = []
+        async for item in data:
+            batch.append(item)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    else:
+        iterator = iter(data)
+        while batch := list(islice(iterator, batch_size)):
+            yield batch
+
+
+async def astream(
+    func: Callable[T_ParamSpec, Coroutine[Any, Any, T_Retval]],
+    data: Union[Iterable[Example], AsyncIterable[Example]],
+    batch_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    *,
+    phase: Optional[str] = None,
+    params: Any = None,
+    result_type: Any = Any,
+    envelope: bool = False,
+    retries: Optional[int] = None,
+    failure_budget: Optional[float] = None,
+    dead_letters: Optional[list[ItemError]] = None,
+    token_budget: Optional[int] = None,
+) -> AsyncIterator[tuple[int, T_Retval]]:
+    """
+    Apply `func` to batches of `data`, yielding `(batch_index, result)` as batches complete.
+
+    Batches are pulled from `data` lazily and at most `concurrency` of them are in flight at
+    any time, so memory use is bounded by the concurrency rather than the size of the dataset.
+
+    If `phase` is given and `settings.journal_path` is set, each finished batch is recorded in
+    the journal and batches already recorded by a previous run are not recomputed. Recorded
+    results are validated back into `result_type`. `params` are the other inputs of `func`
+    (e.g. the prompt), and a change to them invalidates the recorded results.
+
+    With `envelope`, a failing batch no longer aborts the stream: it is retried, then yielded
+    as a `Result` like every other batch, as described in `gather`.
+
+    With `token_budget`, batches are packed to hold as many items as fit in that many tokens
+    (see `hypellm.tokens.apacked`) instead of `batch_size` items, and are always lists.
+    """
+    if batch_size is None:
+        batch_size = settings.batch_size
+    if concurrency is None:
+        concurrency = settings.call_concurrency
+
+    assert batch_size > 0, "batch_size must be greater than 0"
+    assert concurrency > 0, "concurrency must be greater than 0"
+
+    key_phase = journal_phase(phase, params) if phase is not None else None
+
+    async def handle_batch(index: int, batch: list[Example]) -> tuple[int, T_Retval]:
+        item = batch[0] if batch_size == 1 and token_budget is None else batch
+        with scope(phase=phase, batch=index):
+            if phase is None:
+                call = partial(func, item)
+            else:
+                call = partial(journaled, key_phase, item, partial(func, item), result_type, index)
+            if envelope:
+                return index, await attempt(call, index, item, retries)
+            return index, await call()
+
+    total = None
+    if isinstance(data, Sized) and token_budget is None:
+        total = -(-len(data) // batch_size)
+    if envelope:
+        budget = FailureBudget(
+            settings.failure_budget if failure_budget is None else failure_budget,
+            total,
+            dead_letters,
+            phase,
+        )
+
+    def finished(task: asyncio.Task) -> tuple[int, T_Retval]:
+        if progress is not None:
+            progress.update()
+        if envelope:
+            budget.record(task.result()[1])
+        return task.result()
+
+    progress = None
+    if (tqdm := progress_bar()) is not None:
+        progress = tqdm(total=total)
+
+    pending: set[asyncio.Task] = set()
+    try:
+        index = 0
+        if token_budget is None:
+            batches = abatched(data, batch_size)
         else:
-            return await asyncio.gather(*tasks)
+            batches = apacked(data, token_budget)
+        async for batch in batches:
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield finished(task)
+            pending.add(asyncio.ensure_future(handle_batch(index, batch)))
+            index += 1
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield finished(task)
+    finally:
+        for task in pending:
+            task.cancel()
+        if progress is not None:
+            progress.close()
+            report_phase(progress, phase)
 
 
 async def amap(
     func: Callable[T_ParamSpec, Coroutine[Any, Any, T_Retval]],
-    data: list[Example],
+    data: Union[Iterable[Example], AsyncIterable[Example]],
     batch_size: Optional[int] = None,
     concurrency: Optional[int] = None,
+    *,
+    phase: Optional[str] = None,
+    params: Any = None,
+    result_type: Any = Any,
+    executor: Union[str, Executor, None] = None,
+    envelope: bool = False,
+    retries: Optional[int] = None,
+    failure_budget: Optional[float] = None,
+    dead_letters: Optional[list[ItemError]] = None,
+    token_budget: Optional[int] = None,
 ) -> list[T_Retval]:
+    """
+    Apply `func` to batches of `data` concurrently, returning results in batch order.
+
+    By default `func` is a coroutine function run on the event loop. With `executor` ("thread",
+    "process", "interpreter" or an `Executor`, see `pmap`), `func` is a regular function and
+    batches are run in the executor without blocking the loop.
+
+    With `envelope`, each batch results in a `Result` instead, see `gather`. With
+    `token_budget`, batches are packed by tokens, see `astream`.
+    """
+    pool, owned = None, False
+    if executor is not None:
+        pool, owned = get_executor(executor, concurrency or settings.concurrency)
+        loop = asyncio.get_running_loop()
+        sync_func = func
+
+        async def func(item: Any) -> T_Retval:
+            return await loop.run_in_executor(pool, sync_func, item)
+
+    results = {}
+    try:
+        async for index, result in astream(
+            func,
+            data,
+            batch_size,
+            concurrency,
+            phase=phase,
+            params=params,
+            result_type=result_type,
+            envelope=envelope,
+            retries=retries,
+            failure_budget=failure_budget,
+            dead_letters=dead_letters,
+            token_budget=token_budget,
+        ):
+            results[index] = result
+    finally:
+        if owned:
+            pool.shutdown(wait=False, cancel_futures=True)
+    return [results[i] for i in range(len(results))]
+
+
+async def areduce(
+    func: Callable[[list[T]], Coroutine[Any, Any, T]],
+    data: Union[Iterable[T], AsyncIterable[T]],
+    batch_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    *,
+    phase: Optional[str] = None,
+    params: Any = None,
+    result_type: Any = Any,
+    token_budget: Optional[int] = None,
+    indexed: bool = False,
+) -> tuple[T, list[int]]:
+    """
+    Reduce `data` to a single value by repeatedly applying `func` to batches of values.
+
+    The tree is fixed by the values' positions: the leaves are in the order of `data`, or with
+    `indexed`, `data` yields `(index, value)` pairs in any order (as `astream` does) and the
+    leaves are in index order. Each batch is a run of consecutive values at one level, and is
+    combined as soon as all of its values are ready, while `data` is still being consumed, so
+    a slow call only holds up its own path through the tree rather than a whole level. Since
+    the batches do not depend on the order calls complete in, combines journaled with `phase`
+    are reused when a job is resumed. Leftover values at a level are combined (or promoted)
+    once nothing more can arrive.
+
+    With `token_budget`, a batch holds as many values as fit in that many tokens (and at least
+    two) instead of `batch_size` values, so the batches of a level are cut in position order,
+    each once the values before it are ready.
+
+    Returns:
+        The reduced value and the number of values at each level of the tree, leaves first
+    """
     if batch_size is None:
         batch_size = settings.batch_size
     if concurrency is None:
-        concurrency = settings.concurrency
+        concurrency = settings.call_concurrency
 
     assert batch_size > 0, "batch_size must be greater than 0"
     assert concurrency > 0, "concurrency must be greater than 0"
 
-    semaphore = anyio.Semaphore(concurrency)
+    key_phase = journal_phase(phase, params) if phase is not None else None
+    fan_in = max(batch_size, 2)
+    semaphore = asyncio.Semaphore(concurrency)
+    # The values of each level waiting to be combined, by position
+    values: defaultdict[int, dict[int, T]] = defaultdict(dict)
+    # With a token budget, each level's batches are cut in order from its first waiting position
+    first: defaultdict[int, int] = defaultdict(int)
+    launched: defaultdict[int, int] = defaultdict(int)
+    producing: dict[int, int] = defaultdict(int)
+    widths: list[int] = []
+    tasks: set[asyncio.Task] = set()
 
-    if batch_size == 1:
+    async def combine(level: int, position: int, batch: list[T]):
+        async with semaphore:
+            with scope(phase=phase, batch=level):
+                if phase is None:
+                    result = await func(batch)
+                else:
+                    result = await journaled(
+                        key_phase, batch, partial(func, batch), result_type, level
+                    )
+        producing[level + 1] -= 1
+        ready(level + 1, position, result)
 
-        async def handle_batch(batch: list[Example]) -> T_Retval:
-            async with semaphore:
-                return await func(batch[0])
-    else:
+    def launch(level: int, positions: range, above: int):
+        """Combine the values of `level` at `positions` into the value at `above` a level up."""
+        batch = [values[level].pop(position) for position in positions]
+        launched[level] += 1
+        producing[level + 1] += 1
+        tasks.add(asyncio.ensure_future(combine(level, above, batch)))
 
-        async def handle_batch(batch: list[Example]) -> T_Retval:
-            async with semaphore:
-                return await func(batch)
+    def ready(level: int, position: int, value: T):
+        if len(widths) <= level:
+            widths.append(0)
+        widths[level] += 1
+        place(level, position, value)
 
-    return await gather(
-        [handle_batch(data[i : i + batch_size]) for i in range(0, len(data), batch_size)]
-    )
+    def place(level: int, position: int, value: T):
+        values[level][position] = value
+        if token_budget is None:
+            # Each run of `fan_in` positions is a batch, combined as soon as it is complete
+            start = position - position % fan_in
+            if all(i in values[level] for i in range(start, start + fan_in)):
+                launch(level, range(start, start + fan_in), start // fan_in)
+            return
+
+        while True:
+            start, run = first[level], []
+            while start + len(run) in values[level]:
+                run.append(values[level][start + len(run)])
+            if (n := fits(run, token_budget)) == len(run):
+                return
+            # The last value overflows the budget, so combine the ones before it
+            first[level] += n
+            launch(level, range(start, start + n), launched[level])
+
+    def flush():
+        level = 0
+        while level <= max([*values, *producing]):
+            if producing[level] > 0:
+                return
+            # Nothing more can arrive at this level, so its waiting values are its last batch
+            rest = sorted(values[level])
+            if rest:
+                above = rest[0] // fan_in if token_budget is None else launched[level]
+                if len(rest) > 1:
+                    launch(level, range(rest[0], rest[-1] + 1), above)
+                    return
+                if not launched[level]:
+                    return
+                # A lone leftover is promoted to the level above, after the others
+                place(level + 1, above, values[level].pop(rest[0]))
+            level += 1
+
+    try:
+        async for item in aiterate(data):
+            position, value = item if indexed else (widths[0] if widths else 0, item)
+            ready(0, position, value)
+            done = {task for task in tasks if task.done()}
+            for task in done:
+                task.result()
+            tasks.difference_update(done)
+
+        assert widths, "data must not be empty"
+
+        while True:
+            flush()
+            if not tasks:
+                break
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+            tasks.difference_update(done)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    (result,) = (value for level in values.values() for value in level.values())
+    return result, widths
 
 
 def pmap(
     func: Callable[T_ParamSpec, T_Retval],
-    data: list[Example],
+    data: Sequence[Example],
     batch_size: Optional[int] = None,
     concurrency: Optional[int] = None,
+    *,
+    phase: Optional[str] = None,
+    params: Any = None,
+    result_type: Any = Any,
+    executor: Union[str, Executor] = "thread",
+    chunksize: Optional[int] = None,
 ) -> list[T_Retval]:
+    """
+    Apply `func` to batches of `data` in an executor, returning results in batch order.
+
+    `executor` is "thread" (the default, for I/O-bound work), "process" or "interpreter" (for
+    CPU-bound work), or an existing `concurrent.futures.Executor`. Process and interpreter
+    workers need a picklable `func`, and receive `chunksize` batches per task to amortize the
+    transfer. An `ExampleStore` is not pickled batch by batch: workers memory-map the same file
+    and read their slices directly.
+    """
     if batch_size is None:
         batch_size = settings.batch_size
     if concurrency is None:
@@ -103,25 +576,196 @@ def pmap(
     assert batch_size > 0, "batch_size must be greater than 0"
     assert concurrency > 0, "concurrency must be greater than 0"
 
-    if batch_size == 1:
+    journal = get_journal() if phase is not None else None
+    key_phase = journal_phase(phase, params) if journal is not None else None
+    pool, owned = get_executor(executor, concurrency)
+    threaded = isinstance(pool, ThreadPoolExecutor)
+    shared = isinstance(data, ExampleStore) and not threaded
 
-        def handle_batch(batch: list[Example]) -> T_Retval:
-            return func(batch[0])
+    results: list[T_Retval] = [None] * -(-len(data) // batch_size)
+    keys: dict[int, str] = {}
 
-    else:
+    progress = None
+    if (tqdm := progress_bar()) is not None:
+        progress = tqdm(total=len(results))
 
-        def handle_batch(batch: list[Example]) -> T_Retval:
-            return func(batch)
+    def batches() -> Iterator[tuple[int, Any]]:
+        # Sliced on demand, so only the batches in flight are loaded at a time
+        for index, start in enumerate(range(0, len(data), batch_size)):
+            if shared:
+                item = StoreSlice(data.path, data.model, start, start + batch_size, batch_size == 1)
+            else:
+                batch = data[start : start + batch_size]
+                item = batch[0] if batch_size == 1 else batch
 
-    with ThreadPoolExecutor(max_workers=concurrency) as pool:
-        batch_tasks = [
-            pool.submit(handle_batch, data[i : i + batch_size])
-            for i in range(0, len(data), batch_size)
-        ]
+            if journal is not None:
+                key = journal.key(key_phase, index, item.load() if shared else item)
+                if key in journal:
+                    results[index] = journal.get(key, result_type)
+                    if progress is not None:
+                        progress.update()
+                    continue
+                keys[index] = key
+            yield index, item
 
-        if settings.show_progress and tqdm is not None:
-            futures = tqdm(batch_tasks, total=len(batch_tasks))
+    def finish(index: int, result: T_Retval):
+        if index in keys:
+            journal.record(keys[index], result)
+        results[index] = result
+        if progress is not None:
+            progress.update()
+
+    try:
+        if threaded:
+            drain(pool, func, batches(), min(concurrency, len(results)), finish, phase)
         else:
-            futures = batch_tasks
+            if chunksize is None:
+                chunksize = max(1, len(results) // (concurrency * 4))
+            pending = batches()
+            futures: dict[Future, tuple[int, ...]] = {}
+
+            def submit():
+                if chunk := list(islice(pending, chunksize)):
+                    indices, items = zip(*chunk)
+                    futures[pool.submit(apply_chunk, func, items)] = indices
+
+            for _ in range(concurrency * 2):
+                submit()
+            while futures:
+                done, _ = wait_futures(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for index, result in zip(futures.pop(future), future.result()):
+                        finish(index, result)
+                    submit()
+    finally:
+        if owned:
+            pool.shutdown(cancel_futures=True)
+        if progress is not None:
+            progress.close()
+            report_phase(progress, phase)
+
+    return results
+
+
+def drain(
+    pool: Executor,
+    func: Callable[[Any], T_Retval],
+    pending: Iterable[tuple[int, Any]],
+    concurrency: int,
+    finish: Callable[[int, T_Retval], None],
+    phase: Optional[str] = None,
+):
+    """
+    Run `func` on `pending` items with up to `concurrency` threads, the caller included.
+
+    The calling thread works through the items alongside the pool's threads, and helpers that
+    have not started by the time the items run out are cancelled. So a `pmap` nested in a task
+    of the same bounded pool always makes progress, even when every worker is busy. Items are
+    pulled from `pending` one at a time, as threads become free.
+    """
+    queue = iter(pending)
+    lock = threading.Lock()
+    errors: list[BaseException] = []
+
+    def work():
+        while not errors:
+            with lock:
+                try:
+                    index, item = next(queue)
+                except StopIteration:
+                    return
+            try:
+                with scope(phase=phase, batch=index):
+                    result = func(item)
+                finish(index, result)
+            except BaseException as e:
+                errors.append(e)
+
+    helpers = [pool.submit(contextvars.copy_context().run, work) for _ in range(concurrency - 1)]
+    work()
+    for helper in helpers:
+        if not helper.cancel():
+            helper.result()
+    if errors:
+        raise errors[0]
+
+
+_shared_executor: Optional[ThreadPoolExecutor] = None
+_shared_executor_lock = threading.Lock()
+
+
+def shared_executor() -> ThreadPoolExecutor:
+    """
+    The process-wide thread pool used by `pmap` and `asyncify`, created on first use.
+
+    Its `settings.max_workers` threads cap the blocking work of all concurrent recipe calls.
+    """
+    global _shared_executor
+    with _shared_executor_lock:
+        if _shared_executor is None or _shared_executor._max_workers != settings.max_workers:
+            if _shared_executor is not None:
+                _shared_executor.shutdown(wait=False)
+            _shared_executor = ThreadPoolExecutor(
+                max_workers=settings.max_workers, thread_name_prefix="hypellm"
+            )
+        return _shared_executor
+
+
+def shutdown(wait: bool = True):
+    """Shut down the shared thread pool, cancelling queued work. It is recreated when needed."""
+    global _shared_executor
+    with _shared_executor_lock:
+        if _shared_executor is not None:
+            _shared_executor.shutdown(wait=wait, cancel_futures=True)
+            _shared_executor = None
+
+
+atexit.register(shutdown)
+
+
+EXECUTORS = ("thread", "process", "interpreter")
+
+
+def get_executor(executor: Union[str, Executor], max_workers: int) -> tuple[Executor, bool]:
+    """The executor to run on, and whether the caller owns (and must shut down) it."""
+    if isinstance(executor, Executor):
+        return executor, False
+    if executor == "thread":
+        return shared_executor(), False
+
+    max_workers = min(max_workers, os.cpu_count() or 1)
+    if executor == "process":
+        # Forking a process that runs the shared thread pool can deadlock the children
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=context), True
+    if executor == "interpreter":
+        try:
+            from concurrent.futures import InterpreterPoolExecutor
+        except ImportError:
+            raise ValueError("The interpreter executor requires Python 3.14 or later")
+        return InterpreterPoolExecutor(max_workers=max_workers), True
+    raise ValueError(f"Unknown executor {executor!r}, expected one of {EXECUTORS}")
+
+
+class StoreSlice(NamedTuple):
+    """Picklable reference to a batch of an `ExampleStore`, loaded by the worker."""
+
+    path: Path
+    model: type
+    start: int
+    stop: int
+    unwrap: bool
+
+    def load(self) -> Any:
+        batch = open_store(self.path, self.model)[self.start : self.stop]
+        return batch[0] if self.unwrap else batch
+
+
+@lru_cache(maxsize=None)
+def open_store(path: Path, model: type) -> ExampleStore:
+    return ExampleStore(path, model)
+
 
-        return [f.result() for f in futures]
+def apply_chunk(func: Callable[[Any], T_Retval], items: Iterable[Any]) -> list[T_Retval]:
+    return [func(item.load() if isinstance(item, StoreSlice) else item) for item in items]
@@ -1,7 +1,11 @@
-from typing import Optional, Protocol
+import sys
+from importlib import import_module
+from typing import AsyncIterable, AsyncIterator, Iterable, Optional, Protocol, Union
 
 from hypellm.types import Example, Prompt
 
+ENTRY_POINT_GROUP = "hypellm.impl"
+
 
 class Impl(Protocol):
     @staticmethod
@@ -35,3 +39,60 @@ class Impl(Protocol):
         concurrency: Optional[int] = None,
         prompt: Optional[Prompt] = None,
     ) -> tuple[Prompt, list[Example]]: ...
+
+    @staticmethod
+    def reasoned_stream(
+        data: Union[Iterable[Example], AsyncIterable[Example]],
+        branching_factor: int = 3,
+        concurrency: Optional[int] = None,
+        prompt: Optional[Prompt] = None,
+    ) -> AsyncIterator[Example]: ...
+
+
+_registry: dict[str, Union[Impl, str]] = {
+    "instructor": "hypellm.impl.instructor",
+    "dspy": "hypellm.impl.dspy",
+}
+_resolved: dict[str, Impl] = {}
+
+
+def register(name: str, impl: Union[Impl, str]):
+    """Register an impl object, or the import path of an impl module, under `name`."""
+    _registry[name] = impl
+    _resolved.pop(name, None)
+
+
+def available() -> list[str]:
+    """Names of the registered impls, including those installed as entry points."""
+    return sorted({*_registry, *(ep.name for ep in _entry_points())})
+
+
+def resolve(impl: Union[str, Impl]) -> Impl:
+    """
+    Resolve an impl name to the impl, caching the result.
+
+    Names are looked up in the registry, then in the `hypellm.impl` entry point group, and
+    are otherwise treated as a module path (relative to `hypellm.impl` if it has no dots).
+    Anything that is not a string is assumed to already be an impl.
+    """
+    if not isinstance(impl, str):
+        return impl
+    if impl in _resolved:
+        return _resolved[impl]
+
+    target = _registry.get(impl)
+    if target is None:
+        target = next((ep.load() for ep in _entry_points() if ep.name == impl), None)
+    if target is None:
+        target = impl if "." in impl else f"hypellm.impl.{impl}"
+
+    _resolved[impl] = import_module(target) if isinstance(target, str) else target
+    return _resolved[impl]
+
+
+def _entry_points() -> list:
+    from importlib.metadata import entry_points
+
+    if sys.version_info >= (3, 10):
+        return list(entry_points(group=ENTRY_POINT_GROUP))
+    return list(entry_points().get(ENTRY_POINT_GROUP, []))
@@ -1,9 +1,19 @@
 from .base import dspy
 
-from .reasoned import reasoned_sync
+from .reasoned import reasoned_sync, reasoned_stream
 from .questions import questions_sync
 from .inferred import inferred_sync
 
 reasoned = dspy.asyncify(reasoned_sync)
 questions = dspy.asyncify(questions_sync)
 inferred = dspy.asyncify(inferred_sync)
+
+__all__ = [
+    "inferred",
+    "questions",
+    "reasoned",
+    "reasoned_stream",
+    "inferred_sync",
+    "questions_sync",
+    "reasoned_sync",
+]
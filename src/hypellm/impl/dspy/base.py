@@ -1,15 +1,41 @@
 import dspy
 
 from hypellm import settings, Example
+from hypellm.ratelimit import estimate_tokens, get_limiter
 
-lm = dspy.LM(
-    model=settings.model,
-    api_key=settings.api_key,
-    api_version=settings.api_version,
-    base_url=settings.base_url,
-)
 
-dspy.configure(lm=lm, async_max_workers=settings.concurrency)
+class LimitedLM(dspy.LM):
+    """A `dspy.LM` whose calls are throttled by the shared rate limiter."""
+
+    def __call__(self, prompt=None, messages=None, **kwargs):
+        return get_limiter().run_sync(
+            lambda: super(LimitedLM, self).__call__(prompt=prompt, messages=messages, **kwargs),
+            estimate_tokens(messages or prompt),
+        )
+
+
+_lms: dict[tuple, LimitedLM] = {}
+
+
+def get_lm() -> LimitedLM:
+    """
+    The LM for the current settings, created and configured as dspy's default on first use.
+    """
+    key = (
+        settings.model,
+        settings.api_key,
+        settings.api_version,
+        settings.base_url,
+    )
+    if key not in _lms:
+        _lms[key] = LimitedLM(
+            model=settings.model,
+            api_key=settings.api_key,
+            api_version=settings.api_version,
+            base_url=settings.base_url,
+        )
+        dspy.configure(lm=_lms[key], async_max_workers=settings.concurrency)
+    return _lms[key]
 
 
 def train_dev_split(
@@ -17,6 +43,7 @@ def train_dev_split(
 ) -> tuple[list[Example], list[Example]]:
     import numpy as np
 
+    data = list(data)
     np.random.seed(42)
     np.random.shuffle(data)
     return data[: int(len(data) * (1 - test_size))], data[int(len(data) * (1 - test_size)) :]
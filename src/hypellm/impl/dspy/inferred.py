@@ -2,7 +2,7 @@ from typing import Optional
 
 from hypellm import Prompt, Example, ReasoningSteps, IO
 
-from .base import dspy, train_dev_split
+from .base import dspy, get_lm, train_dev_split
 
 
 class Function(dspy.Signature):
@@ -16,6 +16,7 @@ def inferred_sync(
     batch_size: Optional[int] = None,
     concurrency: Optional[int] = None,
 ) -> Prompt:
+    get_lm()
     optimizer = dspy.MIPROv2(
         metric=dspy.evaluate.semantic_f1,
         mode="light",
@@ -1,6 +1,6 @@
 from hypellm import IO, Example
 
-from .base import dspy, lm
+from .base import dspy, get_lm
 
 
 class Questions(dspy.Signature):
@@ -33,7 +33,7 @@ class Questions(dspy.Signature):
 
 
 def questions_sync(datum: Example) -> list[str]:
-    with dspy.configure(lm=lm.copy(temperature=0.7)):
+    with dspy.context(lm=get_lm().copy(temperature=0.7)):
         return dspy.ChainOfThought(Questions)(outputs=datum.outputs).questions
 
 
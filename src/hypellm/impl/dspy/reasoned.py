@@ -1,10 +1,10 @@
 from functools import partial
 from random import sample
-from typing import Optional
+from typing import AsyncIterable, AsyncIterator, Iterable, Optional, Union
 
 from hypellm import Example, settings, ReasoningSteps, IO, DataModel, Prompt
-from hypellm.helpers import pmap
-from .base import dspy
+from hypellm.helpers import aiterate, amap, astream, atake, pmap
+from .base import dspy, get_lm
 from .inferred import inferred_sync
 
 
@@ -43,6 +43,7 @@ def reasoned_sync(
     concurrency: Optional[int] = None,
 ) -> list[Example]:
     concurrency = concurrency or settings.concurrency
+    get_lm()
 
     sample_data = sample(data, k=settings.batch_size)
     sample_prompt = inferred_sync(sample_data, settings.batch_size, concurrency)
@@ -52,9 +53,12 @@ def reasoned_sync(
         sample_data,
         batch_size=1,
         concurrency=concurrency,
+        phase="reasoned.few_shot",
+        params=[sample_prompt, branching_factor],
+        result_type=ReasoningSteps,
     )
     sample_examples = [
-        Example(
+        Example.trusted(
             inputs=datum.inputs,
             outputs=datum.outputs,
             reasoning=reasoning,
@@ -69,9 +73,68 @@ def reasoned_sync(
         data,
         batch_size=1,
         concurrency=concurrency,
+        phase="reasoned.remainder",
+        params=[few_shot_prompt, branching_factor],
+        result_type=ReasoningSteps,
     )
 
     return [datum.update(reasoning=reasoning) for datum, reasoning in zip(data, data_reasonings)]
 
 
 reasoned = dspy.asyncify(reasoned_sync)
+
+
+async def reasoned_stream(
+    data: Union[Iterable[Example], AsyncIterable[Example]],
+    branching_factor: int = 3,
+    concurrency: Optional[int] = None,
+    prompt: Optional[Prompt] = None,
+) -> AsyncIterator[Example]:
+    concurrency = concurrency or settings.concurrency
+    get_lm()
+
+    stream = aiterate(data)
+    sample_data = await atake(stream, settings.batch_size)
+    if not sample_data:
+        return
+
+    if prompt is None:
+        prompt = await dspy.asyncify(inferred_sync)(sample_data, settings.batch_size, concurrency)
+
+    sample_reasonings = await amap(
+        dspy.asyncify(partial(infill_reasoning, prompt, branching_factor)),
+        sample_data,
+        batch_size=1,
+        concurrency=concurrency,
+        phase="reasoned.few_shot",
+        params=[prompt, branching_factor],
+        result_type=ReasoningSteps,
+    )
+    sample_examples = [
+        datum.update(reasoning=reasoning)
+        for datum, reasoning in zip(sample_data, sample_reasonings)
+    ]
+    for example in sample_examples:
+        yield example
+
+    few_shot_prompt = prompt.update(
+        examples=[
+            Example.trusted(inputs=datum.inputs, outputs=datum.outputs, reasoning=datum.reasoning)
+            for datum in sample_examples
+        ]
+    )
+    infill = dspy.asyncify(partial(infill_reasoning, few_shot_prompt, branching_factor))
+
+    async def reason(datum: Example) -> Example:
+        return datum.update(reasoning=await infill(datum))
+
+    async for _, example in astream(
+        reason,
+        stream,
+        batch_size=1,
+        concurrency=concurrency,
+        phase="reasoned_stream.remainder",
+        params=[few_shot_prompt, branching_factor],
+        result_type=Example,
+    ):
+        yield example
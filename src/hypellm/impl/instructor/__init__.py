@@ -2,7 +2,7 @@ from hypellm.helpers import syncify
 
 from .inferred import inferred
 from .questions import questions
-from .reasoned import reasoned
+from .reasoned import reasoned, reasoned_stream
 
 inferred_sync = syncify(inferred)
 questions_sync = syncify(questions)
@@ -12,6 +12,7 @@ __all__ = [
     "inferred",
     "questions",
     "reasoned",
+    "reasoned_stream",
     "inferred_sync",
     "questions_sync",
     "reasoned_sync",
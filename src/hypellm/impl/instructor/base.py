@@ -1,12 +1,252 @@
-import instructor
-import litellm
+from collections import defaultdict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Optional, TypeVar
+
+from pydantic import BaseModel
 
 from hypellm import settings
+from hypellm.batch import get_batch_collector
+from hypellm.cache import ResponseCache
+from hypellm.endpoints import endpoint_name, get_endpoint_pool
+from hypellm.hedge import get_hedger
+from hypellm.metrics import CallTracker, current_call, on_parse_error
+from hypellm.ratelimit import estimate_tokens, get_limiter
+from hypellm.settings import Endpoint
+from hypellm.transport import get_http_pool
+
+if TYPE_CHECKING:
+    from instructor import AsyncInstructor
+
+T_Model = TypeVar("T_Model", bound=BaseModel)
+
+_clients: dict[tuple, "AsyncInstructor"] = {}
+_caches: dict[tuple, ResponseCache] = {}
+
+
+def get_client(endpoint: Optional[Endpoint] = None) -> "AsyncInstructor":
+    """The instructor client for `endpoint` or the current settings, created on first use."""
+    if settings.batch_api:
+        return get_batch_client()
+    key = (
+        (endpoint and endpoint.model) or settings.model,
+        (endpoint and endpoint.api_key) or settings.api_key,
+        (endpoint and endpoint.api_version) or settings.api_version,
+        (endpoint and endpoint.base_url) or settings.base_url,
+    )
+    if key not in _clients:
+        import instructor
+        import litellm
+
+        if settings.http_pool:
+            litellm.aclient_session = get_http_pool().client
+        model, api_key, api_version, base_url = key
+        _clients[key] = instructor.from_litellm(
+            litellm.acompletion,
+            model=model,
+            api_key=api_key,
+            api_version=api_version,
+            base_url=str(base_url) if base_url is not None else None,
+        )
+        _clients[key].on("parse:error", on_parse_error)
+    return _clients[key]
+
+
+def get_batch_client() -> "AsyncInstructor":
+    """The instructor client that sends its requests in batch waves, see `hypellm.batch`."""
+    collector = get_batch_collector()
+    key = ("batch", id(collector))
+    if key not in _clients:
+        import instructor
+
+        _clients[key] = instructor.from_litellm(collector.__call__, model=settings.model)
+        _clients[key].on("parse:error", on_parse_error)
+    return _clients[key]
+
+
+def get_cache() -> Optional[ResponseCache]:
+    """The response cache for the current settings, or None if caching is disabled."""
+    if settings.cache_dir is None:
+        return None
+    key = (
+        settings.cache_dir,
+        settings.cache_max_size,
+        settings.cache_max_age,
+        settings.cache_replay,
+    )
+    if key not in _caches:
+        _caches[key] = ResponseCache(
+            settings.cache_dir,
+            max_size=settings.cache_max_size,
+            max_age=settings.cache_max_age,
+            readonly=settings.cache_replay,
+        )
+    return _caches[key]
+
+
+class PromptCacheStats:
+    """Provider prompt-cache usage reported for the calls of one recipe."""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+    def record(self, usage: Any):
+        self.calls += 1
+        if usage is None:
+            return
+        self.prompt_tokens += getattr(usage, "prompt_tokens", None) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None)
+        if cached is None:
+            cached = getattr(usage, "cache_read_input_tokens", None)
+        self.cached_tokens += cached or 0
+
+    def __repr__(self) -> str:
+        return (
+            f"PromptCacheStats(calls={self.calls}, prompt_tokens={self.prompt_tokens}, "
+            f"cached_tokens={self.cached_tokens}, hit_ratio={self.hit_ratio:.2f})"
+        )
+
+
+prompt_cache_stats: defaultdict[str, PromptCacheStats] = defaultdict(PromptCacheStats)
+
+
+def build_messages(
+    static: list[dict[str, Any]],
+    dynamic: list[dict[str, Any]],
+) -> list[dict[str, Any]]:
+    """
+    Build a message list that starts with a byte-stable static prefix.
+
+    `static` messages must only depend on the recipe and its prompt, never on the datum, so
+    that providers can reuse their cached prefix across calls. With
+    `settings.prompt_cache_control`, the last static message is marked as a cache breakpoint.
+    """
+    # Copies, since messages are usually memoized on their models and instructor may edit them
+    static = [{**message} for message in static]
+    dynamic = [{**message} for message in dynamic]
+    if settings.prompt_cache_control and static:
+        *head, last = static
+        static = [
+            *head,
+            {
+                **last,
+                "content": [
+                    {
+                        "type": "text",
+                        "text": last["content"],
+                        "cache_control": {"type": "ephemeral"},
+                    }
+                ],
+            },
+        ]
+    return [*static, *dynamic]
+
+
+@lru_cache(maxsize=None)
+def json_schema(response_model: type[BaseModel]) -> dict[str, Any]:
+    return response_model.model_json_schema()
+
+
+async def complete(
+    response_model: type[T_Model],
+    messages: list[dict[str, Any]],
+    *,
+    recipe: Optional[str] = None,
+    **kwargs: Any,
+) -> T_Model:
+    """
+    Create a structured completion, going through the response cache if one is configured.
+
+    Every request sent to the provider, including hedged and failed-over ones, is throttled and
+    charged by the shared rate limiter, and prompt cache usage is recorded in
+    `prompt_cache_stats[recipe]`. Every call, including response cache hits, is reported to
+    the `hypellm.metrics` hooks. With `settings.hedge`, slow calls are duplicated, see
+    `hypellm.hedge.Hedger`. With `settings.endpoints`, calls are spread over the endpoints by
+    `hypellm.endpoints.EndpointPool`. With `settings.batch_api`, calls are instead queued into
+    batch waves, see `hypellm.batch`, without throttling or hedging.
+    """
+
+    batched = settings.batch_api
+    tracker = CallTracker(settings.model, recipe)
+    hedger = None if batched else get_hedger(recipe or response_model.__name__)
+    pool = None if batched else get_endpoint_pool()
+    limiter = None if batched else get_limiter()
+    tokens = 0 if batched else estimate_tokens(messages)
+
+    async def send(endpoint: Optional[Endpoint] = None) -> tuple[T_Model, Any]:
+        client = get_client() if endpoint is None else get_client(endpoint)
+        if endpoint is not None:
+            tracker.event["endpoint"] = endpoint_name(endpoint)
+            tracker.event["model"] = endpoint.model or settings.model
+
+        async def post() -> tuple[T_Model, Any]:
+            tracker.sent()
+            return await client.chat.completions.create_with_completion(
+                response_model=response_model,
+                messages=messages,
+                **kwargs,
+            )
+
+        return await (post() if limiter is None else limiter.attempt(post, tokens))
+
+    async def request() -> tuple[T_Model, Any]:
+        return await (send() if pool is None else pool.run(send))
+
+    def hedged():
+        tracker.event["hedged"] = True
+
+    async def call() -> T_Model:
+        tracker.attempt()
+        if hedger is None:
+            response, completion = await request()
+        else:
+            response, completion = await hedger.run(request, on_hedge=hedged)
+        prompt_cache_stats[recipe or response_model.__name__].record(
+            getattr(completion, "usage", None)
+        )
+        tracker.completion = completion
+        return response
+
+    async def create() -> T_Model:
+        token = current_call.set(tracker)
+        try:
+            response = await (call() if limiter is None else limiter.retrying(call))
+        except BaseException as e:
+            tracker.finish(tracker.completion, error=e)
+            raise
+        finally:
+            current_call.reset(token)
+        tracker.finish(tracker.completion)
+        return response
+
+    cache = get_cache()
+    if cache is None:
+        return await create()
+
+    # Any of the pool's endpoints may answer, so the key covers the models of all of them
+    endpoints = [state.endpoint for state in pool.states] if pool is not None else [Endpoint()]
+    models = sorted({endpoint.model or settings.model for endpoint in endpoints})
+    key = ResponseCache.key(
+        model=models[0] if len(models) == 1 else models,
+        messages=messages,
+        response_model=json_schema(response_model),
+        **kwargs,
+    )
+
+    computed = False
+
+    async def compute() -> str:
+        nonlocal computed
+        computed = True
+        return (await create()).model_dump_json()
 
-client = instructor.from_litellm(
-    litellm.acompletion,
-    model=settings.model,
-    api_key=settings.api_key,
-    api_version=settings.api_version,
-    base_url=settings.base_url,
-)
+    response = response_model.model_validate_json(await cache.get_or_set(key, compute))
+    if not computed:
+        tracker.finish(cache_hit=True)
+    return response
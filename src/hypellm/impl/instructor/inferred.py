@@ -1,13 +1,17 @@
+import logging
 from functools import partial
-from random import sample
-from typing import Optional
+from random import randrange, sample
+from typing import Optional, Sequence
 
 import ujson
 
 from hypellm import settings, DataModel, Prompt, ReasoningSteps, Example
-from hypellm.helpers import amap
+from hypellm.helpers import areduce, astream
+from hypellm.tokens import count_tokens
 
-from .base import client
+from .base import build_messages, complete
+
+logger = logging.getLogger(__name__)
 
 
 async def inferred(
@@ -19,9 +23,12 @@ async def inferred(
     Infer a prompt from a list of datums.
 
     This function:
-    1. Splits the data into batches
+    1. Splits the data into batches, of `batch_size` examples or, with
+       `settings.token_budget`, of as many examples as fit in the budget
     2. Infers candidate prompts for each batch in parallel
-    3. Recursively combines the candidate prompts until a single prompt remains
+    3. Combines candidate prompts in a tree, starting a combine as soon as a batch of
+       candidates is ready at any level, until a single prompt remains. The tree is fixed by
+       the batches' order, so a resumed job reuses the journaled combines
 
     Args:
         data: List of input/output examples with reasoning steps
@@ -30,62 +37,92 @@ async def inferred(
     Returns:
         A single Prompt object that could generate the examples
     """
-    candidates = await amap(infer_prompt, data, batch_size, concurrency)
-    while len(candidates) > 1:
-        candidates = await amap(
-            partial(combine_prompts, data),
-            candidates,
-            batch_size,
-            concurrency,
-        )
+    leaves = astream(
+        infer_prompt,
+        data,
+        batch_size,
+        concurrency,
+        phase="inferred.leaf",
+        result_type=Prompt,
+        token_budget=settings.token_budget,
+    )
+    prompt, widths = await areduce(
+        partial(combine_prompts, data),
+        leaves,
+        batch_size,
+        concurrency,
+        phase="inferred.combine",
+        result_type=Prompt,
+        token_budget=settings.token_budget,
+        indexed=True,
+    )
+    logger.info("Reduced %d candidate prompts over %d levels: %s", widths[0], len(widths), widths)
 
-    return candidates[0]
+    return prompt
 
 
 async def infer_prompt(examples: list[Example]) -> Prompt:
-    response: HypotheticalPrompt = await client.chat.completions.create(
+    response: HypotheticalPrompt = await complete(
         response_model=HypotheticalPrompt,
         temperature=0.42,
-        messages=[
-            {
-                "role": "system",
-                "content": SYSTEM_PROMPT.json(),
-            },
-            {
-                "role": "user",
-                "content": f"Here are several input/output examples. Create a prompt that could generate all of them:\n\n{ujson.dumps(examples)}",
-            },
-        ],
+        messages=build_messages(
+            static=[SYSTEM_PROMPT.message("system")],
+            dynamic=[
+                {
+                    "role": "user",
+                    "content": f"Here are several input/output examples. Create a prompt that could generate all of them:\n\n{ujson.dumps(examples)}",
+                },
+            ],
+        ),
+        recipe="inferred",
     )
     return response.prompt
 
 
 async def combine_prompts(data: list[Example], prompts: list[Prompt]) -> Prompt:
-    data = sample(data, k=settings.batch_size)
-    response: HypotheticalPrompt = await client.chat.completions.create(
+    if settings.token_budget is None:
+        data = sample(data, k=settings.batch_size)
+    else:
+        # The candidate prompts come first, and examples fill what is left of the budget
+        data = sample_within(data, settings.token_budget - sum(map(count_tokens, prompts)))
+    response: HypotheticalPrompt = await complete(
         response_model=HypotheticalPrompt,
-        messages=[
-            {
-                "role": "system",
-                "content": SYSTEM_PROMPT.json(),
-            },
-            {
-                "role": "user",
-                "content": f"Here are the prompts to combine:\n\n{ujson.dumps(prompts)}",
-            },
-            {
-                "role": "user",
-                "content": f"Here are the examples to generate:\n\n{ujson.dumps(data)}",
-            },
-            {
-                "role": "user",
-                "content": "Create a single prompt that could generate all of these examples.",
-            },
-        ],
+        messages=build_messages(
+            static=[SYSTEM_PROMPT.message("system")],
+            dynamic=[
+                {
+                    "role": "user",
+                    "content": f"Here are the prompts to combine:\n\n{ujson.dumps(prompts)}",
+                },
+                {
+                    "role": "user",
+                    "content": f"Here are the examples to generate:\n\n{ujson.dumps(data)}",
+                },
+                {
+                    "role": "user",
+                    "content": "Create a single prompt that could generate all of these examples.",
+                },
+            ],
+        ),
+        recipe="inferred",
     )
     return response.prompt
 
 
+def sample_within(data: Sequence[Example], budget: int) -> list[Example]:
+    """Random examples of `data`, drawn until the next one would not fit in `budget` tokens."""
+    examples, seen = [], set()
+    while len(seen) < len(data):
+        if (index := randrange(len(data))) in seen:
+            continue
+        seen.add(index)
+        budget -= count_tokens(data[index])
+        if budget < 0:
+            break
+        examples.append(data[index])
+    return examples
+
+
 class HypotheticalPrompt(DataModel):
     reasoning_steps: ReasoningSteps
     prompt: Prompt
@@ -1,16 +1,17 @@
 from hypellm.types import Prompt, DataModel, ReasoningSteps
 
-from .base import client
+from .base import build_messages, complete
 
 
 async def questions(d: DataModel) -> list[str]:
-    response: HypotheticalQuestions = await client.chat.completions.create(
+    response: HypotheticalQuestions = await complete(
         response_model=HypotheticalQuestions,
         temperature=0.7,
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT.json()},
-            {"role": "user", "content": d.json()},
-        ],
+        messages=build_messages(
+            static=[SYSTEM_PROMPT.message("system")],
+            dynamic=[d.message("user")],
+        ),
+        recipe="questions",
     )
     return response.questions
 
@@ -1,12 +1,20 @@
-from functools import partial
-from typing import Optional
+import logging
+from functools import lru_cache, partial
+from itertools import chain
+from typing import AsyncIterable, AsyncIterator, Iterable, Optional, Union
 from random import sample
 
-from hypellm.helpers import amap
+import ujson
+
+from hypellm.helpers import aiterate, amap, astream, atake
+from hypellm.journal import journaled
+from hypellm.store import SequenceView
 from hypellm import IO, Example, Prompt, ReasoningSteps, DataModel, settings
 
 from .inferred import inferred
-from .base import client
+from .base import build_messages, complete
+
+logger = logging.getLogger(__name__)
 
 
 async def reasoned(
@@ -35,33 +43,42 @@ async def reasoned(
     assert 1 <= branching_factor <= 8, "branching_factor must be between 1 and 8"
 
     if concurrency is None:
-        concurrency = settings.concurrency
+        concurrency = settings.call_concurrency
 
     assert concurrency > 0, "concurrency must be greater than 0"
 
     # Sample data and infer a prompt
     sample_size = settings.batch_size
-    sample_indices = sample(range(len(data)), k=sample_size)
+
+    async def sample_indices_of_data() -> list[int]:
+        return sample(range(len(data)), k=sample_size)
+
+    sample_indices = await journaled(
+        "reasoned.sample", [len(data), sample_size], sample_indices_of_data, list[int]
+    )
     sample_data = [data[i] for i in sample_indices]
 
     # Sample prompt is f(inputs) => outputs
     if prompt is None:
-        prompt = await inferred(sample_data, settings.batch_size, concurrency)
+        prompt = await journaled(
+            "reasoned.prompt",
+            sample_data,
+            partial(inferred, sample_data, settings.batch_size, concurrency),
+            Prompt,
+        )
 
     # Create a sample of inputs => (thought[], outputs)
-    sample_reasonings = await amap(
-        partial(infill_reasoning, prompt, branching_factor),
-        sample_data,
-        batch_size=1,
-        concurrency=concurrency,
+    sample_reasonings = await infill_all(
+        prompt, branching_factor, sample_data, concurrency, phase="reasoned.few_shot"
     )
 
     # Now generate reasonings for remaining data
-    remaining_indices = [i for i in range(len(data)) if i not in sample_indices]
-    remaining_data = [data[i] for i in remaining_indices]
+    sampled = set(sample_indices)
+    remaining_indices = [i for i in range(len(data)) if i not in sampled]
+    remaining_data = SequenceView(data, remaining_indices)
     few_shot_prompt = prompt.update(
         examples=[
-            Example(
+            Example.trusted(
                 inputs=datum.inputs,
                 outputs=datum.outputs,
                 reasoning=reasoning,
@@ -69,11 +86,8 @@ async def reasoned(
             for datum, reasoning in zip(sample_data, sample_reasonings)
         ]
     )
-    remaining_reasonings = await amap(
-        partial(infill_reasoning, few_shot_prompt, branching_factor),
-        remaining_data,
-        batch_size=1,
-        concurrency=concurrency,
+    remaining_reasonings = await infill_all(
+        few_shot_prompt, branching_factor, remaining_data, concurrency, phase="reasoned.remainder"
     )
 
     # Combine results in original order
@@ -86,10 +100,170 @@ async def reasoned(
     return few_shot_prompt, results
 
 
+async def reasoned_stream(
+    data: Union[Iterable[Example], AsyncIterable[Example]],
+    branching_factor: int = 3,
+    concurrency: Optional[int] = None,
+    prompt: Optional[Prompt] = None,
+) -> AsyncIterator[Example]:
+    """
+    Streaming variant of `reasoned` that yields examples with reasoning as they complete.
+
+    The first `settings.batch_size` examples are used as the sample for the few-shot prompt, so
+    the rest of the data is only pulled once the prompt is ready.
+    """
+    assert 1 <= branching_factor <= 8, "branching_factor must be between 1 and 8"
+
+    if concurrency is None:
+        concurrency = settings.call_concurrency
+
+    assert concurrency > 0, "concurrency must be greater than 0"
+
+    stream = aiterate(data)
+    sample_data = await atake(stream, settings.batch_size)
+    if not sample_data:
+        return
+
+    if prompt is None:
+        prompt = await journaled(
+            "reasoned.prompt",
+            sample_data,
+            partial(inferred, sample_data, settings.batch_size, concurrency),
+            Prompt,
+        )
+
+    sample_reasonings = await infill_all(
+        prompt, branching_factor, sample_data, concurrency, phase="reasoned.few_shot"
+    )
+    sample_examples = [
+        datum.update(reasoning=reasoning)
+        for datum, reasoning in zip(sample_data, sample_reasonings)
+    ]
+    for example in sample_examples:
+        yield example
+
+    few_shot_prompt = prompt.update(
+        examples=[
+            Example.trusted(inputs=datum.inputs, outputs=datum.outputs, reasoning=datum.reasoning)
+            for datum in sample_examples
+        ]
+    )
+
+    batch_size = settings.reasoning_batch_size
+
+    async def reason(batch: Union[Example, list[Example]]) -> list[Example]:
+        batch = [batch] if batch_size == 1 else batch
+        reasonings = await infill_reasonings(few_shot_prompt, branching_factor, batch)
+        return [datum.update(reasoning=reasoning) for datum, reasoning in zip(batch, reasonings)]
+
+    async for _, examples in astream(
+        reason,
+        stream,
+        batch_size=batch_size,
+        concurrency=concurrency,
+        phase="reasoned_stream.remainder",
+        params=[few_shot_prompt, branching_factor],
+        result_type=list[Example],
+    ):
+        for example in examples:
+            yield example
+
+
+async def infill_all(
+    fn_prompt: Prompt,
+    branching_factor: int,
+    data: list[Example],
+    concurrency: int,
+    phase: str,
+) -> list[ReasoningSteps]:
+    """Infill reasoning for every example, `settings.reasoning_batch_size` examples per call."""
+    batch_size = settings.reasoning_batch_size
+    if batch_size == 1:
+        return await amap(
+            partial(infill_reasoning, fn_prompt, branching_factor),
+            data,
+            batch_size=1,
+            concurrency=concurrency,
+            phase=phase,
+            params=[fn_prompt, branching_factor],
+            result_type=ReasoningSteps,
+        )
+
+    batches = await amap(
+        partial(infill_reasonings, fn_prompt, branching_factor),
+        data,
+        batch_size=batch_size,
+        concurrency=concurrency,
+        phase=phase,
+        params=[fn_prompt, branching_factor],
+        result_type=list[ReasoningSteps],
+    )
+    return list(chain.from_iterable(batches))
+
+
 async def infill_reasoning(
     fn_prompt: Prompt, branching_factor: int, datum: Example
 ) -> ReasoningSteps:
-    user_prompt = Prompt(
+    branches: ThoughtBranches = await complete(
+        response_model=ThoughtBranches,
+        messages=build_messages(
+            static=[
+                fn_prompt.message("system"),
+                reasoning_prompt(branching_factor).message("user"),
+            ],
+            dynamic=[datum.message("user")],
+        ),
+        recipe="reasoned",
+    )
+    return branches.best_reasoning
+
+
+async def infill_reasonings(
+    fn_prompt: Prompt, branching_factor: int, data: list[Example]
+) -> list[ReasoningSteps]:
+    """
+    Infill reasoning for several examples in a single request.
+
+    The few-shot prompt is sent once for the whole batch and each result is mapped back to its
+    example by id. Examples missing from the response, or the whole batch if the response
+    fails validation, are retried one after the other with `infill_reasoning`, so a batch never
+    has more than one call in flight and the caller's concurrency holds.
+    """
+    if len(data) == 1:
+        return [await infill_reasoning(fn_prompt, branching_factor, data[0])]
+
+    try:
+        response: BatchedThoughtBranches = await complete(
+            response_model=BatchedThoughtBranches,
+            messages=build_messages(
+                static=[
+                    fn_prompt.message("system"),
+                    batched_reasoning_prompt(branching_factor).message("user"),
+                ],
+                dynamic=[
+                    {
+                        "role": "user",
+                        "content": ujson.dumps([{"id": i, **d.dict()} for i, d in enumerate(data)]),
+                    },
+                ],
+            ),
+            recipe="reasoned",
+        )
+        reasonings = {item.id: item.best_reasoning for item in response.items}
+    except Exception:
+        logger.warning("Batched reasoning failed, retrying examples individually", exc_info=True)
+        reasonings = {}
+
+    for i in range(len(data)):
+        if i not in reasonings:
+            reasonings[i] = await infill_reasoning(fn_prompt, branching_factor, data[i])
+
+    return [reasonings[i] for i in range(len(data))]
+
+
+@lru_cache(maxsize=None)
+def reasoning_prompt(branching_factor: int) -> Prompt:
+    return Prompt(
         intent="Find the best reasoning trajectory to go from the inputs to the outputs.",
         dos=[
             f"Explore {branching_factor} step by step reasoning trajectories",
@@ -100,15 +274,23 @@ async def infill_reasoning(
             "Skip any steps in your reasoning",
         ],
     )
-    branches: ThoughtBranches = await client.chat.completions.create(
-        response_model=ThoughtBranches,
-        messages=[
-            {"role": "system", "content": fn_prompt.json()},
-            {"role": "user", "content": user_prompt.json()},
-            {"role": "user", "content": datum.json()},
+
+
+@lru_cache(maxsize=None)
+def batched_reasoning_prompt(branching_factor: int) -> Prompt:
+    return Prompt(
+        intent="For each example, find the best reasoning trajectory to go from the inputs to the outputs.",
+        dos=[
+            f"Explore {branching_factor} step by step reasoning trajectories for each example",
+            "Reflect on the reasoning trajectories",
+            "Select the best reasoning trajectory for each example",
+            "Return exactly one item per example, with the example's id",
+        ],
+        donts=[
+            "Skip any steps in your reasoning",
+            "Skip any examples",
         ],
     )
-    return branches.best_reasoning
 
 
 class ReasoningTrajectory(DataModel):
@@ -120,3 +302,11 @@ class ReasoningTrajectory(DataModel):
 class ThoughtBranches(DataModel):
     trajectories: list[ReasoningTrajectory]
     best_reasoning: ReasoningSteps
+
+
+class IdentifiedThoughtBranches(ThoughtBranches):
+    id: int
+
+
+class BatchedThoughtBranches(DataModel):
+    items: list[IdentifiedThoughtBranches]
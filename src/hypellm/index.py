@@ -0,0 +1,328 @@
+import heapq
+import json
+import mmap
+import sys
+from array import array
+from collections import defaultdict
+from itertools import count
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from hypellm.dedupe import normalize_question
+from hypellm.types import DataModel
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError(
+        "hypellm.index requires numpy, install it with `pip install hypellm[index]`"
+    ) from None
+
+FORMAT_VERSION = 2
+BLOBS = (
+    "terms",
+    "term_offsets",
+    "postings",
+    "impacts",
+    "posting_offsets",
+    "question_lengths",
+    "question_docs",
+    "question_doc_offsets",
+    "questions",
+    "question_offsets",
+    "documents",
+    "document_offsets",
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return normalize_question(text).split()
+
+
+def _strings(values: list[str]) -> tuple[bytes, array]:
+    """Concatenated UTF-8 strings and the offsets delimiting them."""
+    encoded = [value.encode() for value in values]
+    offsets = array("Q", [0])
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    return b"".join(encoded), offsets
+
+
+class QuestionIndex:
+    """
+    Compact BM25 index from generated questions to the documents that answer them.
+
+    Documents are interned, so each is stored once and referenced by id. The index is a set
+    of flat binary blobs (sorted vocabulary, postings, offsets) that are searched in place,
+    so an index saved with `save` can be memory-mapped by `load` without building any
+    per-term Python objects. Each posting stores its precomputed BM25 impact, so a query
+    only sums the impacts of its terms' postings, with NumPy.
+    """
+
+    def __init__(
+        self,
+        blobs: dict[str, memoryview],
+        meta: dict[str, Any],
+        document_type: Optional[type[DataModel]] = None,
+    ):
+        self.meta = meta
+        self._blobs = blobs
+        self.document_type = document_type
+        self.k1 = meta["k1"]
+        self.b = meta["b"]
+        self.avg_length = meta["avg_length"]
+        self._terms = blobs["terms"]
+        self._term_offsets = blobs["term_offsets"].cast("Q")
+        self._postings = np.frombuffer(blobs["postings"], dtype=np.uint32)
+        self._impacts = np.frombuffer(blobs["impacts"], dtype=np.float32)
+        self._posting_offsets = blobs["posting_offsets"].cast("Q")
+        self._question_lengths = blobs["question_lengths"].cast("I")
+        self._question_docs = blobs["question_docs"].cast("I")
+        self._question_doc_offsets = blobs["question_doc_offsets"].cast("Q")
+        self._questions = blobs["questions"]
+        self._question_offsets = blobs["question_offsets"].cast("Q")
+        self._documents = blobs["documents"]
+        self._document_offsets = blobs["document_offsets"].cast("Q")
+        self._mmaps: list[mmap.mmap] = []
+
+    @classmethod
+    def build(
+        cls,
+        mapping: dict[str, list[DataModel]],
+        k1: float = 1.2,
+        b: float = 0.75,
+    ) -> "QuestionIndex":
+        """
+        Build an index from the output of `recipes.questions`.
+
+        `document` returns the documents as instances of their type in `mapping`, as an index
+        loaded with that `document_type` does.
+        """
+        document_ids: dict[str, int] = {}
+        # Assigns the next id to each term on first lookup
+        term_ids: defaultdict[str, int] = defaultdict(count().__next__)
+        questions, lengths, token_terms = [], array("I"), array("I")
+        doc_blob, doc_offsets = array("I"), array("Q", [0])
+        document_type = None
+
+        for question, documents in mapping.items():
+            tokens = tokenize(question)
+            token_terms.extend(map(term_ids.__getitem__, tokens))
+            questions.append(question)
+            lengths.append(len(tokens))
+
+            for document in documents:
+                document_type = document_type or type(document)
+                doc_blob.append(document_ids.setdefault(document.json(), len(document_ids)))
+            doc_offsets.append(len(doc_blob))
+
+        terms = sorted(term_ids)
+        term_blob, term_offsets = _strings(terms)
+        num_questions = len(questions)
+        question_lengths = np.frombuffer(lengths, dtype=np.uint32)
+        avg_length = float(question_lengths.mean()) if num_questions else 0.0
+
+        # Count each (term, question) pair: sorted keys group the postings by term, in
+        # vocabulary order, and by question within a term
+        rank = np.empty(len(terms), dtype=np.int64)
+        rank[[term_ids[term] for term in terms]] = np.arange(len(terms))
+        keys = rank[np.frombuffer(token_terms, dtype=np.uint32)] * max(num_questions, 1)
+        keys += np.repeat(np.arange(num_questions), question_lengths)
+        keys, counts = np.unique(keys, return_counts=True)
+        term_of, postings = np.divmod(keys, max(num_questions, 1))
+        postings = postings.astype(np.uint32)
+        frequencies = np.bincount(term_of, minlength=len(terms))
+        posting_offsets = np.zeros(len(terms) + 1, dtype=np.uint64)
+        np.cumsum(frequencies, out=posting_offsets[1:])
+
+        idf = np.log(1 + (num_questions - frequencies + 0.5) / (frequencies + 0.5))
+        norm = 1 - b + b * question_lengths[postings] / (avg_length or 1.0)
+        impacts = np.repeat(idf, frequencies) * counts * (k1 + 1) / (counts + k1 * norm)
+
+        question_blob, question_offsets = _strings(questions)
+        document_blob, document_offsets = _strings(list(document_ids))
+
+        blobs = dict(
+            zip(
+                BLOBS,
+                (
+                    term_blob,
+                    term_offsets,
+                    postings,
+                    impacts.astype(np.float32),
+                    posting_offsets,
+                    lengths,
+                    doc_blob,
+                    doc_offsets,
+                    question_blob,
+                    question_offsets,
+                    document_blob,
+                    document_offsets,
+                ),
+            )
+        )
+        meta = {
+            "version": FORMAT_VERSION,
+            "byteorder": sys.byteorder,
+            "k1": k1,
+            "b": b,
+            "avg_length": avg_length,
+        }
+        blobs = {name: memoryview(blob).cast("B") for name, blob in blobs.items()}
+        return cls(blobs, meta, document_type)
+
+    def save(self, directory: Union[str, Path]):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in BLOBS:
+            (directory / f"{name}.bin").write_bytes(self._blobs[name])
+        (directory / "meta.json").write_text(json.dumps(self.meta))
+
+    @classmethod
+    def load(
+        cls,
+        directory: Union[str, Path],
+        document_type: Optional[type[DataModel]] = None,
+    ) -> "QuestionIndex":
+        """Memory-map an index saved with `save`."""
+        directory = Path(directory)
+        meta = json.loads((directory / "meta.json").read_text())
+        assert meta["version"] == FORMAT_VERSION, f"unsupported index version {meta['version']}"
+        assert meta["byteorder"] == sys.byteorder, "index was saved with a different byte order"
+
+        blobs, mmaps = {}, []
+        for name in BLOBS:
+            with (directory / f"{name}.bin").open("rb") as f:
+                if f.seek(0, 2) == 0:
+                    blobs[name] = memoryview(b"")
+                    continue
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            mmaps.append(mm)
+            blobs[name] = memoryview(mm)
+
+        index = cls(blobs, meta, document_type)
+        index._mmaps = mmaps
+        return index
+
+    def close(self):
+        # The arrays hold exports of the blobs, which cannot be released while they exist
+        self._postings = self._impacts = None
+        views = [view for view in vars(self).values() if isinstance(view, memoryview)]
+        for view in [*views, *self._blobs.values()]:
+            view.release()
+        for mm in self._mmaps:
+            mm.close()
+
+    def __len__(self) -> int:
+        return len(self._question_lengths)
+
+    @property
+    def num_documents(self) -> int:
+        return len(self._document_offsets) - 1
+
+    def question(self, question_id: int) -> str:
+        start, end = self._question_offsets[question_id], self._question_offsets[question_id + 1]
+        return bytes(self._questions[start:end]).decode()
+
+    def document(self, document_id: int) -> Union[DataModel, dict]:
+        start, end = self._document_offsets[document_id], self._document_offsets[document_id + 1]
+        raw = bytes(self._documents[start:end])
+        if self.document_type is not None:
+            return self.document_type.model_validate_json(raw)
+        return json.loads(raw)
+
+    def documents_of(self, question_id: int) -> list[int]:
+        start = self._question_doc_offsets[question_id]
+        end = self._question_doc_offsets[question_id + 1]
+        return list(self._question_docs[start:end])
+
+    def search_questions(self, query: str, k: int = 10) -> list[tuple[int, float]]:
+        """
+        The `k` best matching question ids for `query`, with their BM25 scores.
+
+        Terms are visited from rarest to most common. Once the k-th best score among the
+        questions matching the rarer terms is at least the most the remaining terms could add
+        up to, no other question can make the top `k`, so the postings of the common terms are
+        only probed for those candidates instead of being summed in full (MaxScore pruning).
+        """
+        spans = sorted(
+            (span for term in set(tokenize(query)) if (span := self._span_of(term))),
+            key=lambda span: span[1] - span[0],
+        )
+        if not spans:
+            return []
+
+        bounds = [float(self._impacts[start:end].max()) for start, end in spans]
+        candidates = None
+        for i, (start, end) in enumerate(spans[:-1]):
+            if (end - start) * 8 > len(self):
+                break
+            postings = self._postings[start:end]
+            candidates = postings if candidates is None else np.union1d(candidates, postings)
+            if len(candidates) < k:
+                continue
+            scores = self._probe(candidates, spans)
+            if -np.partition(-scores, k - 1)[k - 1] >= sum(bounds[i + 1 :]):
+                return self._top(candidates, scores, k)
+
+        return self._top(*self._accumulate(spans), k)
+
+    def search(self, query: str, k: int = 10) -> list[tuple[int, float]]:
+        """
+        The `k` best matching document ids for `query`, with their scores.
+
+        A document scores as well as the best matching question it answers.
+        """
+        scores: dict[int, float] = {}
+        for question_id, score in self.search_questions(query, k=max(k * 4, 32)):
+            for document_id in self.documents_of(question_id):
+                scores[document_id] = max(score, scores.get(document_id, 0.0))
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def _probe(self, candidates: "np.ndarray", spans: list[tuple[int, int]]) -> "np.ndarray":
+        """Scores of the `candidates` question ids, looked up in each term's sorted postings."""
+        scores = np.zeros(len(candidates))
+        for start, end in spans:
+            postings = self._postings[start:end]
+            positions = np.searchsorted(postings, candidates).clip(max=len(postings) - 1)
+            found = postings[positions] == candidates
+            scores[found] += self._impacts[start:end][positions[found]]
+        return scores
+
+    def _accumulate(self, spans: list[tuple[int, int]]) -> tuple["np.ndarray", "np.ndarray"]:
+        """Every question id matching any of the terms, with its score."""
+        if len(spans) == 1:
+            ((start, end),) = spans
+            return self._postings[start:end], self._impacts[start:end]
+
+        question_ids = np.concatenate([self._postings[start:end] for start, end in spans])
+        impacts = np.concatenate([self._impacts[start:end] for start, end in spans])
+        if len(question_ids) * 8 < len(self):
+            question_ids, inverse = np.unique(question_ids, return_inverse=True)
+            return question_ids, np.bincount(inverse, weights=impacts)
+        scores = np.bincount(question_ids, weights=impacts, minlength=len(self))
+        question_ids = np.flatnonzero(scores)
+        return question_ids, scores[question_ids]
+
+    @staticmethod
+    def _top(question_ids: "np.ndarray", scores: "np.ndarray", k: int) -> list[tuple[int, float]]:
+        top = np.argpartition(-scores, k)[:k] if len(scores) > k else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(question_ids[i]), float(scores[i])) for i in top]
+
+    def _term(self, i: int) -> bytes:
+        return bytes(self._terms[self._term_offsets[i] : self._term_offsets[i + 1]])
+
+    def _span_of(self, term: str) -> Optional[tuple[int, int]]:
+        """The start and end of the postings of `term`, or None if it is not indexed."""
+        target = term.encode()
+        low, high = 0, len(self._term_offsets) - 1
+        while low < high:
+            mid = (low + high) // 2
+            if self._term(mid) < target:
+                low = mid + 1
+            else:
+                high = mid
+        if low == len(self._term_offsets) - 1 or self._term(low) != target:
+            return None
+        return self._posting_offsets[low], self._posting_offsets[low + 1]
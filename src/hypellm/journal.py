@@ -0,0 +1,129 @@
+import hashlib
+import json
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional, Union
+
+from pydantic import TypeAdapter
+from pydantic_core import to_jsonable_python
+
+from hypellm.settings import settings
+from hypellm.types import T
+
+
+class Journal:
+    """
+    Append-only JSONL record of finished units of work.
+
+    Each line maps a key built from the phase, the index of the unit and a hash of its inputs
+    to the unit's result. A restarted job that finds a key in the journal reuses the recorded
+    result instead of recomputing it. A partially written last line (e.g. from a killed
+    process) is cut off on load, so that new records start on a line of their own.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._entries: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+        if self.path.exists():
+            end = 0
+            with self.path.open("rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    end += len(line)
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._entries[entry["key"]] = entry["value"]
+            if end < self.path.stat().st_size:
+                with self.path.open("rb+") as f:
+                    f.truncate(end)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("a")
+
+    @staticmethod
+    def digest(data: Any) -> str:
+        payload = json.dumps(to_jsonable_python(data), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @classmethod
+    def key(cls, phase: str, index: int, data: Any) -> str:
+        return f"{phase}:{index}:{cls.digest(data)}"
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, result_type: Any = Any) -> Any:
+        return _adapter(result_type).validate_python(self._entries[key])
+
+    def record(self, key: str, value: Any):
+        value = to_jsonable_python(value)
+        line = json.dumps({"key": key, "value": value}, separators=(",", ":"))
+        with self._lock:
+            self._entries[key] = value
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+@lru_cache(maxsize=None)
+def _adapter(result_type: Any) -> TypeAdapter:
+    return TypeAdapter(result_type)
+
+
+def journal_phase(phase: str, params: Any = None) -> str:
+    """
+    `phase` qualified by a hash of `params`, the call parameters its results depend on besides
+    the data of each unit (e.g. the prompt), so changing them does not reuse stale results.
+    """
+    if params is None:
+        return phase
+    return f"{phase}@{Journal.digest(params)[:16]}"
+
+
+_journals: dict[Path, Journal] = {}
+
+
+def get_journal() -> Optional[Journal]:
+    """The journal at `settings.journal_path`, or None if journaling is disabled."""
+    path = settings.journal_path
+    if path is None:
+        return None
+    if path not in _journals:
+        _journals[path] = Journal(path)
+    return _journals[path]
+
+
+async def journaled(
+    phase: str,
+    data: Any,
+    compute: Callable[[], Awaitable[T]],
+    result_type: Any = Any,
+    index: int = 0,
+    params: Any = None,
+) -> T:
+    """
+    Run a single unit of work through the journal, reusing a recorded result if present.
+
+    `params` are the call parameters the result depends on besides `data`, see `journal_phase`.
+    """
+    journal = get_journal()
+    if journal is None:
+        return await compute()
+
+    key = journal.key(journal_phase(phase, params), index, data)
+    if key in journal:
+        return journal.get(key, result_type)
+    result = await compute()
+    journal.record(key, result)
+    return result
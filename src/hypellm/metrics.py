@@ -0,0 +1,303 @@
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+
+from hypellm.types import DataModel
+
+logger = logging.getLogger(__name__)
+
+current_recipe: ContextVar[Optional[str]] = ContextVar("hypellm_recipe", default=None)
+current_phase: ContextVar[Optional[str]] = ContextVar("hypellm_phase", default=None)
+current_batch: ContextVar[Optional[int]] = ContextVar("hypellm_batch", default=None)
+
+
+class CallEvent(DataModel):
+    """One LLM call, emitted to every hook when the call finishes or fails."""
+
+    recipe: Optional[str] = None
+    phase: Optional[str] = None
+    batch: Optional[int] = None
+    model: Optional[str] = None
+    endpoint: Optional[str] = None
+    started: float
+    queue_wait: float = 0.0
+    latency: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    validation_retries: int = 0
+    rate_limit_retries: int = 0
+    cost: Optional[float] = None
+    cache_hit: bool = False
+    hedged: bool = False
+    error: Optional[str] = None
+
+
+Hook = Callable[[CallEvent], None]
+hooks: list[Hook] = []
+
+
+def add_hook(hook: Hook) -> Hook:
+    hooks.append(hook)
+    return hook
+
+
+def remove_hook(hook: Hook):
+    hooks.remove(hook)
+
+
+def emit(event: CallEvent):
+    for hook in list(hooks):
+        try:
+            hook(event)
+        except Exception:
+            logger.exception("Metrics hook %r failed", hook)
+
+
+@contextmanager
+def scope(
+    recipe: Optional[str] = None, phase: Optional[str] = None, batch: Optional[int] = None
+) -> Iterator[None]:
+    """Attribute the LLM calls made inside the block to a recipe, phase and/or batch."""
+    tokens = [
+        (var, var.set(value))
+        for var, value in ((current_recipe, recipe), (current_phase, phase), (current_batch, batch))
+        if value is not None
+    ]
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+LATENCY_SAMPLES = 1024
+
+
+class PhaseMetrics:
+    """
+    Totals for the calls of one (recipe, phase).
+
+    Latencies are kept as a uniform random sample of at most `LATENCY_SAMPLES` calls
+    (reservoir sampling), so memory stays bounded however long the process runs, and the
+    percentiles are estimated from it.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.hedges = 0
+        self.latencies: list[float] = []
+        self.queue_wait = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.validation_retries = 0
+        self.rate_limit_retries = 0
+        self.cost = 0.0
+
+    def record(self, event: CallEvent):
+        self.calls += 1
+        self.errors += event.error is not None
+        self.cache_hits += event.cache_hit
+        self.hedges += event.hedged
+        if len(self.latencies) < LATENCY_SAMPLES:
+            self.latencies.append(event.latency)
+        elif (i := random.randrange(self.calls)) < LATENCY_SAMPLES:
+            self.latencies[i] = event.latency
+        self.queue_wait += event.queue_wait
+        self.prompt_tokens += event.prompt_tokens
+        self.completion_tokens += event.completion_tokens
+        self.validation_retries += event.validation_retries
+        self.rate_limit_retries += event.rate_limit_retries
+        self.cost += event.cost or 0.0
+
+
+class MetricsAggregator:
+    """In-memory hook that totals call events per (recipe, phase)."""
+
+    COLUMNS = (
+        f"{'recipe/phase':<32} {'calls':>6} {'errors':>6} {'p50 s':>7} {'p99 s':>7} "
+        f"{'wait s':>8} {'prompt':>9} {'compl.':>8} {'retries':>7} {'cost $':>8}"
+    )
+
+    def __init__(self):
+        self.phases: defaultdict[tuple[Optional[str], Optional[str]], PhaseMetrics] = defaultdict(
+            PhaseMetrics
+        )
+        self._lock = threading.Lock()
+
+    def __call__(self, event: CallEvent):
+        with self._lock:
+            self.phases[event.recipe, event.phase].record(event)
+
+    def reset(self):
+        with self._lock:
+            self.phases.clear()
+
+    def report(self, phase: Optional[str] = None) -> str:
+        """A table of the aggregated calls, optionally only those of `phase`."""
+        lines = [self.COLUMNS]
+        with self._lock:
+            items = sorted(self.phases.items(), key=lambda item: tuple(map(str, item[0])))
+            for (recipe, event_phase), metrics in items:
+                if phase is not None and event_phase != phase:
+                    continue
+                name = "/".join(part for part in (recipe, event_phase) if part) or "-"
+                lines.append(
+                    f"{name:<32} {metrics.calls:>6} {metrics.errors:>6} "
+                    f"{percentile(metrics.latencies, 0.5):>7.2f} "
+                    f"{percentile(metrics.latencies, 0.99):>7.2f} "
+                    f"{metrics.queue_wait:>8.2f} {metrics.prompt_tokens:>9} "
+                    f"{metrics.completion_tokens:>8} "
+                    f"{metrics.validation_retries + metrics.rate_limit_retries:>7} "
+                    f"{metrics.cost:>8.4f}"
+                )
+        return "\n".join(lines) if len(lines) > 1 else ""
+
+
+aggregator = add_hook(MetricsAggregator())
+
+
+class OpenTelemetryExporter:
+    """
+    Hook that exports call events as OpenTelemetry spans and metrics.
+
+    Uses the globally configured tracer and meter providers unless given others, and the
+    `gen_ai.*` semantic convention attribute names. Requires `opentelemetry-api`.
+    """
+
+    def __init__(self, tracer_provider: Any = None, meter_provider: Any = None):
+        from opentelemetry import metrics, trace
+
+        self.tracer = trace.get_tracer("hypellm", tracer_provider=tracer_provider)
+        meter = metrics.get_meter("hypellm", meter_provider=meter_provider)
+        self.duration = meter.create_histogram(
+            "gen_ai.client.operation.duration", unit="s", description="LLM call latency"
+        )
+        self.tokens = meter.create_counter(
+            "gen_ai.client.token.usage", unit="{token}", description="Tokens used by LLM calls"
+        )
+        self.cost = meter.create_counter("hypellm.cost", unit="USD", description="Estimated cost")
+
+    def __call__(self, event: CallEvent):
+        attributes = {
+            key: value
+            for key, value in {
+                "gen_ai.request.model": event.model,
+                "server.address": event.endpoint,
+                "hypellm.recipe": event.recipe,
+                "hypellm.phase": event.phase,
+                "hypellm.batch": event.batch,
+            }.items()
+            if value is not None
+        }
+        start = event.started + event.queue_wait
+        span = self.tracer.start_span(
+            f"hypellm {event.recipe or 'call'}",
+            start_time=int(start * 1e9),
+            attributes={
+                **attributes,
+                "gen_ai.usage.input_tokens": event.prompt_tokens,
+                "gen_ai.usage.output_tokens": event.completion_tokens,
+                "hypellm.queue_wait": event.queue_wait,
+                "hypellm.validation_retries": event.validation_retries,
+                "hypellm.rate_limit_retries": event.rate_limit_retries,
+                "hypellm.cache_hit": event.cache_hit,
+                "hypellm.hedged": event.hedged,
+                **({"error.type": event.error} if event.error else {}),
+            },
+        )
+        span.end(end_time=int((start + event.latency) * 1e9))
+
+        self.duration.record(event.latency, attributes)
+        self.tokens.add(event.prompt_tokens, {**attributes, "gen_ai.token.type": "input"})
+        self.tokens.add(event.completion_tokens, {**attributes, "gen_ai.token.type": "output"})
+        if event.cost:
+            self.cost.add(event.cost, attributes)
+
+
+class CallTracker:
+    """Collects the measurements of one call as it goes through the limiter and instructor."""
+
+    def __init__(self, model: Optional[str], recipe: Optional[str]):
+        self.event = dict(
+            recipe=recipe or current_recipe.get(),
+            phase=current_phase.get(),
+            batch=current_batch.get(),
+            model=model,
+            started=time.time(),
+        )
+        self.created = time.monotonic()
+        self.attempt_started: Optional[float] = None
+        self.attempts = 0
+        self.validation_retries = 0
+        self.completion: Any = None
+
+    def attempt(self):
+        self.attempt_started = None
+        self.attempts += 1
+
+    def sent(self):
+        """Marks a request of the current attempt leaving the limiter, the first one starting it."""
+        now = time.monotonic()
+        self.event.setdefault("queue_wait", now - self.created)
+        if self.attempt_started is None:
+            self.attempt_started = now
+
+    def finish(self, completion: Any = None, error: Optional[BaseException] = None, **fields):
+        end = time.monotonic()
+        if self.attempt_started is not None:
+            self.event["latency"] = end - self.attempt_started
+        else:
+            self.event["latency"] = end - self.created
+
+        usage = getattr(completion, "usage", None)
+        if usage is not None:
+            self.event["prompt_tokens"] = getattr(usage, "prompt_tokens", None) or 0
+            self.event["completion_tokens"] = getattr(usage, "completion_tokens", None) or 0
+            details = getattr(usage, "prompt_tokens_details", None)
+            self.event["cached_tokens"] = getattr(details, "cached_tokens", None) or 0
+        if completion is not None:
+            self.event["cost"] = estimate_cost(completion)
+        if error is not None:
+            self.event["error"] = type(error).__name__
+
+        emit(
+            CallEvent(
+                **self.event,
+                validation_retries=self.validation_retries,
+                rate_limit_retries=max(0, self.attempts - 1),
+                **fields,
+            )
+        )
+
+
+current_call: ContextVar[Optional[CallTracker]] = ContextVar("hypellm_call", default=None)
+
+
+def on_parse_error(*args, **kwargs):
+    """instructor `parse:error` hook counting validation retries of the current call."""
+    if (tracker := current_call.get()) is not None:
+        tracker.validation_retries += 1
+
+
+def estimate_cost(completion: Any) -> Optional[float]:
+    try:
+        import litellm
+
+        return litellm.completion_cost(completion_response=completion)
+    except Exception:
+        return None
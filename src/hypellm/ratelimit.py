@@ -0,0 +1,211 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from hypellm.settings import settings
+from hypellm.types import T
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Whether `error`, or any exception it was raised from, is an HTTP 429."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if getattr(error, "status_code", None) == 429 or "RateLimit" in type(error).__name__:
+            return True
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def estimate_tokens(messages: Any) -> int:
+    """Rough token count of a request, assuming ~4 characters per token."""
+    return len(json.dumps(messages, default=str)) // 4 + 1
+
+
+class TokenBucket:
+    """
+    Refills `rate` units per minute, holding at most one second's worth (or `capacity`).
+
+    A request larger than the capacity waits for a full bucket and is then charged in full,
+    leaving the bucket in debt that later requests wait out, so the long-run rate holds.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate / 60
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        return max(0.0, (min(amount, self.capacity) - self.tokens) / self.rate)
+
+    def take(self, amount: float):
+        self.tokens -= amount
+
+
+class RateLimiter:
+    """
+    Shared throttle for LLM calls.
+
+    Enforces requests-per-minute and estimated tokens-per-minute with token buckets, and
+    adjusts the number of concurrent calls AIMD-style: the limit grows by roughly one per
+    window of successful calls, and is cut multiplicatively on rate-limit errors or when
+    latency degrades past `latency_tolerance` times the best latency seen. Calls that fail
+    with a 429 are retried with jittered exponential backoff, during which no new calls start.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_concurrency: int = 10,
+        min_concurrency: int = 1,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        latency_tolerance: float = 3.0,
+    ):
+        assert 0 < min_concurrency <= max_concurrency, "invalid concurrency bounds"
+
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.latency_tolerance = latency_tolerance
+
+        self.in_flight = 0
+        self.started = 0
+        self.rate_limited = 0
+        self.best_latency: Optional[float] = None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, tokens: int) -> float:
+        """Take a slot and return 0, or return how long to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self.in_flight >= int(self.concurrency):
+                return 0.01
+
+            wait = 0.0
+            for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                if bucket is not None:
+                    bucket.refill(now)
+                    wait = max(wait, bucket.wait_time(amount))
+            if wait > 0:
+                return wait
+
+            for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                if bucket is not None:
+                    bucket.take(amount)
+            self.in_flight += 1
+            self.started += 1
+            return 0.0
+
+    def _release(self, latency: Optional[float] = None, error: Optional[BaseException] = None):
+        with self._lock:
+            self.in_flight -= 1
+            if error is not None:
+                if is_rate_limit_error(error):
+                    self.rate_limited += 1
+                    self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+                return
+
+            if self.best_latency is None or latency < self.best_latency:
+                self.best_latency = latency
+            if latency > self.best_latency * self.latency_tolerance:
+                self.concurrency = max(self.min_concurrency, self.concurrency * 0.9)
+            else:
+                self.concurrency = min(
+                    self.max_concurrency, self.concurrency + 1 / self.concurrency
+                )
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.backoff * 2**attempt)
+        delay = random.uniform(delay / 2, delay)
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    async def attempt(self, call: Callable[[], Awaitable[T]], tokens: int = 0) -> T:
+        """Await `call()` once, in a concurrency slot and charged one request and `tokens`."""
+        while (wait := self._try_acquire(tokens)) > 0:
+            await asyncio.sleep(wait)
+
+        start = time.monotonic()
+        try:
+            result = await call()
+        except BaseException as e:
+            self._release(error=e)
+            raise
+        self._release(latency=time.monotonic() - start)
+        return result
+
+    async def retrying(self, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await `call()`, retrying it with backoff when it fails with a rate-limit error.
+
+        `call` is expected to go through `attempt` for every request it sends, so that
+        hedged and failed-over requests are throttled and charged like the first one.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await call()
+            except BaseException as e:
+                if attempt == self.max_retries or not is_rate_limit_error(e):
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+
+    async def run(self, call: Callable[[], Awaitable[T]], tokens: int = 0) -> T:
+        return await self.retrying(lambda: self.attempt(call, tokens))
+
+    def run_sync(self, call: Callable[[], T], tokens: int = 0) -> T:
+        for attempt in range(self.max_retries + 1):
+            while (wait := self._try_acquire(tokens)) > 0:
+                time.sleep(wait)
+
+            start = time.monotonic()
+            try:
+                result = call()
+            except BaseException as e:
+                self._release(error=e)
+                if attempt == self.max_retries or not is_rate_limit_error(e):
+                    raise
+                time.sleep(self._backoff(attempt))
+            else:
+                self._release(latency=time.monotonic() - start)
+                return result
+
+
+_limiters: dict[tuple, RateLimiter] = {}
+
+
+def get_limiter() -> RateLimiter:
+    """The process-wide limiter for the current rate limit settings."""
+    key = (
+        settings.requests_per_minute,
+        settings.tokens_per_minute,
+        settings.concurrency,
+        settings.rate_limit_retries,
+    )
+    if key not in _limiters:
+        _limiters[key] = RateLimiter(
+            requests_per_minute=settings.requests_per_minute,
+            tokens_per_minute=settings.tokens_per_minute,
+            max_concurrency=settings.concurrency,
+            max_retries=settings.rate_limit_retries,
+        )
+    return _limiters[key]
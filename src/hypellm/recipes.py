@@ -1,14 +1,26 @@
 from collections import defaultdict
-from typing import Optional
+from typing import AsyncIterable, AsyncIterator, Iterable, Optional, Sequence, Union
 
-from hypellm.helpers import amap, pmap
+from hypellm.helpers import aiterate, amap, astream, pmap
+from hypellm.impl import Impl, resolve
+from hypellm.store import SequenceView
 from hypellm import settings, Example, Prompt, DataModel
 
 
+def get_impl(impl: Union[str, Impl, None] = None) -> Impl:
+    """The impl selected for a call, defaulting to `settings.impl`."""
+    return settings.impl if impl is None else resolve(impl)
+
+
+def invert(datum: Example) -> Example:
+    return Example.trusted(inputs=datum.outputs, outputs=datum.inputs)
+
+
 async def inferred(
-    data: list[Example],
+    data: Sequence[Example],
     batch_size: Optional[int] = None,
     concurrency: Optional[int] = None,
+    impl: Union[str, Impl, None] = None,
 ) -> Prompt:
     """
     Infer a prompt from a list of datums.
@@ -20,22 +32,24 @@ async def inferred(
     Returns:
         A single Prompt object that could generate the examples
     """
-    return await settings.impl.inferred(data, batch_size, concurrency)
+    return await get_impl(impl).inferred(data, batch_size, concurrency)
 
 
 def inferred_sync(
-    data: list[Example],
+    data: Sequence[Example],
     batch_size: Optional[int] = None,
     concurrency: Optional[int] = None,
+    impl: Union[str, Impl, None] = None,
 ) -> Prompt:
-    return settings.impl.inferred_sync(data, batch_size, concurrency)
+    return get_impl(impl).inferred_sync(data, batch_size, concurrency)
 
 
 async def reasoned(
-    data: list[Example],
+    data: Sequence[Example],
     branching_factor: int = 3,
     concurrency: Optional[int] = None,
     prompt: Optional[Prompt] = None,
+    impl: Union[str, Impl, None] = None,
 ) -> tuple[Prompt, list[Example]]:
     """
     Generate hypothetical reasoning steps for a list of input/output examples.
@@ -44,26 +58,59 @@ async def reasoned(
         data: List of input/output example pairs to generate reasoning for
         batch_size: Number of examples to process at once
         concurrency: Maximum number of parallel operations
+        impl: Impl, or name of a registered impl, to use instead of `settings.impl`
     Returns:
         List of reasoning steps for each example in the input data
     """
-    return await settings.impl.reasoned(data, branching_factor, concurrency, prompt)
+    return await get_impl(impl).reasoned(data, branching_factor, concurrency, prompt)
 
 
 def reasoned_sync(
-    data: list[Example],
+    data: Sequence[Example],
     branching_factor: int = 3,
     concurrency: Optional[int] = None,
     prompt: Optional[Prompt] = None,
+    impl: Union[str, Impl, None] = None,
 ) -> tuple[Prompt, list[Example]]:
-    return settings.impl.reasoned_sync(data, branching_factor, concurrency, prompt)
+    return get_impl(impl).reasoned_sync(data, branching_factor, concurrency, prompt)
+
+
+async def reasoned_stream(
+    data: Union[Iterable[Example], AsyncIterable[Example]],
+    branching_factor: int = 3,
+    concurrency: Optional[int] = None,
+    prompt: Optional[Prompt] = None,
+    impl: Union[str, Impl, None] = None,
+) -> AsyncIterator[Example]:
+    """
+    Streaming variant of `reasoned` that yields examples with reasoning as they complete.
+
+    Examples are yielded in completion order, not input order. If no prompt is given, one is
+    inferred from the first `settings.batch_size` examples, which also become the few-shot
+    examples for the rest of the stream.
+
+    Args:
+        data: Iterable or async iterable of input/output example pairs
+        branching_factor: Number of reasoning trajectories to explore per example
+        concurrency: Maximum number of parallel operations
+        prompt: Optional prompt to use instead of inferring one
+        impl: Impl, or name of a registered impl, to use instead of `settings.impl`
+
+    Yields:
+        Each input example with its reasoning steps filled in
+    """
+    async for example in get_impl(impl).reasoned_stream(
+        data, branching_factor, concurrency, prompt
+    ):
+        yield example
 
 
 async def inverted(
-    data: list[Example],
+    data: Sequence[Example],
     branching_factor: int = 3,
     batch_size: Optional[int] = None,
     concurrency: Optional[int] = None,
+    impl: Union[str, Impl, None] = None,
 ) -> tuple[Prompt, list[Example]]:
     """
     Given a list of input/output examples, infers a prompt that could have generated those inputs from those outputs.
@@ -75,29 +122,53 @@ async def inverted(
         data: List of input/output example pairs
         batch_size: Number of examples to process at once
         concurrency: Maximum number of parallel operations
+        impl: Impl, or name of a registered impl, to use instead of `settings.impl`
 
     Returns:
         A list of inverted Datum objects with the reasoning steps added
     """
-    inverted_data = [Example(inputs=datum.outputs, outputs=datum.inputs) for datum in data]
-    prompt = await inferred(inverted_data, batch_size, concurrency)
-    return await reasoned(inverted_data, branching_factor, concurrency, prompt)
+    inverted_data = SequenceView(data, func=invert)
+    prompt = await inferred(inverted_data, batch_size, concurrency, impl=impl)
+    return await reasoned(inverted_data, branching_factor, concurrency, prompt, impl=impl)
 
 
 def inverted_sync(
-    data: list[Example],
+    data: Sequence[Example],
     branching_factor: int = 3,
     batch_size: Optional[int] = None,
     concurrency: Optional[int] = None,
+    impl: Union[str, Impl, None] = None,
 ) -> tuple[Prompt, list[Example]]:
-    inverted_data = [Example(inputs=datum.outputs, outputs=datum.inputs) for datum in data]
-    prompt = inferred_sync(inverted_data, batch_size, concurrency)
-    return reasoned_sync(inverted_data, branching_factor, concurrency, prompt)
+    inverted_data = SequenceView(data, func=invert)
+    prompt = inferred_sync(inverted_data, batch_size, concurrency, impl=impl)
+    return reasoned_sync(inverted_data, branching_factor, concurrency, prompt, impl=impl)
+
+
+async def inverted_stream(
+    data: Union[Iterable[Example], AsyncIterable[Example]],
+    branching_factor: int = 3,
+    concurrency: Optional[int] = None,
+    impl: Union[str, Impl, None] = None,
+) -> AsyncIterator[Example]:
+    """
+    Streaming variant of `inverted` that yields inverted examples as they complete.
+
+    Since the data is never fully materialized, the inverted prompt is inferred from the first
+    `settings.batch_size` examples rather than the whole dataset.
+    """
+
+    async def inverted_data() -> AsyncIterator[Example]:
+        async for datum in aiterate(data):
+            yield invert(datum)
+
+    async for example in reasoned_stream(inverted_data(), branching_factor, concurrency, impl=impl):
+        yield example
 
 
 async def questions(
-    data: list[DataModel],
+    data: Sequence[DataModel],
     concurrency: Optional[int] = None,
+    impl: Union[str, Impl, None] = None,
 ) -> dict[str, list[DataModel]]:
     """
     Given a list of data, infers questions that can be answered by the data.
@@ -109,6 +180,7 @@ async def questions(
         data: List of data
         batch_size: Number of examples to process at once
         concurrency: Maximum number of parallel operations
+        impl: Impl, or name of a registered impl, to use instead of `settings.impl`
 
     Returns:
         A dictionary mapping each question to a list of data that contain the answer
@@ -116,7 +188,7 @@ async def questions(
     response = defaultdict(list)
 
     for qs, answer in zip(
-        await amap(settings.impl.questions, data, batch_size=1, concurrency=concurrency),
+        await amap(get_impl(impl).questions, data, batch_size=1, concurrency=concurrency),
         data,
     ):
         for q in qs:
@@ -125,14 +197,44 @@ async def questions(
     return response
 
 
+async def questions_stream(
+    data: Union[Iterable[DataModel], AsyncIterable[DataModel]],
+    concurrency: Optional[int] = None,
+    impl: Union[str, Impl, None] = None,
+) -> AsyncIterator[tuple[list[str], DataModel]]:
+    """
+    Streaming variant of `questions` that yields `(questions, datum)` pairs as they complete.
+
+    The stream can be fed to `hypellm.dedupe.dedupe_questions` to merge near-duplicate
+    questions in bounded memory.
+
+    Args:
+        data: Iterable or async iterable of data
+        concurrency: Maximum number of parallel operations
+        impl: Impl, or name of a registered impl, to use instead of `settings.impl`
+
+    Yields:
+        The questions inferred for each datum, together with the datum
+    """
+
+    questions = get_impl(impl).questions
+
+    async def ask(datum: DataModel) -> tuple[list[str], DataModel]:
+        return await questions(datum), datum
+
+    async for _, result in astream(ask, data, batch_size=1, concurrency=concurrency):
+        yield result
+
+
 def questions_sync(
-    data: list[DataModel],
+    data: Sequence[DataModel],
     concurrency: Optional[int] = None,
+    impl: Union[str, Impl, None] = None,
 ) -> dict[str, list[DataModel]]:
     response = defaultdict(list)
 
     for qs, answer in zip(
-        pmap(settings.impl.questions_sync, data, batch_size=1, concurrency=concurrency),
+        pmap(get_impl(impl).questions_sync, data, batch_size=1, concurrency=concurrency),
         data,
     ):
         for q in qs:
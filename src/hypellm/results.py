@@ -0,0 +1,164 @@
+import asyncio
+import json
+import logging
+import math
+import random
+import threading
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+
+from pydantic_core import to_jsonable_python
+
+from hypellm.settings import settings
+from hypellm.types import T
+
+logger = logging.getLogger(__name__)
+
+
+class ItemError(NamedTuple):
+    """An item that still failed after its retries, i.e. a dead letter."""
+
+    index: int
+    item: Any
+    error: BaseException
+    attempts: int
+
+    @property
+    def type(self) -> str:
+        return type(self.error).__name__
+
+    @property
+    def message(self) -> str:
+        return str(self.error)
+
+    def record(self, phase: Optional[str] = None) -> dict[str, Any]:
+        return {
+            "phase": phase,
+            "index": self.index,
+            "item": to_jsonable_python(self.item, fallback=repr),
+            "error": self.type,
+            "message": self.message,
+            "attempts": self.attempts,
+        }
+
+
+class Result(NamedTuple):
+    """Envelope for the outcome of one item: either its value or its `ItemError`."""
+
+    index: int
+    value: Any = None
+    error: Optional[ItemError] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def unwrap(self) -> Any:
+        """The value, or the item's exception if it failed."""
+        if self.error is not None:
+            raise self.error.error
+        return self.value
+
+
+class FailureBudgetExceeded(RuntimeError):
+    """Raised when more items failed than the failure budget allows."""
+
+    def __init__(self, failures: list[ItemError], finished: int):
+        self.failures = failures
+        self.finished = finished
+        last = failures[-1]
+        super().__init__(
+            f"{len(failures)} of {finished} items failed, last item {last.index} with "
+            f"{last.type}: {last.message}"
+        )
+
+
+class FailureBudget:
+    """
+    Tracks failed items and aborts the run once they exceed `budget`.
+
+    A budget of 1 or more is a number of items, a budget below 1 is a share of `total`. If the
+    total is unknown, it is a share of the items finished so far, but of at least `min_items`,
+    so that a few early failures in a long stream do not abort it. With no budget, failures
+    never abort.
+    """
+
+    def __init__(
+        self,
+        budget: Optional[float] = None,
+        total: Optional[int] = None,
+        failures: Optional[list[ItemError]] = None,
+        phase: Optional[str] = None,
+        min_items: int = 100,
+    ):
+        assert budget is None or budget >= 0, "failure budget must not be negative"
+        self.budget = budget
+        self.total = total
+        self.min_items = min_items
+        self.failures = failures if failures is not None else []
+        self.phase = phase
+        self.finished = 0
+
+    @property
+    def allowed(self) -> float:
+        if self.budget is None:
+            return math.inf
+        if self.budget >= 1:
+            return self.budget
+        if self.total is not None:
+            return self.budget * self.total
+        return self.budget * max(self.finished, self.min_items)
+
+    def record(self, result: Result):
+        self.finished += 1
+        if result.ok:
+            return
+        self.failures.append(result.error)
+        logger.warning(
+            "Item %d failed after %d attempts: %s: %s",
+            result.error.index,
+            result.error.attempts,
+            result.error.type,
+            result.error.message,
+        )
+        record_dead_letter(result.error, self.phase)
+        if len(self.failures) > self.allowed:
+            raise FailureBudgetExceeded(self.failures, self.finished)
+
+
+def backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number `attempt` (from 0)."""
+    return random.uniform(0, min(settings.item_max_backoff, settings.item_backoff * 2**attempt))
+
+
+async def attempt(
+    call: Callable[[], Awaitable[T]],
+    index: int,
+    item: Any = None,
+    retries: Optional[int] = None,
+) -> Result:
+    """Await `call()` up to `retries + 1` times, returning the first value or the last error."""
+    if retries is None:
+        retries = settings.item_retries
+
+    for attempts in range(1, retries + 2):
+        try:
+            return Result(index, await call())
+        except Exception as e:
+            error = e
+        if attempts <= retries:
+            await asyncio.sleep(backoff(attempts - 1))
+    return Result(index, error=ItemError(index, item, error, attempts))
+
+
+_dead_letter_lock = threading.Lock()
+
+
+def record_dead_letter(error: ItemError, phase: Optional[str] = None):
+    """Append `error` to `settings.dead_letter_path`, if set, so failed items can be rerun."""
+    if settings.dead_letter_path is None:
+        return
+    line = json.dumps(error.record(phase), separators=(",", ":"))
+    with _dead_letter_lock:
+        settings.dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+        with settings.dead_letter_path.open("a") as f:
+            f.write(line + "\n")
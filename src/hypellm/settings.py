@@ -1,13 +1,26 @@
-from importlib import import_module
+from pathlib import Path
 from typing import Optional, TYPE_CHECKING
 
-from pydantic import Field, HttpUrl
+from pydantic import BaseModel, ConfigDict, Field, HttpUrl
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 if TYPE_CHECKING:
     from hypellm.impl import Impl
 
 
+class Endpoint(BaseModel):
+    """A deployment LLM calls can be routed to. Unset fields fall back to the global settings."""
+
+    model_config = ConfigDict(frozen=True)
+
+    name: Optional[str] = None
+    model: Optional[str] = None
+    api_key: Optional[str] = None
+    api_version: Optional[str] = None
+    base_url: Optional[HttpUrl] = None
+    weight: float = Field(default=1.0, gt=0)
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="HYPELLM_", env_file=[".env"])
 
@@ -17,15 +30,83 @@ class Settings(BaseSettings):
     base_url: Optional[HttpUrl] = None
     batch_size: int = Field(default=5, ge=1)
     concurrency: int = Field(default=10, ge=1)
+    max_workers: int = Field(default=32, ge=1)
+    reasoning_batch_size: int = Field(default=1, ge=1)
+    token_budget: Optional[int] = Field(default=None, ge=1)
     show_progress: bool = True
     log_level: str = "INFO"
     impl_name: str = Field(default="instructor", alias="impl")
+    cache_dir: Optional[Path] = None
+    cache_max_size: Optional[int] = Field(default=None, ge=1)
+    cache_max_age: Optional[float] = Field(default=None, gt=0)
+    cache_replay: bool = False
+    prompt_cache_control: bool = False
+    journal_path: Optional[Path] = None
+    requests_per_minute: Optional[int] = Field(default=None, ge=1)
+    tokens_per_minute: Optional[int] = Field(default=None, ge=1)
+    rate_limit_retries: int = Field(default=5, ge=0)
+    item_retries: int = Field(default=2, ge=0)
+    item_backoff: float = Field(default=1.0, ge=0)
+    item_max_backoff: float = Field(default=30.0, ge=0)
+    failure_budget: Optional[float] = Field(default=None, ge=0)
+    dead_letter_path: Optional[Path] = None
+    hedge: bool = False
+    hedge_percentile: float = Field(default=0.95, gt=0, lt=1)
+    hedge_budget: float = Field(default=0.05, ge=0, le=1)
+    hedge_min_samples: int = Field(default=20, ge=1)
+    endpoints: Optional[list[Endpoint]] = None
+    endpoint_failure_threshold: int = Field(default=3, ge=1)
+    endpoint_ejection_time: float = Field(default=30.0, gt=0)
+    batch_api: bool = False
+    batch_window: float = Field(default=1.0, ge=0)
+    batch_max_requests: int = Field(default=50_000, ge=1)
+    batch_poll_interval: float = Field(default=30.0, ge=0)
+    batch_dir: Optional[Path] = None
+
+    http_pool: bool = True
+    http_max_connections: int = Field(default=100, ge=1)
+    http_max_keepalive_connections: int = Field(default=20, ge=0)
+    http_keepalive_expiry: float = Field(default=5.0, ge=0)
+    http2: bool = False
+
+    @property
+    def call_concurrency(self) -> int:
+        """
+        Default number of LLM calls in flight: `concurrency`, or `batch_max_requests` with
+        `batch_api`, since a batch wave can only be as large as the number of calls in flight.
+        """
+        return self.batch_max_requests if self.batch_api else self.concurrency
 
     @property
     def impl(self) -> "Impl":
-        return import_module(
-            self.impl_name if "." in self.impl_name else f"hypellm.impl.{self.impl_name}",
-        )
+        from hypellm.impl import resolve
+
+        return resolve(self.impl_name)
+
+
+class LazySettings:
+    """
+    Proxy for the global `Settings`, which are only read from the environment on first use.
+
+    This keeps `import hypellm` cheap and lets it succeed before the environment is set up.
+    """
+
+    def __init__(self):
+        object.__setattr__(self, "_settings", None)
+
+    def resolve(self) -> Settings:
+        if self._settings is None:
+            object.__setattr__(self, "_settings", Settings())
+        return self._settings
+
+    def __getattr__(self, name: str):
+        return getattr(self.resolve(), name)
+
+    def __setattr__(self, name: str, value):
+        setattr(self.resolve(), name, value)
+
+    def __repr__(self) -> str:
+        return repr(self.resolve())
 
 
-settings = Settings()
+settings: Settings = LazySettings()  # type: ignore[assignment]
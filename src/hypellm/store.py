@@ -0,0 +1,169 @@
+import hashlib
+import logging
+import mmap
+import os
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Callable, Generic, Iterable, Iterator, Optional, Union, overload
+
+from hypellm.types import DataModel, Example, T
+
+logger = logging.getLogger(__name__)
+
+
+def user_cache_index_path(path: Path) -> Path:
+    """Where the index of `path` is cached when it cannot be written next to the file."""
+    cache = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    digest = hashlib.sha256(str(path.resolve()).encode()).hexdigest()[:16]
+    return cache / "hypellm" / "stores" / f"{path.name}-{digest}.idx"
+
+
+class ExampleStore(Sequence):
+    """
+    Read-only sequence of examples backed by a memory-mapped JSONL file.
+
+    Only the byte offset of each line is kept in memory; examples are parsed on access, so
+    slicing a batch creates just that batch's objects. The offsets are cached next to the
+    file (`<path>.idx`), or in the user cache directory if the file's directory is read-only,
+    and rebuilt whenever the file changes. A store can be passed anywhere
+    a `list[Example]` is accepted, including the recipes, `helpers.amap` and `helpers.pmap`.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        model: type[DataModel] = Example,
+        index_path: Union[str, Path, None] = None,
+        cache_index: bool = True,
+    ):
+        self.path = Path(path)
+        self.model = model
+        self.index_path = Path(index_path or f"{self.path}.idx")
+        self.cache_index = cache_index
+        # Only the default location falls back to the user cache directory
+        self._index_paths = [self.index_path]
+        if index_path is None:
+            self._index_paths.append(user_cache_index_path(self.path))
+
+        with self.path.open("rb") as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size > 0:
+                self._mmap: Optional[mmap.mmap] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._mmap = None
+
+        self._offsets = self._load_index(stat) or self._build_index(stat)
+
+    @classmethod
+    def write(
+        cls,
+        path: Union[str, Path],
+        examples: Iterable[DataModel],
+        model: type[DataModel] = Example,
+    ) -> "ExampleStore":
+        """Write `examples` as JSONL to `path` and open the result as a store."""
+        with Path(path).open("w") as f:
+            for example in examples:
+                f.write(example.json() + "\n")
+        return cls(path, model)
+
+    def _load_index(self, stat: os.stat_result) -> Optional[array]:
+        if not self.cache_index:
+            return None
+        for index_path in self._index_paths:
+            offsets = array("Q")
+            try:
+                offsets.frombytes(index_path.read_bytes())
+            except OSError:
+                continue
+            # The first two entries identify the version of the file the index was built from
+            if offsets[:2].tolist() == [stat.st_size, stat.st_mtime_ns]:
+                self.index_path = index_path
+                return offsets[2:]
+        return None
+
+    def _build_index(self, stat: os.stat_result) -> array:
+        # Pairs of (start, end) offsets, skipping blank lines
+        offsets = array("Q")
+        size, position = stat.st_size, 0
+        while position < size:
+            end = self._mmap.find(b"\n", position)
+            if end == -1:
+                end = size
+            if self._mmap[position:end].strip():
+                offsets.extend((position, end))
+            position = end + 1
+
+        if self.cache_index:
+            header = array("Q", [stat.st_size, stat.st_mtime_ns])
+            for index_path in self._index_paths:
+                try:
+                    index_path.parent.mkdir(parents=True, exist_ok=True)
+                    index_path.write_bytes(header.tobytes() + offsets.tobytes())
+                except OSError:
+                    continue
+                self.index_path = index_path
+                break
+            else:
+                logger.warning("Could not cache the index of %s, keeping it in memory", self.path)
+        return offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) // 2
+
+    @overload
+    def __getitem__(self, index: int) -> DataModel: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[DataModel]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ExampleStore index out of range")
+        start, end = self._offsets[2 * index], self._offsets[2 * index + 1]
+        return self.model.model_validate_json(self._mmap[start:end])
+
+    def __iter__(self) -> Iterator[DataModel]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __reduce__(self):
+        return type(self), (self.path, self.model, self.index_path, self.cache_index)
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+
+
+class SequenceView(Sequence, Generic[T]):
+    """Lazy view over `data`, optionally restricted to `indices` and transformed by `func`."""
+
+    def __init__(
+        self,
+        data: Sequence,
+        indices: Optional[Sequence[int]] = None,
+        func: Optional[Callable[..., T]] = None,
+    ):
+        self.data = data
+        self.indices = indices
+        self.func = func
+
+    def __len__(self) -> int:
+        return len(self.data) if self.indices is None else len(self.indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        item = self.data[index if self.indices is None else self.indices[index]]
+        return item if self.func is None else self.func(item)
+
+    def __iter__(self) -> Iterator[T]:
+        items = (
+            iter(self.data) if self.indices is None else map(self.data.__getitem__, self.indices)
+        )
+        return items if self.func is None else map(self.func, items)
@@ -0,0 +1,130 @@
+import bisect
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Iterable, Optional, Sequence, Union
+
+from hypellm.types import DataModel, T
+
+logger = logging.getLogger(__name__)
+
+Tokenizer = Callable[[str], int]
+
+
+def estimate(text: str) -> int:
+    """Rough token count, assuming ~4 characters per token."""
+    return len(text) // 4 + 1
+
+
+_tokenizer: Tokenizer = estimate
+
+
+def use_tokenizer(tokenizer: Optional[Tokenizer]):
+    """Count tokens with `tokenizer` (text to token count) instead of the default estimate."""
+    global _tokenizer
+    _tokenizer = tokenizer if tokenizer is not None else estimate
+
+
+def tiktoken_tokenizer(encoding: str = "o200k_base") -> Tokenizer:
+    """A tokenizer for OpenAI models. Requires `tiktoken`."""
+    import tiktoken
+
+    encoder = tiktoken.get_encoding(encoding)
+    return lambda text: len(encoder.encode(text, disallowed_special=()))
+
+
+def count_tokens(value: Any) -> int:
+    """Tokens of `value` as it is sent in prompts: models as their JSON, other objects as JSON."""
+    if isinstance(value, DataModel):
+        text = value.json()
+    elif isinstance(value, str):
+        text = value
+    else:
+        text = json.dumps(value, default=str)
+    return _tokenizer(text)
+
+
+def pack(
+    sizes: Sequence[int],
+    budget: int,
+    max_items: Optional[int] = None,
+) -> list[list[int]]:
+    """
+    Bin-pack items of the given sizes into as few batches as possible under `budget`.
+
+    Uses best-fit decreasing, so larger items are placed first, each into the fullest batch it
+    still fits in. Returns the indices of the items in each batch, in their original order, and
+    batches in the order of their first item. Items larger than the budget get a batch of their
+    own.
+    """
+    assert budget > 0, "budget must be greater than 0"
+    assert max_items is None or max_items > 0, "max_items must be greater than 0"
+
+    batches: list[list[int]] = []
+    # (room left, batch number) of the batches that can still take items, sorted by room
+    open_batches: list[tuple[int, int]] = []
+    oversized = 0
+
+    for index in sorted(range(len(sizes)), key=lambda i: (-sizes[i], i)):
+        size = sizes[index]
+        if size > budget:
+            oversized += 1
+            batches.append([index])
+            continue
+        position = bisect.bisect_left(open_batches, (size, -1))
+        if position < len(open_batches):
+            room, batch = open_batches.pop(position)
+        else:
+            room, batch = budget, len(batches)
+            batches.append([])
+        batches[batch].append(index)
+        if max_items is None or len(batches[batch]) < max_items:
+            bisect.insort(open_batches, (room - size, batch))
+
+    if oversized:
+        logger.warning("%d items are larger than the token budget of %d", oversized, budget)
+
+    for batch in batches:
+        batch.sort()
+    return sorted(batches)
+
+
+def fits(values: list[T], budget: int, size: Callable[[T], int] = count_tokens) -> int:
+    """The number of leading values that fit in `budget`, but at least 2 (or all, if fewer)."""
+    total = 0
+    for n, value in enumerate(values):
+        total += size(value)
+        if total > budget:
+            return min(len(values), max(2, n))
+    return len(values)
+
+
+async def apacked(
+    data: Union[Iterable[T], AsyncIterator[T]],
+    budget: int,
+    max_items: Optional[int] = None,
+    size: Callable[[T], int] = count_tokens,
+) -> AsyncIterator[list[T]]:
+    """
+    Split `data` into batches under `budget` tokens, in order.
+
+    Lists and tuples are bin-packed with `pack`. Other iterables, including lazy sequences such
+    as an `ExampleStore`, are consumed lazily and batched greedily, a batch being closed as
+    soon as the next item would not fit, so items are only loaded as batches are needed.
+    """
+    from hypellm.helpers import aiterate
+
+    if isinstance(data, (list, tuple)):
+        for indices in pack([size(item) for item in data], budget, max_items):
+            yield [data[i] for i in indices]
+        return
+
+    batch, total = [], 0
+    async for item in aiterate(data):
+        item_size = size(item)
+        if batch and (total + item_size > budget or len(batch) == max_items):
+            yield batch
+            batch, total = [], 0
+        batch.append(item)
+        total += item_size
+    if batch:
+        yield batch
@@ -0,0 +1,121 @@
+import time
+from typing import TYPE_CHECKING, Any
+
+from hypellm.settings import settings
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class PoolStats:
+    """Connection usage of an `HTTPPool`, collected from httpcore trace events."""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self.connect_time = 0.0
+        self.wait_time = 0.0
+
+    @property
+    def reuse_ratio(self) -> float:
+        """Share of requests sent over an already open connection."""
+        return 1 - self.connections / self.requests if self.requests else 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        """Mean time a request waited for a free connection, excluding connecting."""
+        return self.wait_time / self.requests if self.requests else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"PoolStats(requests={self.requests}, connections={self.connections}, "
+            f"tls_handshakes={self.tls_handshakes}, reuse_ratio={self.reuse_ratio:.2f}, "
+            f"mean_wait={self.mean_wait * 1000:.1f}ms)"
+        )
+
+
+class HTTPPool:
+    """
+    Pooled keep-alive async HTTP client shared by all LLM calls.
+
+    `http2` needs the `h2` package (`pip install httpx[http2]`). Every request is traced, so
+    `stats` reports how many connections were opened, how often they were reused and how long
+    requests waited for a free connection.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 5.0,
+        http2: bool = False,
+    ):
+        import httpx
+
+        self.stats = PoolStats()
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            http2=http2,
+            event_hooks={"request": [self._trace_request]},
+        )
+
+    async def _trace_request(self, request: "httpx.Request"):
+        self.stats.requests += 1
+        started = time.monotonic()
+        connecting = {}
+        connect_time = 0.0
+
+        async def trace(event: str, info: dict[str, Any]):
+            nonlocal started, connect_time
+            now = time.monotonic()
+            if event in ("connection.connect_tcp.started", "connection.start_tls.started"):
+                connecting[event] = now
+            elif event == "connection.connect_tcp.complete":
+                self.stats.connections += 1
+                connect_time += now - connecting.pop("connection.connect_tcp.started", now)
+            elif event == "connection.start_tls.complete":
+                self.stats.tls_handshakes += 1
+                connect_time += now - connecting.pop("connection.start_tls.started", now)
+            elif event.endswith(".send_request_headers.started") and started is not None:
+                wait = now - started - connect_time
+                self.stats.wait_time += max(0.0, wait)
+                self.stats.connect_time += connect_time
+                started = None
+
+        request.extensions["trace"] = trace
+
+    def _connections(self) -> list:
+        pool = getattr(self.client._transport, "_pool", None)
+        return list(getattr(pool, "connections", []))
+
+    @property
+    def open_connections(self) -> int:
+        return len(self._connections())
+
+    @property
+    def active_connections(self) -> int:
+        return sum(not connection.is_idle() for connection in self._connections())
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_pools: dict[tuple, HTTPPool] = {}
+
+
+def get_http_pool() -> HTTPPool:
+    """The shared HTTP pool for the current settings, created on first use."""
+    key = (
+        settings.http_max_connections,
+        settings.http_max_keepalive_connections,
+        settings.http_keepalive_expiry,
+        settings.http2,
+    )
+    if key not in _pools:
+        _pools[key] = HTTPPool(*key)
+    return _pools[key]
@@ -1,6 +1,7 @@
 import sys
-from typing import Optional, TypeVar, Union
-from pydantic import BaseModel, Field, ConfigDict
+from functools import lru_cache
+from typing import Any, Iterable, Optional, TypeVar, Union
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
 
 if sys.version_info >= (3, 10):
     from typing import ParamSpec
@@ -15,23 +16,88 @@ ReasoningSteps = TypeVar("ReasoningSteps", bound=list[str])
 
 
 class DataModel(BaseModel):
+    # Slots are invisible to pydantic, so cached serializations are not compared, copied or pickled
+    __slots__ = ("_json", "_messages")
     model_config = ConfigDict(frozen=True)
 
+    @classmethod
+    def trusted(cls, **fields) -> "DataModel":
+        """Construct without validation, for fields that come from already validated models."""
+        defaults = _defaults(cls)
+        if defaults is None or cls.__private_attributes__:
+            return cls.model_construct(**fields)
+        return cls._assemble({**defaults, **fields}, set(fields))
+
+    @classmethod
+    def from_records(cls, records: Iterable[Any]) -> list["DataModel"]:
+        """Validate a batch of dicts (or models) in a single pass."""
+        return _list_adapter(cls).validate_python(list(records))
+
+    @classmethod
+    def _assemble(cls, values: dict, fields_set: set[str]) -> "DataModel":
+        # Same state `model_construct`/`model_copy` produce, minus their per-call overhead
+        instance = cls.__new__(cls)
+        _setattr(instance, "__dict__", values)
+        _setattr(instance, "__pydantic_fields_set__", fields_set)
+        _setattr(instance, "__pydantic_extra__", None)
+        _setattr(instance, "__pydantic_private__", None)
+        return instance
+
     def update(self, **kwargs) -> "DataModel":
-        return self.model_copy(update=kwargs)
+        if self.__private_attributes__ or self.__pydantic_extra__ is not None:
+            return self.model_copy(update=kwargs)
+        return self._assemble(
+            {**self.__dict__, **kwargs}, self.__pydantic_fields_set__ | kwargs.keys()
+        )
 
     def dict(self, **kwargs) -> dict:
         kwargs.setdefault("exclude_none", True)
         return self.model_dump(**kwargs)
 
     def json(self, **kwargs) -> str:
+        if not kwargs:
+            # Frozen, so the default serialization never changes
+            try:
+                return self._json
+            except AttributeError:
+                self._json = self.model_dump_json(exclude_none=True)
+                return self._json
         kwargs.setdefault("exclude_none", True)
         return self.model_dump_json(**kwargs)
 
+    def message(self, role: str) -> "dict[str, str]":
+        """Chat message with this model's JSON as its content, memoized per role. Do not mutate."""
+        try:
+            messages = self._messages
+        except AttributeError:
+            messages = self._messages = {}
+        if role not in messages:
+            messages[role] = {"role": role, "content": self.json()}
+        return messages[role]
+
     def toDict(self) -> dict:
         return self.dict()
 
 
+_setattr = object.__setattr__
+
+
+@lru_cache(maxsize=None)
+def _defaults(cls: type[DataModel]) -> Optional[dict[str, Any]]:
+    """Static field defaults, or None if a default factory has to run per instance."""
+    fields = cls.model_fields.values()
+    if any(field.default_factory is not None for field in fields):
+        return None
+    return {
+        name: field.default for name, field in cls.model_fields.items() if not field.is_required()
+    }
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(cls: type[DataModel]) -> TypeAdapter:
+    return TypeAdapter(list[cls])
+
+
 class Datum(DataModel):
     value: IO
 
@@ -1,6 +1,6 @@
-from typing import Optional
+from typing import AsyncIterable, AsyncIterator, Iterable, Optional, Union
 
-from hypellm.helpers import asyncify
+from hypellm.helpers import aiterate, asyncify
 from hypellm.types import Example, Prompt
 
 
@@ -37,7 +37,7 @@ def reasoned_sync(
     prompt: Optional[Prompt] = None,
 ) -> tuple[Prompt, list[Example]]:
     reasoned_data = [
-        d.update(reasoning=[f"step {i+1}" for i in range(branching_factor)]) for d in data
+        d.update(reasoning=[f"step {i + 1}" for i in range(branching_factor)]) for d in data
     ]
     return (
         (prompt or basic_prompt).update(examples=reasoned_data[:2]),
@@ -46,3 +46,13 @@ def reasoned_sync(
 
 
 reasoned = asyncify(reasoned_sync)
+
+
+async def reasoned_stream(
+    data: Union[Iterable[Example], AsyncIterable[Example]],
+    branching_factor: int = 3,
+    concurrency: Optional[int] = None,
+    prompt: Optional[Prompt] = None,
+) -> AsyncIterator[Example]:
+    async for d in aiterate(data):
+        yield d.update(reasoning=[f"step {i + 1}" for i in range(branching_factor)])
@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+
+class MockOpenAIServer:
+    """
+    Minimal keep-alive HTTP/1.1 server answering chat completions with a tool call.
+
+    With a `status` other than 200, every request is answered with that status and an error.
+    """
+
+    def __init__(self, arguments: dict, delay: float = 0.0, status: int = 200):
+        self.arguments = arguments
+        self.delay = delay
+        self.status = status
+        self.requests = 0
+        self.connections = 0
+
+    async def __aenter__(self) -> "MockOpenAIServer":
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while head := await reader.readuntil(b"\r\n\r\n"):
+                headers = dict(
+                    line.split(": ", 1) for line in head.decode().split("\r\n")[1:] if line
+                )
+                length = int({k.lower(): v for k, v in headers.items()}["content-length"])
+                request = json.loads(await reader.readexactly(length))
+                self.requests += 1
+                await asyncio.sleep(self.delay)
+
+                if self.status == 200:
+                    body = json.dumps(self.completion(request)).encode()
+                else:
+                    body = json.dumps({"error": {"message": "mock failure"}}).encode()
+                writer.write(
+                    f"HTTP/1.1 {self.status} Mock\r\nContent-Type: application/json\r\n".encode()
+                    + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                    + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def completion(self, request: dict) -> dict:
+        return {
+            "id": "mock",
+            "object": "chat.completion",
+            "created": 0,
+            "model": request["model"],
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {
+                        "role": "assistant",
+                        "tool_calls": [
+                            {
+                                "id": "call",
+                                "type": "function",
+                                "function": {
+                                    "name": request["tools"][0]["function"]["name"],
+                                    "arguments": json.dumps(self.arguments),
+                                },
+                            }
+                        ],
+                    },
+                }
+            ],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+        }
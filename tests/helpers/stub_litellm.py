@@ -0,0 +1,70 @@
+import json
+from typing import Callable, Union
+
+from openai.types.chat import ChatCompletion
+
+
+class StubLiteLLM:
+    """
+    Stands in for `litellm.acompletion`, reporting the longest previously seen prefix as cached.
+
+    Every request is answered with `arguments`, or with `arguments(request)` if it is callable.
+    """
+
+    def __init__(self, arguments: Union[dict, Callable[[dict], dict]]):
+        self.arguments = arguments
+        self.requests = []
+
+    def prefix_tokens(self, messages: list[dict]) -> int:
+        cached = 0
+        for previous in self.requests:
+            for i, (a, b) in enumerate(zip(previous, messages)):
+                if a != b:
+                    break
+                cached = max(cached, sum(len(json.dumps(m)) for m in messages[: i + 1]) // 4)
+        return cached
+
+    async def __call__(self, **kwargs) -> ChatCompletion:
+        messages = kwargs["messages"]
+        prompt_tokens = sum(len(json.dumps(m)) for m in messages) // 4
+        cached_tokens = self.prefix_tokens(messages)
+        self.requests.append(messages)
+        arguments = self.arguments(kwargs) if callable(self.arguments) else self.arguments
+        completion = tool_call(kwargs, arguments)
+        completion["usage"] = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": 10,
+            "total_tokens": prompt_tokens + 10,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        }
+        return ChatCompletion.model_validate(completion)
+
+
+def tool_call(request: dict, arguments: dict) -> dict:
+    """A chat completion answering `request` by calling its tool with `arguments`."""
+    return {
+        "id": "stub",
+        "object": "chat.completion",
+        "created": 0,
+        "model": request["model"],
+        "choices": [
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {
+                    "role": "assistant",
+                    "tool_calls": [
+                        {
+                            "id": "call",
+                            "type": "function",
+                            "function": {
+                                "name": request["tools"][0]["function"]["name"],
+                                "arguments": json.dumps(arguments),
+                            },
+                        }
+                    ],
+                },
+            }
+        ],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+    }
@@ -0,0 +1,39 @@
+import sys
+
+import pytest
+
+pytest.importorskip("dspy")
+
+import hypellm  # noqa: E402
+import hypellm.impl.dspy  # noqa: E402, F401
+from hypellm import Example, Prompt  # noqa: E402
+
+reasoned = sys.modules["hypellm.impl.dspy.reasoned"]
+
+
+@pytest.mark.asyncio
+async def test_resumed_stream_depends_on_prompt(monkeypatch, tmp_path):
+    calls = []
+
+    def infill_reasoning(fn_prompt: Prompt, branching_factor: int, datum: Example) -> list[str]:
+        calls.append(datum.inputs)
+        return [f"{fn_prompt.intent} {datum.inputs}"]
+
+    monkeypatch.setattr(reasoned, "infill_reasoning", infill_reasoning)
+    monkeypatch.setattr(reasoned, "get_lm", lambda: None)
+    monkeypatch.setattr(hypellm.settings, "journal_path", tmp_path / "journal.jsonl")
+    monkeypatch.setattr(hypellm.settings, "batch_size", 2)
+    data = [Example(inputs=f"in {i}", outputs="out") for i in range(4)]
+
+    async def run(intent: str) -> list[Example]:
+        stream = reasoned.reasoned_stream(data, prompt=Prompt(intent=intent))
+        return sorted([example async for example in stream], key=lambda example: example.inputs)
+
+    first = await run("add")
+    assert len(calls) == 4
+    assert await run("add") == first
+    assert len(calls) == 4
+
+    changed = await run("subtract")
+    assert len(calls) == 8
+    assert all(example.reasoning[0].startswith("subtract") for example in changed)
@@ -35,3 +35,20 @@ async def test_inverted(medical_classification_dataset):
     prompt, results = await hypellm.recipes.inverted(medical_classification_dataset)
     assert all(example in results for example in prompt.examples)
     pprint([prompt, results])
+
+
+@pytest.mark.asyncio
+async def test_reasoned_stream(medical_classification_dataset):
+    results = [r async for r in hypellm.recipes.reasoned_stream(medical_classification_dataset)]
+    assert len(results) == len(medical_classification_dataset)
+    assert all(r.reasoning for r in results)
+    pprint(results)
+
+
+@pytest.mark.asyncio
+async def test_reasoned_batched(medical_classification_dataset, monkeypatch):
+    monkeypatch.setattr(hypellm.settings, "reasoning_batch_size", 3)
+    prompt, results = await hypellm.recipes.reasoned(medical_classification_dataset)
+    assert len(results) == len(medical_classification_dataset)
+    assert all(r.reasoning for r in results)
+    pprint([prompt, results])
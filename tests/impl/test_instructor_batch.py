@@ -0,0 +1,71 @@
+import sys
+
+import pytest
+
+import hypellm
+import hypellm.impl.instructor  # noqa: F401
+from hypellm import batch
+from hypellm.batch import LocalBatchService
+from helpers.stub_litellm import tool_call
+
+base = sys.modules["hypellm.impl.instructor.base"]
+inferred = sys.modules["hypellm.impl.instructor.inferred"]
+reasoned = sys.modules["hypellm.impl.instructor.reasoned"]
+
+ARGUMENTS = {
+    "HypotheticalPrompt": {"reasoning_steps": ["look"], "prompt": {"intent": "diagnose"}},
+    "ThoughtBranches": {
+        "trajectories": [{"reasoning": ["a"], "outputs": "x", "reflection": ["ok"]}],
+        "best_reasoning": ["think", "answer"],
+    },
+}
+
+
+@pytest.fixture
+def batched(monkeypatch, tmp_path):
+    invalid = set()
+
+    def respond(body: dict) -> dict:
+        name = body["tools"][0]["function"]["name"]
+        content = body["messages"][-1]["content"]
+        # The first request for "in 7" fails validation, so it is reasked in a later wave
+        if name == "ThoughtBranches" and '"in 7"' in content and not invalid:
+            invalid.add(content)
+            return tool_call(body, {"trajectories": []})
+        return tool_call(body, ARGUMENTS[name])
+
+    service = LocalBatchService(tmp_path, respond)
+    monkeypatch.setattr(hypellm.settings, "batch_api", True)
+    monkeypatch.setattr(hypellm.settings, "batch_window", 0.05)
+    monkeypatch.setattr(hypellm.settings, "batch_poll_interval", 0.01)
+    monkeypatch.setattr(hypellm.settings, "cache_dir", None)
+    monkeypatch.setattr(hypellm.settings, "batch_size", 5)
+    monkeypatch.setattr(batch, "_collectors", {})
+    monkeypatch.setattr(base, "_clients", {})
+    batch.use_batch_service(service)
+    yield batch.get_batch_collector()
+    batch.use_batch_service(None)
+
+
+@pytest.mark.asyncio
+async def test_reasoned_runs_as_batch_waves(batched):
+    data = [hypellm.Example(f"in {i}", f"out {i}") for i in range(12)]
+
+    prompt, results = await reasoned.reasoned(data)
+
+    assert prompt.intent == "diagnose"
+    assert [example.reasoning for example in results] == [["think", "answer"]] * 12
+    # Prompt inference, few-shot sample, remainder, then the reask of the invalid response
+    assert batched.waves[:2] == [1, 5]
+    assert sum(batched.waves) == 1 + 12 + 1
+
+
+@pytest.mark.asyncio
+async def test_inferred_reduces_in_one_wave_per_level(batched):
+    # More leaf batches than settings.concurrency, which does not cap waves in batch mode
+    data = [hypellm.Example(f"in {i}", f"out {i}") for i in range(100)]
+
+    prompt = await inferred.inferred(data)
+
+    assert prompt.intent == "diagnose"
+    assert batched.waves == [20, 4, 1]
@@ -0,0 +1,90 @@
+import asyncio
+import sys
+
+import pytest
+
+import hypellm
+import hypellm.impl.instructor  # noqa: F401
+from hypellm import endpoints, transport
+from hypellm.settings import Endpoint
+from helpers.mock_openai_server import MockOpenAIServer
+
+base = sys.modules["hypellm.impl.instructor.base"]
+questions = sys.modules["hypellm.impl.instructor.questions"]
+
+ARGUMENTS = {"reasoning_steps": ["read"], "questions": ["Q?"]}
+
+
+@pytest.fixture
+def routed(monkeypatch):
+    import litellm
+
+    def install(*servers: MockOpenAIServer, weights=None, model=None) -> endpoints.EndpointPool:
+        monkeypatch.setattr(hypellm.settings, "model", "openai/mock")
+        monkeypatch.setattr(
+            hypellm.settings,
+            "endpoints",
+            [
+                Endpoint(
+                    name=f"server{i}",
+                    model=model,
+                    api_key=f"key{i}",
+                    base_url=f"http://127.0.0.1:{server.port}/v1",
+                    weight=weights[i] if weights else 1.0,
+                )
+                for i, server in enumerate(servers)
+            ],
+        )
+        monkeypatch.setattr(hypellm.settings, "requests_per_minute", None)
+        monkeypatch.setattr(hypellm.settings, "cache_dir", None)
+        monkeypatch.setattr(endpoints, "_pools", {})
+        monkeypatch.setattr(transport, "_pools", {})
+        monkeypatch.setattr(base, "_clients", {})
+        monkeypatch.setattr(litellm, "aclient_session", None)
+        return endpoints.get_endpoint_pool()
+
+    return install
+
+
+@pytest.mark.asyncio
+async def test_calls_are_spread_by_weight(routed):
+    async with MockOpenAIServer(ARGUMENTS, delay=0.05) as a:
+        async with MockOpenAIServer(ARGUMENTS, delay=0.05) as b:
+            pool = routed(a, b, weights=[1, 3])
+            calls = [questions.questions(hypellm.Example(f"in {i}", "out")) for i in range(8)]
+            assert await asyncio.gather(*calls) == [["Q?"]] * 8
+            await transport.get_http_pool().aclose()
+
+    assert (a.requests, b.requests) == (2, 6)
+    assert [state.outstanding for state in pool.states] == [0, 0]
+
+
+@pytest.mark.asyncio
+async def test_failing_endpoint_is_failed_over_and_ejected(routed, monkeypatch):
+    monkeypatch.setattr(hypellm.settings, "endpoint_failure_threshold", 1)
+    async with MockOpenAIServer(ARGUMENTS, status=503) as bad, MockOpenAIServer(ARGUMENTS) as good:
+        pool = routed(bad, good)
+        for i in range(3):
+            assert await questions.questions(hypellm.Example(f"in {i}", "out")) == ["Q?"]
+        await transport.get_http_pool().aclose()
+
+    assert good.requests == 3
+    assert pool.states[0].ejections == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_responses_are_keyed_by_routed_model(routed, monkeypatch, tmp_path):
+    example = hypellm.Example("in", "out")
+    async with MockOpenAIServer(ARGUMENTS) as server:
+        routed(server)
+        monkeypatch.setattr(hypellm.settings, "cache_dir", tmp_path)
+        for _ in range(2):
+            assert await questions.questions(example) == ["Q?"]
+        assert server.requests == 1
+
+        routed(server, model="openai/other")
+        monkeypatch.setattr(hypellm.settings, "cache_dir", tmp_path)
+        assert await questions.questions(example) == ["Q?"]
+        await transport.get_http_pool().aclose()
+
+    assert server.requests == 2
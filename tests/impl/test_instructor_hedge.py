@@ -0,0 +1,46 @@
+import asyncio
+import sys
+
+import instructor
+import pytest
+
+import hypellm
+import hypellm.impl.instructor  # noqa: F401
+from hypellm.hedge import Hedger
+from hypellm.ratelimit import RateLimiter
+from helpers.stub_litellm import StubLiteLLM
+
+base = sys.modules["hypellm.impl.instructor.base"]
+questions = sys.modules["hypellm.impl.instructor.questions"]
+
+
+@pytest.mark.asyncio
+async def test_hedged_requests_are_charged_to_the_limiter(monkeypatch):
+    stub = StubLiteLLM({"reasoning_steps": ["think"], "questions": ["What?"]})
+    started = []
+
+    async def straggling(**kwargs):
+        started.append(kwargs)
+        if len(started) == 1:
+            await asyncio.sleep(1)
+        return await stub(**kwargs)
+
+    hedger = Hedger(budget=1.0, min_samples=1)
+    hedger.record(0.01)
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=600_000)
+    monkeypatch.setattr(
+        base, "get_client", lambda: instructor.from_litellm(straggling, model="stub")
+    )
+    monkeypatch.setattr(base, "get_hedger", lambda name: hedger)
+    monkeypatch.setattr(base, "get_limiter", lambda: limiter)
+    monkeypatch.setattr(hypellm.settings, "cache_dir", None)
+
+    assert await questions.questions(hypellm.Example("in", "out")) == ["What?"]
+
+    assert (hedger.hedges, hedger.hedge_wins) == (1, 1)
+    assert limiter.started == 2
+    # The cancelled straggler gives its slot back once it has unwound
+    await asyncio.sleep(0)
+    assert limiter.in_flight == 0
+    # Both requests were charged to the requests-per-minute bucket
+    assert limiter.requests.tokens < limiter.requests.capacity - 1.5
@@ -0,0 +1,33 @@
+import json
+import sys
+
+import instructor
+import pytest
+
+import hypellm
+import hypellm.impl.instructor  # noqa: F401
+from hypellm import tokens
+from helpers.stub_litellm import StubLiteLLM
+
+base = sys.modules["hypellm.impl.instructor.base"]
+inferred = sys.modules["hypellm.impl.instructor.inferred"]
+
+
+@pytest.mark.asyncio
+async def test_combine_examples_fill_the_token_budget(monkeypatch):
+    stub = StubLiteLLM({"reasoning_steps": ["look"], "prompt": {"intent": "combined"}})
+    client = instructor.from_litellm(stub.__call__, model="stub")
+    monkeypatch.setattr(base, "get_client", lambda: client)
+    monkeypatch.setattr(hypellm.settings, "cache_dir", None)
+    monkeypatch.setattr(hypellm.settings, "token_budget", 500)
+    monkeypatch.setattr(tokens, "_tokenizer", len)
+
+    data = [hypellm.Example(inputs="x" * 80, outputs=str(i)) for i in range(50)]
+    prompts = [hypellm.Prompt(intent="y" * 100) for _ in range(2)]
+    prompt = await inferred.combine_prompts(data, prompts)
+
+    assert prompt.intent == "combined"
+    content = stub.requests[0][2]["content"]
+    examples = json.loads(content.split("\n\n", 1)[1])
+    # Each example is about 100 tokens, and the prompts take up about 250
+    assert len(examples) == 2
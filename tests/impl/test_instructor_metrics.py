@@ -0,0 +1,58 @@
+import sys
+
+import instructor
+import pytest
+
+import hypellm
+import hypellm.impl.instructor  # noqa: F401
+from hypellm import metrics
+from hypellm.helpers import amap
+from helpers.stub_litellm import StubLiteLLM
+
+base = sys.modules["hypellm.impl.instructor.base"]
+questions = sys.modules["hypellm.impl.instructor.questions"]
+
+
+@pytest.fixture
+def events(monkeypatch):
+    stub = StubLiteLLM({"reasoning_steps": ["think"], "questions": ["What?"]})
+    client = instructor.from_litellm(stub.__call__, model="stub")
+    client.on("parse:error", metrics.on_parse_error)
+    monkeypatch.setattr(base, "get_client", lambda: client)
+    monkeypatch.setattr(hypellm.settings, "requests_per_minute", None)
+
+    captured = []
+    hook = metrics.add_hook(captured.append)
+    yield captured
+    metrics.remove_hook(hook)
+
+
+@pytest.mark.asyncio
+async def test_calls_are_attributed_to_recipe_phase_and_batch(events, monkeypatch):
+    monkeypatch.setattr(hypellm.settings, "cache_dir", None)
+    data = [hypellm.Example(inputs=f"in {i}", outputs="out") for i in range(4)]
+
+    async def ask(example):
+        return await questions.questions(example)
+
+    assert await amap(ask, data, batch_size=1, phase="index") == [["What?"]] * 4
+
+    assert len(events) == 4
+    assert {event.recipe for event in events} == {"questions"}
+    assert {event.phase for event in events} == {"index"}
+    assert sorted(event.batch for event in events) == [0, 1, 2, 3]
+    assert all(event.prompt_tokens > 0 and event.completion_tokens == 10 for event in events)
+    assert all(not event.cache_hit and event.error is None for event in events)
+
+
+@pytest.mark.asyncio
+async def test_response_cache_hits_are_reported(events, monkeypatch, tmp_path):
+    monkeypatch.setattr(hypellm.settings, "cache_dir", tmp_path)
+    monkeypatch.setattr(base, "_caches", {})
+    example = hypellm.Example(inputs="in", outputs="out")
+
+    for _ in range(2):
+        assert await questions.questions(example) == ["What?"]
+
+    assert [event.cache_hit for event in events] == [False, True]
+    assert events[1].prompt_tokens == 0
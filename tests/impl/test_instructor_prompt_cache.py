@@ -0,0 +1,79 @@
+import sys
+
+import instructor
+import pytest
+
+import hypellm
+import hypellm.impl.instructor  # noqa: F401
+from helpers.stub_litellm import StubLiteLLM
+
+base = sys.modules["hypellm.impl.instructor.base"]
+reasoned = sys.modules["hypellm.impl.instructor.reasoned"]
+questions = sys.modules["hypellm.impl.instructor.questions"]
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    def install(arguments: dict) -> StubLiteLLM:
+        stub = StubLiteLLM(arguments)
+        client = instructor.from_litellm(stub.__call__, model="stub")
+        monkeypatch.setattr(base, "get_client", lambda: client)
+        monkeypatch.setattr(base, "prompt_cache_stats", base.defaultdict(base.PromptCacheStats))
+        return stub
+
+    return install
+
+
+def test_build_messages_marks_last_static_message(monkeypatch):
+    static = [{"role": "system", "content": "a"}, {"role": "user", "content": "b"}]
+    dynamic = [{"role": "user", "content": "c"}]
+
+    assert base.build_messages(static, dynamic) == [*static, *dynamic]
+
+    monkeypatch.setattr(hypellm.settings, "prompt_cache_control", True)
+    messages = base.build_messages(static, dynamic)
+    assert messages[0] == static[0]
+    assert messages[1]["content"] == [
+        {"type": "text", "text": "b", "cache_control": {"type": "ephemeral"}}
+    ]
+    assert messages[2] == dynamic[0]
+
+
+def test_build_messages_copies_memoized_messages():
+    prompt = hypellm.Prompt(intent="test")
+    system = prompt.message("system")
+    assert prompt.message("system") is system
+
+    messages = base.build_messages([system], [])
+    messages[0]["content"] += "edited by instructor"
+    assert prompt.message("system") == {"role": "system", "content": prompt.json()}
+
+
+@pytest.mark.asyncio
+async def test_questions_prefix_is_cached(stub):
+    fake = stub({"reasoning_steps": ["think"], "questions": ["What?"]})
+
+    for i in range(3):
+        assert await questions.questions(hypellm.Example(inputs=f"in {i}", outputs="out")) == [
+            "What?"
+        ]
+
+    assert fake.requests[0][0] == fake.requests[1][0] == fake.requests[2][0]
+    stats = base.prompt_cache_stats["questions"]
+    assert stats.calls == 3
+    assert stats.cached_tokens > 0
+    assert 0 < stats.hit_ratio < 1
+
+
+@pytest.mark.asyncio
+async def test_reasoned_prefix_is_cached(stub):
+    fake = stub({"trajectories": [], "best_reasoning": ["step"]})
+    prompt = hypellm.Prompt(intent="classify", examples=[hypellm.Example(inputs="a", outputs="b")])
+
+    for i in range(2):
+        datum = hypellm.Example(inputs={"text": f"in {i}", "lang": "en"}, outputs="out")
+        assert await reasoned.infill_reasoning(prompt, 3, datum) == ["step"]
+
+    assert fake.requests[0][:2] == fake.requests[1][:2]
+    assert fake.requests[0][2] != fake.requests[1][2]
+    assert base.prompt_cache_stats["reasoned"].cached_tokens > 0
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import sys
+
+import instructor
+import pytest
+
+import hypellm
+import hypellm.impl.instructor  # noqa: F401
+from helpers.stub_litellm import StubLiteLLM
+
+base = sys.modules["hypellm.impl.instructor.base"]
+reasoned = sys.modules["hypellm.impl.instructor.reasoned"]
+
+
+def branches(inputs: str) -> dict:
+    return {
+        "trajectories": [{"reasoning": ["a"], "outputs": "x", "reflection": ["ok"]}],
+        "best_reasoning": [f"reason about {inputs}"],
+    }
+
+
+def respond(request: dict) -> dict:
+    content = json.loads(request["messages"][-1]["content"])
+    if request["tools"][0]["function"]["name"] == "ThoughtBranches":
+        return branches(content["inputs"])
+    # Answer out of order, and skip the example with id 1
+    items = [{"id": item["id"], **branches(item["inputs"])} for item in content]
+    return {"items": [item for item in reversed(items) if item["id"] != 1]}
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    stub = StubLiteLLM(respond)
+    client = instructor.from_litellm(stub.__call__, model="stub")
+    monkeypatch.setattr(base, "get_client", lambda: client)
+    monkeypatch.setattr(hypellm.settings, "cache_dir", None)
+    return stub
+
+
+@pytest.mark.asyncio
+async def test_infill_reasonings_maps_ids_and_reasks_missing(stub):
+    data = [hypellm.Example(inputs=f"in {i}", outputs="out") for i in range(4)]
+    reasonings = await reasoned.infill_reasonings(hypellm.Prompt(intent="test"), 3, data)
+
+    assert reasonings == [[f"reason about in {i}"] for i in range(4)]
+    assert len(stub.requests) == 2
+    assert json.loads(stub.requests[1][-1]["content"])["inputs"] == "in 1"
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried_one_call_at_a_time(stub, monkeypatch):
+    in_flight, peak = 0, 0
+
+    async def failing_batches(**kwargs):
+        nonlocal in_flight, peak
+        if kwargs["tools"][0]["function"]["name"] != "ThoughtBranches":
+            raise RuntimeError("batch failed")
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            return await stub(**kwargs)
+        finally:
+            in_flight -= 1
+
+    client = instructor.from_litellm(failing_batches, model="stub")
+    monkeypatch.setattr(base, "get_client", lambda: client)
+    data = [hypellm.Example(inputs=f"in {i}", outputs="out") for i in range(4)]
+    reasonings = await reasoned.infill_reasonings(hypellm.Prompt(intent="test"), 3, data)
+
+    assert reasonings == [[f"reason about in {i}"] for i in range(4)]
+    assert len(stub.requests) == 4
+    assert peak == 1
@@ -0,0 +1,61 @@
+import asyncio
+import sys
+
+import pytest
+
+import hypellm
+import hypellm.impl.instructor  # noqa: F401
+from hypellm import transport
+from helpers.mock_openai_server import MockOpenAIServer
+
+base = sys.modules["hypellm.impl.instructor.base"]
+questions = sys.modules["hypellm.impl.instructor.questions"]
+
+
+@pytest.fixture
+def pooled(monkeypatch):
+    import litellm
+
+    async def install(server: MockOpenAIServer, max_connections: int) -> transport.HTTPPool:
+        monkeypatch.setattr(hypellm.settings, "model", "openai/mock")
+        monkeypatch.setattr(hypellm.settings, "api_key", "mock")
+        monkeypatch.setattr(hypellm.settings, "base_url", f"http://127.0.0.1:{server.port}/v1")
+        monkeypatch.setattr(hypellm.settings, "http_max_connections", max_connections)
+        monkeypatch.setattr(hypellm.settings, "requests_per_minute", None)
+        monkeypatch.setattr(hypellm.settings, "cache_dir", None)
+        monkeypatch.setattr(transport, "_pools", {})
+        monkeypatch.setattr(base, "_clients", {})
+        monkeypatch.setattr(litellm, "aclient_session", None)
+        return transport.get_http_pool()
+
+    return install
+
+
+@pytest.mark.asyncio
+async def test_sequential_calls_reuse_one_connection(pooled):
+    arguments = {"reasoning_steps": ["read"], "questions": ["Q?"]}
+    async with MockOpenAIServer(arguments) as server:
+        pool = await pooled(server, max_connections=10)
+        for i in range(5):
+            assert await questions.questions(hypellm.Example(f"in {i}", "out")) == ["Q?"]
+        await pool.aclose()
+
+    assert server.requests == pool.stats.requests == 5
+    assert server.connections == pool.stats.connections == 1
+    assert pool.stats.reuse_ratio == pytest.approx(0.8)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_bounded_by_the_pool(pooled):
+    arguments = {"reasoning_steps": ["read"], "questions": ["Q?"]}
+    async with MockOpenAIServer(arguments, delay=0.05) as server:
+        pool = await pooled(server, max_connections=2)
+        calls = [questions.questions(hypellm.Example(f"in {i}", "out")) for i in range(8)]
+        assert await asyncio.gather(*calls) == [["Q?"]] * 8
+        assert pool.open_connections == 2
+        assert pool.active_connections == 0
+        await pool.aclose()
+
+    assert server.connections == pool.stats.connections == 2
+    assert pool.stats.reuse_ratio == pytest.approx(0.75)
+    assert pool.stats.mean_wait > 0.01
@@ -0,0 +1,60 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import hypellm
+from hypellm import impl as impls
+from helpers import mock_impl
+
+
+@pytest.fixture(autouse=True)
+def isolated_registry(monkeypatch):
+    monkeypatch.setattr(impls, "_registry", dict(impls._registry))
+    monkeypatch.setattr(impls, "_resolved", {})
+
+
+def test_resolve_caches_module():
+    assert impls.resolve("helpers.mock_impl") is mock_impl
+    assert impls._resolved["helpers.mock_impl"] is mock_impl
+
+
+def test_resolve_passes_through_impl_objects():
+    assert impls.resolve(mock_impl) is mock_impl
+
+
+def test_register():
+    custom = SimpleNamespace(questions_sync=lambda d: ["custom?"])
+    impls.register("custom", custom)
+    assert impls.resolve("custom") is custom
+    assert "custom" in impls.available()
+
+    impls.register("custom", "helpers.mock_impl")
+    assert impls.resolve("custom") is mock_impl
+
+
+def test_entry_points(monkeypatch):
+    custom = SimpleNamespace()
+    entry_point = SimpleNamespace(name="plugin", load=lambda: custom)
+    monkeypatch.setattr(impls, "_entry_points", lambda: [entry_point])
+
+    assert "plugin" in impls.available()
+    assert impls.resolve("plugin") is custom
+
+
+@pytest.mark.asyncio
+async def test_per_call_impl_runs_side_by_side():
+    async def questions(datum):
+        await asyncio.sleep(0.01)
+        return ["Other?"]
+
+    other = SimpleNamespace(questions=questions)
+    impls.register("other", other)
+    data = [hypellm.Example(inputs="a", outputs="b")]
+
+    mock_results, other_results = await asyncio.gather(
+        hypellm.recipes.questions(data, impl="helpers.mock_impl"),
+        hypellm.recipes.questions(data, impl="other"),
+    )
+    assert set(mock_results) == set(mock_impl.questions_sync(data[0]))
+    assert set(other_results) == {"Other?"}
@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+import pytest
+
+from hypellm.batch import BatchCollector, BatchRequestError, LocalBatchService
+from helpers.stub_litellm import tool_call
+
+TOOLS = [{"type": "function", "function": {"name": "Answer", "parameters": {}}}]
+
+
+def respond(body: dict) -> dict:
+    content = body["messages"][0]["content"]
+    if content == "fail":
+        raise ValueError("cannot answer")
+    return tool_call(body, {"answer": content})
+
+
+@pytest.mark.asyncio
+async def test_requests_are_sent_in_waves(tmp_path):
+    service = LocalBatchService(tmp_path / "service", respond)
+    collector = BatchCollector(service, window=0.01, poll_interval=0.01, directory=tmp_path / "io")
+
+    async def ask(content: str):
+        completion = await collector(
+            model="openai/gpt-test",
+            api_key="secret",
+            messages=[{"role": "user", "content": content}],
+            tools=TOOLS,
+        )
+        return json.loads(completion.choices[0].message.tool_calls[0].function.arguments)
+
+    first = await asyncio.gather(*(ask(f"q{i}") for i in range(3)))
+    second = await ask("q3")
+
+    assert [answer["answer"] for answer in first] == ["q0", "q1", "q2"]
+    assert second == {"answer": "q3"}
+    assert collector.waves == [3, 1]
+
+    (path,) = (p for p in (tmp_path / "io").glob("wave-1-*.jsonl") if "results" not in p.name)
+    requests = [json.loads(line) for line in path.open()]
+    assert requests[0]["url"] == "/v1/chat/completions"
+    assert requests[0]["body"]["model"] == "gpt-test"
+    assert "api_key" not in requests[0]["body"]
+
+
+@pytest.mark.asyncio
+async def test_failed_requests_only_fail_their_caller(tmp_path):
+    service = LocalBatchService(tmp_path, respond, delay=0.02)
+    collector = BatchCollector(service, window=0.01, poll_interval=0.01, max_requests=2)
+
+    results = await asyncio.gather(
+        *(
+            collector(model="m", messages=[{"role": "user", "content": c}], tools=TOOLS)
+            for c in ("ok", "fail")
+        ),
+        return_exceptions=True,
+    )
+
+    assert results[0].choices[0].message.tool_calls
+    assert isinstance(results[1], BatchRequestError)
+    assert "cannot answer" in str(results[1])
+    assert collector.waves == [2]
+
+
+def test_call_concurrency_follows_batch_api(monkeypatch):
+    from hypellm.settings import settings
+
+    monkeypatch.setattr(settings, "concurrency", 10)
+    monkeypatch.setattr(settings, "batch_api", True)
+    assert settings.call_concurrency == settings.batch_max_requests
+    monkeypatch.setattr(settings, "batch_api", False)
+    assert settings.call_concurrency == 10
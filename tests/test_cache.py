@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from hypellm.cache import CacheMiss, ResponseCache
+
+
+def test_key_is_stable():
+    a = ResponseCache.key(model="m", messages=[{"role": "user", "content": "hi"}], temperature=0.5)
+    b = ResponseCache.key(temperature=0.5, messages=[{"role": "user", "content": "hi"}], model="m")
+    c = ResponseCache.key(model="m", messages=[{"role": "user", "content": "hi"}], temperature=0.7)
+    assert a == b
+    assert a != c
+
+
+@pytest.mark.asyncio
+async def test_get_or_set_counts_hits_and_misses(tmp_path):
+    cache = ResponseCache(tmp_path)
+    calls = 0
+
+    async def compute() -> str:
+        nonlocal calls
+        calls += 1
+        return '{"answer": 42}'
+
+    assert await cache.get_or_set("k", compute) == '{"answer": 42}'
+    assert await cache.get_or_set("k", compute) == '{"answer": 42}'
+    assert calls == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_persists_and_replays(tmp_path):
+    cache = ResponseCache(tmp_path)
+    cache.set("k", "v")
+    cache.close()
+
+    replay = ResponseCache(tmp_path, readonly=True)
+    assert replay.get("k") == "v"
+    replay.set("other", "v")
+    assert replay.get("other") is None
+
+    async def compute() -> str:
+        raise AssertionError("replay must not compute")
+
+    with pytest.raises(CacheMiss):
+        await replay.get_or_set("missing", compute)
+
+
+def test_evicts_by_size(tmp_path):
+    cache = ResponseCache(tmp_path, max_size=10)
+    for key in "abcd":
+        cache.set(key, "xxxx")
+    cache.get("a")
+    cache.evict()
+    assert len(cache) == 2
+    assert cache.get("a") == "xxxx"
+    assert cache.get("d") == "xxxx"
+
+
+def test_evicts_by_age(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path, max_age=60)
+    cache.set("k", "v")
+    now = time.time()
+    monkeypatch.setattr("hypellm.cache.time.time", lambda: now + 120)
+    assert cache.get("k") is None
+    cache.evict()
+    assert len(cache) == 0
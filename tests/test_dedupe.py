@@ -0,0 +1,58 @@
+import pytest
+
+from hypellm.dedupe import QuestionDeduper, dedupe_questions, normalize_question
+from hypellm.types import Example
+
+np = pytest.importorskip("numpy")
+
+paris = Example(inputs="What is the capital of France?", outputs="Paris")
+math = Example(inputs="What is 2+2?", outputs="4")
+
+
+def test_normalize_question():
+    assert normalize_question("What's X?") == normalize_question("what is  x")
+    assert normalize_question("Why   don’t we?") == "why do not we"
+
+
+def test_merges_near_duplicates():
+    deduper = QuestionDeduper(threshold=0.7)
+    deduper.add("What is the capital of France?", [paris])
+    deduper.add("What's the capital of France?", [paris])
+    deduper.add("what is the capital of france", [math])
+    deduper.add("What is the capital of Frances?", [paris])
+    deduper.add("How much is 2+2?", [math])
+
+    assert deduper.result() == {
+        "What is the capital of France?": [paris, math],
+        "How much is 2+2?": [math],
+    }
+
+
+def test_pluggable_embedding():
+    vocabulary = ["capital", "france", "sum"]
+
+    def embed(questions: list[str]) -> np.ndarray:
+        return np.array([[q.count(word) for word in vocabulary] for q in questions], dtype=float)
+
+    deduper = QuestionDeduper(threshold=0.9, embed=embed, batch_size=2)
+    deduper.update(
+        {
+            "Capital of France?": [paris],
+            "France's capital?": [paris],
+            "What is the sum?": [math],
+        }
+    )
+    assert deduper.result() == {"Capital of France?": [paris], "What is the sum?": [math]}
+
+
+@pytest.mark.asyncio
+async def test_dedupe_questions_stream():
+    async def stream():
+        yield ["What's the capital of France?", "Which city is France's capital?"], paris
+        yield ["What is 2+2?"], math
+        yield ["What is the capital of France?"], math
+
+    result = await dedupe_questions(stream())
+    assert result["What's the capital of France?"] == [paris, math]
+    assert result["What is 2+2?"] == [math]
+    assert len(result) == 3
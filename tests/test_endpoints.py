@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from hypellm.endpoints import EndpointPool, is_endpoint_error
+from hypellm.settings import Endpoint
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+def test_is_endpoint_error():
+    assert is_endpoint_error(ServerError())
+    assert is_endpoint_error(ConnectionRefusedError())
+    assert not is_endpoint_error(ValueError("invalid json"))
+
+    try:
+        try:
+            raise ServerError()
+        except ServerError as e:
+            raise RuntimeError("wrapped") from e
+    except RuntimeError as wrapped:
+        assert is_endpoint_error(wrapped)
+
+
+@pytest.mark.asyncio
+async def test_weighted_least_outstanding_selection():
+    pool = EndpointPool([Endpoint(name="a"), Endpoint(name="b", weight=3)])
+    routed = []
+
+    async def call(endpoint: Endpoint) -> str:
+        routed.append(endpoint.name)
+        await asyncio.sleep(0.01)
+        return endpoint.name
+
+    await asyncio.gather(*(pool.run(call) for _ in range(8)))
+    assert routed.count("a") == 2
+    assert routed.count("b") == 6
+
+
+@pytest.mark.asyncio
+async def test_failover_and_ejection():
+    pool = EndpointPool([Endpoint(name="bad"), Endpoint(name="good")], failure_threshold=2)
+
+    async def call(endpoint: Endpoint) -> str:
+        if endpoint.name == "bad":
+            raise ServerError()
+        return endpoint.name
+
+    # Alternate starting endpoints while both are idle, until "bad" is ejected
+    assert [await pool.run(call) for _ in range(6)] == ["good"] * 6
+    bad, good = pool.states
+    assert bad.requests == 2
+    assert bad.ejections == 1
+    assert good.requests == 6
+
+
+@pytest.mark.asyncio
+async def test_non_endpoint_errors_are_not_retried():
+    pool = EndpointPool([Endpoint(name="a"), Endpoint(name="b")])
+    calls = []
+
+    async def call(endpoint: Endpoint):
+        calls.append(endpoint.name)
+        raise ValueError("invalid response")
+
+    with pytest.raises(ValueError):
+        await pool.run(call)
+    assert len(calls) == 1
+    assert all(state.consecutive_failures == 0 for state in pool.states)
+
+
+@pytest.mark.asyncio
+async def test_last_error_is_raised_when_every_endpoint_fails():
+    pool = EndpointPool([Endpoint(name="a"), Endpoint(name="b")])
+
+    async def call(endpoint: Endpoint):
+        raise ServerError(endpoint.name)
+
+    with pytest.raises(ServerError):
+        await pool.run(call)
+    assert [state.requests for state in pool.states] == [1, 1]
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from hypellm.hedge import Hedger
+
+
+def make_call(delays: list[float], started: list[float], cancelled: list[int]):
+    async def call() -> int:
+        index = len(started)
+        started.append(index)
+        try:
+            await asyncio.sleep(delays[index])
+        except asyncio.CancelledError:
+            cancelled.append(index)
+            raise
+        return index
+
+    return call
+
+
+@pytest.mark.asyncio
+async def test_does_not_hedge_before_min_samples():
+    hedger = Hedger(min_samples=3, budget=1.0)
+    started, cancelled = [], []
+    call = make_call([0.0, 0.0, 0.2], started, cancelled)
+
+    assert [await hedger.run(call) for _ in range(3)] == [0, 1, 2]
+    assert hedger.hedges == 0
+    assert len(hedger.latencies) == 3
+
+
+@pytest.mark.asyncio
+async def test_hedges_a_straggler_and_cancels_it():
+    hedger = Hedger(min_samples=3, budget=1.0)
+    started, cancelled = [], []
+    call = make_call([0.01, 0.01, 0.01, 5.0, 0.01], started, cancelled)
+    for _ in range(3):
+        await hedger.run(call)
+
+    hedged = []
+    start = asyncio.get_running_loop().time()
+    assert await hedger.run(call, on_hedge=lambda: hedged.append(True)) == 4
+    assert asyncio.get_running_loop().time() - start < 1.0
+
+    await asyncio.sleep(0)  # let the loser handle its cancellation
+    assert hedged == [True]
+    assert cancelled == [3]
+    assert (hedger.hedges, hedger.hedge_wins) == (1, 1)
+    assert len(hedger.latencies) == 5
+
+
+@pytest.mark.asyncio
+async def test_budget_caps_hedges():
+    hedger = Hedger(min_samples=1, budget=0.0)
+    started, cancelled = [], []
+    call = make_call([0.0, 0.05], started, cancelled)
+
+    await hedger.run(call)
+    assert await hedger.run(call) == 1
+    assert hedger.hedges == 0
+    assert started == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_failed_hedge_falls_back_to_the_other_call():
+    hedger = Hedger(min_samples=1, budget=1.0)
+    hedger.record(0.01)
+    attempts = []
+
+    async def call() -> str:
+        attempts.append(len(attempts))
+        if len(attempts) == 2:
+            raise ValueError("hedge failed")
+        await asyncio.sleep(0.05)
+        return "primary"
+
+    assert await hedger.run(call) == "primary"
+    assert hedger.hedges == 1
+    assert hedger.hedge_wins == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelling_the_caller_cancels_its_calls():
+    hedger = Hedger(min_samples=3, budget=1.0)
+    started, cancelled = [], []
+    call = make_call([0.01, 0.01, 0.01, 5.0, 5.0, 5.0], started, cancelled)
+    for _ in range(3):
+        await hedger.run(call)
+
+    # Cancelled while waiting to hedge, then after hedging
+    for wait in (0.005, 0.1):
+        task = asyncio.ensure_future(hedger.run(call))
+        await asyncio.sleep(wait)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+
+    assert cancelled == [3, 4, 5]
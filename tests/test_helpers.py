@@ -1,9 +1,15 @@
 import asyncio
+import json
+import random
+from collections import defaultdict
+from functools import partial
 from typing import List
 
 import pytest
 
-from hypellm.helpers import syncify, asyncify, as_completed, gather, amap, pmap
+from hypellm.helpers import syncify, asyncify, as_completed, gather, amap, areduce, astream, pmap
+from hypellm import tokens
+from hypellm.results import FailureBudget, FailureBudgetExceeded, ItemError, Result
 from hypellm.settings import settings
 
 
@@ -62,8 +68,103 @@ async def test_gather_with_timeout():
         return 42
 
     tasks = [slow_task()]
-    results = await gather(tasks, timeout=0.1)
-    assert results is None
+    with pytest.raises(asyncio.TimeoutError):
+        await gather(tasks, timeout=0.1)
+
+
+@pytest.mark.asyncio
+async def test_gather_envelope_retries_and_isolates_failures(monkeypatch):
+    monkeypatch.setattr(settings, "item_backoff", 0.0)
+    calls = defaultdict(int)
+
+    async def flaky(i: int) -> int:
+        calls[i] += 1
+        if i == 1 and calls[i] < 2:
+            raise ValueError("flaky")
+        if i == 2:
+            raise ValueError("broken")
+        return i
+
+    dead_letters = []
+    results = await gather(
+        [partial(flaky, i) for i in range(3)],
+        envelope=True,
+        retries=2,
+        dead_letters=dead_letters,
+    )
+
+    assert [result.value for result in results[:2]] == [0, 1]
+    assert not results[2].ok
+    assert dict(calls) == {0: 1, 1: 2, 2: 3}
+    assert [(error.index, error.type, error.attempts) for error in dead_letters] == [
+        (2, "ValueError", 3)
+    ]
+    with pytest.raises(ValueError):
+        results[2].unwrap()
+
+
+@pytest.mark.asyncio
+async def test_gather_envelope_keeps_results_on_timeout():
+    async def task(delay: float) -> float:
+        await asyncio.sleep(delay)
+        return delay
+
+    results = await gather([task(0.0), task(1.0)], timeout=0.1, envelope=True)
+    assert results[0].value == 0.0
+    assert results[1].error.type == "TimeoutError"
+
+
+@pytest.mark.asyncio
+async def test_amap_envelope_failure_budget(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "item_backoff", 0.0)
+    monkeypatch.setattr(settings, "dead_letter_path", tmp_path / "dead.jsonl")
+
+    async def fail_odd(x: int) -> int:
+        if x % 2:
+            raise ValueError(x)
+        return x
+
+    results = await amap(fail_odd, range(10), batch_size=1, envelope=True, failure_budget=0.5)
+    assert [result.value for result in results if result.ok] == [0, 2, 4, 6, 8]
+    lines = (tmp_path / "dead.jsonl").read_text().splitlines()
+    assert sorted(json.loads(line)["item"] for line in lines) == [1, 3, 5, 7, 9]
+
+    with pytest.raises(FailureBudgetExceeded) as raised:
+        await amap(fail_odd, range(10), batch_size=1, envelope=True, failure_budget=2)
+    assert len(raised.value.failures) == 3
+
+
+@pytest.mark.asyncio
+async def test_gather_envelope_aborts_early_on_failure_budget():
+    cancelled = []
+
+    async def task(i: int) -> int:
+        if i < 3:
+            raise ValueError(i)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(i)
+            raise
+        return i
+
+    with pytest.raises(FailureBudgetExceeded):
+        await asyncio.wait_for(
+            gather([task(i) for i in range(6)], envelope=True, failure_budget=2), timeout=1
+        )
+    await asyncio.sleep(0)
+    assert sorted(cancelled) == [3, 4, 5]
+
+
+def test_failure_budget_share_of_unknown_total():
+    budget = FailureBudget(0.01)
+    error = Result(0, error=ItemError(0, None, ValueError("early"), 1))
+    # A single early failure is within 1% of the first 100 items
+    budget.record(error)
+    for i in range(99):
+        budget.record(Result(i, i))
+    with pytest.raises(FailureBudgetExceeded):
+        budget.record(error)
 
 
 @pytest.mark.asyncio
@@ -80,6 +181,165 @@ async def test_amap_multi_batch():
     assert results == [[2, 3], [4, 5]]
 
 
+@pytest.mark.asyncio
+async def test_amap_uneven_batches():
+    data = [1, 2, 3, 4, 5]
+    results = await amap(async_batch_add, data, batch_size=2)
+    assert results == [[2, 3], [4, 5], [6]]
+
+
+@pytest.mark.asyncio
+async def test_astream_yields_indexed_results():
+    results = [r async for r in astream(async_batch_add, range(5), batch_size=2)]
+    assert sorted(results) == [(0, [1, 2]), (1, [3, 4]), (2, [5])]
+
+
+@pytest.mark.asyncio
+async def test_astream_async_iterable():
+    async def numbers():
+        for i in range(3):
+            yield i
+
+    results = [r async for r in astream(async_add, numbers(), batch_size=1)]
+    assert sorted(results) == [(0, 1), (1, 2), (2, 3)]
+
+
+@pytest.mark.asyncio
+async def test_astream_bounded_window():
+    in_flight = 0
+    max_in_flight = 0
+    pulled = 0
+
+    async def tracked_add(x: int) -> int:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return x + 1
+
+    def numbers():
+        nonlocal pulled
+        for i in range(20):
+            pulled += 1
+            yield i
+
+    stream = astream(tracked_add, numbers(), batch_size=1, concurrency=3)
+    first = await stream.__anext__()
+    assert pulled <= 4
+    rest = [r async for r in stream]
+    assert max_in_flight == 3
+    assert sorted([first, *rest]) == [(i, i + 1) for i in range(20)]
+
+
+async def async_sum(items: List[int]) -> int:
+    await asyncio.sleep(0.01)
+    return sum(items)
+
+
+@pytest.mark.parametrize("size,batch_size", [(1, 2), (2, 2), (7, 2), (10, 3), (27, 3), (5, 1)])
+@pytest.mark.asyncio
+async def test_areduce(size, batch_size):
+    result, widths = await areduce(async_sum, range(size), batch_size=batch_size)
+    assert result == sum(range(size))
+    assert widths[0] == size
+    assert all(
+        width <= max(batch_size, 2) ** (len(widths) - level) for level, width in enumerate(widths)
+    )
+
+
+@pytest.mark.asyncio
+async def test_areduce_does_not_wait_for_stragglers():
+    started = []
+
+    async def combine(items: List[int]) -> int:
+        started.append(items)
+        await asyncio.sleep(0.2 if 0 in items else 0.01)
+        return sum(items)
+
+    async def leaves():
+        for i in range(8):
+            await asyncio.sleep(0.005)
+            yield i
+
+    result, widths = await areduce(combine, leaves(), batch_size=2)
+    assert result == sum(range(8))
+    assert widths == [8, 4, 2, 1]
+    # Only the straggler's path waits for it
+    assert started.index([9, 13]) < started.index([1, 5])
+
+
+@pytest.mark.asyncio
+async def test_areduce_batches_do_not_depend_on_completion_order():
+    async def combine(items: List[str]) -> str:
+        await asyncio.sleep(random.random() / 100)
+        return f"({' '.join(items)})"
+
+    async def leaves():
+        for i in random.sample(range(10), 10):
+            await asyncio.sleep(random.random() / 100)
+            yield i, str(i)
+
+    results = {(await areduce(combine, leaves(), batch_size=3, indexed=True))[0] for _ in range(5)}
+    assert results == {"(((0 1 2) (3 4 5) (6 7 8)) 9)"}
+
+
+@pytest.mark.asyncio
+async def test_areduce_resumes_combines_from_journal(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "journal_path", tmp_path / "journal.jsonl")
+    calls = []
+
+    async def combine(items: List[int]) -> int:
+        calls.append(items)
+        await asyncio.sleep(random.random() / 100)
+        return sum(items)
+
+    async def leaves():
+        for i in random.sample(range(9), 9):
+            yield i, i
+
+    for _ in range(2):
+        result, _ = await areduce(
+            combine, leaves(), batch_size=3, phase="sum", result_type=int, indexed=True
+        )
+        assert result == sum(range(9))
+    assert len(calls) == 4
+
+
+@pytest.mark.asyncio
+async def test_areduce_token_budget(monkeypatch):
+    monkeypatch.setattr(tokens, "_tokenizer", len)
+    combined = []
+
+    async def concat(items: List[str]) -> str:
+        combined.append(items)
+        return "".join(items)
+
+    leaves = ["a" * n for n in (4, 4, 4, 1, 1, 1, 1)]
+    result, widths = await areduce(concat, leaves, batch_size=2, token_budget=8)
+    assert sorted(result) == sorted("".join(leaves))
+    assert combined[:2] == [["aaaa", "aaaa"], ["aaaa", "a", "a", "a", "a"]]
+    assert all(len(batch) >= 2 for batch in combined)
+
+
+@pytest.mark.asyncio
+async def test_amap_token_budget(monkeypatch):
+    monkeypatch.setattr(tokens, "_tokenizer", len)
+    data = ["x" * n for n in (5, 1, 1, 3, 2, 4)]
+
+    async def concat(items: List[str]) -> str:
+        return "".join(items)
+
+    results = await amap(concat, data, batch_size=1, token_budget=6)
+    assert sorted(map(len, results)) == [4, 6, 6]
+
+
+@pytest.mark.asyncio
+async def test_areduce_empty():
+    with pytest.raises(AssertionError):
+        await areduce(async_sum, [], batch_size=2)
+
+
 def test_pmap_single_batch():
     data = [1, 2, 3]
     results = pmap(sync_add, data, batch_size=1)
@@ -115,3 +375,87 @@ async def test_amap_invalid_params(batch_size, concurrency):
 def test_pmap_invalid_params(batch_size, concurrency):
     with pytest.raises(AssertionError):
         pmap(sync_add, [1], batch_size=batch_size, concurrency=concurrency)
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_pmap_executors(executor):
+    data = list(range(10))
+    assert pmap(sum, data, batch_size=3, executor=executor) == [3, 12, 21, 9]
+    assert pmap(abs, data, batch_size=1, executor=executor, chunksize=4) == data
+
+
+def test_pmap_shared_store(tmp_path):
+    from hypellm.store import ExampleStore
+    from hypellm.types import Example
+
+    examples = [Example(inputs=str(i), outputs=str(i)) for i in range(7)]
+    store = ExampleStore.write(tmp_path / "data.jsonl", examples)
+    assert pmap(len, store, batch_size=3, executor="process") == [3, 3, 1]
+    assert pmap(repr, store, batch_size=1, executor="process") == list(map(repr, examples))
+
+
+def test_pmap_slices_lazily(tmp_path):
+    from hypellm.store import ExampleStore
+    from hypellm.types import Example
+
+    class CountingStore(ExampleStore):
+        loaded = 0
+
+        def __getitem__(self, index):
+            CountingStore.loaded += 1
+            return super().__getitem__(index)
+
+    examples = [Example(inputs=str(i), outputs=str(i)) for i in range(100)]
+    ExampleStore.write(tmp_path / "data.jsonl", examples)
+    store = CountingStore(tmp_path / "data.jsonl")
+    loaded_before_first_call = []
+
+    def first_load(example: Example) -> str:
+        if not loaded_before_first_call:
+            loaded_before_first_call.append(CountingStore.loaded)
+        return example.inputs
+
+    assert pmap(first_load, store, batch_size=1, concurrency=4) == [str(i) for i in range(100)]
+    assert loaded_before_first_call[0] <= 4
+
+
+def test_pmap_unknown_executor():
+    with pytest.raises(ValueError):
+        pmap(sync_add, [1], executor="gpu")
+
+
+@pytest.mark.asyncio
+async def test_amap_executor():
+    results = await amap(sum, list(range(10)), batch_size=5, executor="process")
+    assert results == [10, 35]
+
+
+def test_pmap_shares_bounded_pool(monkeypatch):
+    from hypellm import helpers
+
+    monkeypatch.setattr(settings, "max_workers", 1)
+    helpers.shutdown()
+
+    def outer(x: int) -> list[int]:
+        # Nested in the only worker of the pool, so it can only finish on the calling thread
+        return pmap(sync_add, [x, x], batch_size=1, concurrency=4)
+
+    pool = helpers.shared_executor()
+    assert pool.submit(pmap, outer, [1, 2], 1, 4).result(timeout=5) == [[2, 2], [3, 3]]
+    assert helpers.shared_executor() is pool
+
+    helpers.shutdown()
+    assert helpers.shared_executor() is not pool
+    helpers.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_asyncify_shares_pool_and_loop():
+    import threading
+
+    def blocking() -> tuple[str, int]:
+        return threading.current_thread().name, syncify(async_add)(1)
+
+    name, result = await asyncify(blocking)()
+    assert name.startswith("hypellm")
+    assert result == 2
@@ -0,0 +1,98 @@
+import random
+import statistics
+import time
+
+import pytest
+
+from hypellm.index import QuestionIndex, tokenize
+from hypellm.types import Example
+
+paris = Example(inputs="Where is the Eiffel Tower?", outputs="Paris")
+math = Example(inputs="What is 2+2?", outputs="4")
+
+mapping = {
+    "Which city is the Eiffel Tower in?": [paris],
+    "What is the capital of France?": [paris],
+    "What is two plus two?": [math],
+    "Which number is the sum of 2 and 2?": [math, paris],
+}
+
+
+def test_interns_documents():
+    index = QuestionIndex.build(mapping)
+    assert len(index) == 4
+    assert index.num_documents == 2
+    assert index.documents_of(3) == [1, 0]
+
+
+def test_search():
+    index = QuestionIndex.build(mapping)
+    assert index.search_questions("eiffel tower", k=1)[0][0] == 0
+    assert index.search("capital of France")[0][0] == 0
+    assert index.search("unrelated words") == []
+
+    (doc, _), *_ = index.search("two plus two")
+    assert index.document(doc) == math
+
+
+def test_save_and_load(tmp_path):
+    built = QuestionIndex.build(mapping)
+    built.save(tmp_path / "index")
+
+    loaded = QuestionIndex.load(tmp_path / "index", document_type=Example)
+    assert len(loaded) == len(built)
+    assert loaded.question(1) == "What is the capital of France?"
+    assert loaded.search("sum of 2 and 2") == built.search("sum of 2 and 2")
+    assert loaded.document(loaded.search("eiffel")[0][0]) == paris
+    loaded.close()
+
+
+def test_built_and_loaded_documents_have_the_same_type(tmp_path):
+    built = QuestionIndex.build(mapping)
+    built.save(tmp_path / "index")
+    loaded = QuestionIndex.load(tmp_path / "index", document_type=Example)
+
+    assert type(built.document(0)) is type(loaded.document(0)) is Example
+    assert built.document(0) == loaded.document(0) == paris
+    loaded.close()
+
+
+def test_empty_index(tmp_path):
+    QuestionIndex.build({}).save(tmp_path)
+    index = QuestionIndex.load(tmp_path)
+    assert len(index) == 0
+    assert index.search("anything") == []
+
+
+def large_index(size: int) -> QuestionIndex:
+    rng = random.Random(0)
+    common, rare = ["what", "is", "the", "of"], [f"w{i}" for i in range(5000)]
+    mapping = {
+        " ".join(rng.sample(common, 2) + rng.choices(rare, k=5) + [f"q{i}"]): [paris]
+        for i in range(size)
+    }
+    return QuestionIndex.build(mapping)
+
+
+def test_pruned_search_is_exact():
+    index = large_index(20_000)
+    rng = random.Random(1)
+    for _ in range(50):
+        query = f"what is {rng.choice(['the', 'of'])} w{rng.randrange(5000)} w{rng.randrange(5000)}"
+        spans = [index._span_of(term) for term in set(tokenize(query))]
+        exhaustive = index._top(*index._accumulate([span for span in spans if span]), 10)
+        assert [score for _, score in index.search_questions(query)] == pytest.approx(
+            [score for _, score in exhaustive]
+        )
+
+
+def test_search_latency():
+    index = large_index(50_000)
+    rng = random.Random(2)
+    queries = [f"what is the w{rng.randrange(5000)} w{rng.randrange(5000)}" for _ in range(100)]
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search_questions(query)
+        latencies.append(time.perf_counter() - start)
+    assert statistics.median(latencies) < 0.001
@@ -0,0 +1,122 @@
+from functools import partial
+
+import pytest
+
+from hypellm.helpers import amap, pmap
+from hypellm.journal import Journal, journaled
+from hypellm.settings import settings
+from hypellm.types import Example, Prompt
+
+
+@pytest.fixture
+def journal_path(tmp_path, monkeypatch):
+    path = tmp_path / "journal.jsonl"
+    monkeypatch.setattr(settings, "journal_path", path)
+    return path
+
+
+def test_journal_roundtrip(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = Journal(path)
+    key = Journal.key("phase", 0, Example(inputs="a", outputs="b"))
+    journal.record(key, Prompt(intent="test"))
+    journal.close()
+
+    with path.open("a") as f:
+        f.write('{"key": "truncat')
+
+    journal = Journal(path)
+    assert key in journal
+    assert len(journal) == 1
+    assert journal.get(key, Prompt) == Prompt(intent="test")
+
+
+def test_journal_appends_after_truncated_line(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = Journal(path)
+    journal.record("a", 1)
+    journal.close()
+
+    with path.open("a") as f:
+        f.write('{"key": "truncat')
+
+    journal = Journal(path)
+    journal.record("b", 2)
+    journal.close()
+
+    journal = Journal(path)
+    assert len(journal) == 2
+    assert journal.get("b", int) == 2
+
+
+def test_key_depends_on_index_and_content():
+    example = Example(inputs="a", outputs="b")
+    assert Journal.key("p", 0, example) == Journal.key("p", 0, Example(inputs="a", outputs="b"))
+    assert Journal.key("p", 0, example) != Journal.key("p", 1, example)
+    assert Journal.key("p", 0, example) != Journal.key("p", 0, example.update(outputs="c"))
+
+
+@pytest.mark.asyncio
+async def test_amap_resumes_from_journal(journal_path):
+    calls = []
+
+    async def add(x: int) -> int:
+        calls.append(x)
+        if x == 3:
+            raise RuntimeError("boom")
+        return x + 1
+
+    with pytest.raises(RuntimeError):
+        await amap(add, [1, 2, 3], batch_size=1, concurrency=1, phase="add", result_type=int)
+
+    calls.clear()
+
+    async def add_fixed(x: int) -> int:
+        calls.append(x)
+        return x + 1
+
+    results = await amap(add_fixed, [1, 2, 3], batch_size=1, phase="add", result_type=int)
+    assert results == [2, 3, 4]
+    assert calls == [3]
+
+
+def test_pmap_resumes_from_journal(journal_path):
+    calls = []
+
+    def add(batch: list[int]) -> list[int]:
+        calls.append(batch)
+        return [x + 1 for x in batch]
+
+    assert pmap(add, [1, 2, 3], batch_size=2, phase="add", result_type=list[int]) == [[2, 3], [4]]
+    assert pmap(add, [1, 2, 3], batch_size=2, phase="add", result_type=list[int]) == [[2, 3], [4]]
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_amap_journal_depends_on_params(journal_path):
+    calls = []
+
+    async def add(x: int, y: int) -> int:
+        calls.append(x)
+        return x + y
+
+    for y in (1, 1, 2):
+        results = await amap(
+            partial(add, y=y), [1, 2], batch_size=1, phase="add", params=y, result_type=int
+        )
+        assert results == [1 + y, 2 + y]
+    assert calls == [1, 2, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_journaled_unit(journal_path):
+    calls = 0
+
+    async def compute() -> Prompt:
+        nonlocal calls
+        calls += 1
+        return Prompt(intent="test")
+
+    assert await journaled("prompt", ["data"], compute, Prompt) == Prompt(intent="test")
+    assert await journaled("prompt", ["data"], compute, Prompt) == Prompt(intent="test")
+    assert calls == 1
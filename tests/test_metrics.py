@@ -0,0 +1,98 @@
+import pytest
+
+from hypellm import metrics
+
+
+@pytest.fixture
+def events():
+    captured = []
+    hook = metrics.add_hook(captured.append)
+    yield captured
+    metrics.remove_hook(hook)
+
+
+def test_scope_sets_and_restores_context():
+    with metrics.scope(recipe="questions", phase="index"):
+        with metrics.scope(batch=3):
+            tracker = metrics.CallTracker("model", None)
+        assert metrics.current_batch.get() is None
+        assert metrics.current_phase.get() == "index"
+    assert metrics.current_recipe.get() is None
+
+    assert tracker.event["recipe"] == "questions"
+    assert tracker.event["phase"] == "index"
+    assert tracker.event["batch"] == 3
+
+
+def test_tracker_counts_retries(events):
+    tracker = metrics.CallTracker("model", "questions")
+    token = metrics.current_call.set(tracker)
+    try:
+        tracker.attempt()
+        metrics.on_parse_error(ValueError("bad json"))
+        tracker.attempt()
+    finally:
+        metrics.current_call.reset(token)
+    tracker.finish(error=RuntimeError())
+
+    [event] = events
+    assert event.recipe == "questions"
+    assert event.validation_retries == 1
+    assert event.rate_limit_retries == 1
+    assert event.error == "RuntimeError"
+
+
+def test_failing_hook_does_not_break_emit(events):
+    def broken(event):
+        raise RuntimeError
+
+    metrics.add_hook(broken)
+    try:
+        metrics.emit(metrics.CallEvent(started=0.0))
+    finally:
+        metrics.remove_hook(broken)
+    assert len(events) == 1
+
+
+def test_aggregator_report():
+    aggregator = metrics.MetricsAggregator()
+    assert aggregator.report() == ""
+
+    for latency in (1.0, 2.0, 3.0):
+        aggregator(
+            metrics.CallEvent(
+                recipe="questions",
+                phase="index",
+                started=0.0,
+                latency=latency,
+                prompt_tokens=100,
+                completion_tokens=10,
+                cost=0.01,
+            )
+        )
+    aggregator(metrics.CallEvent(recipe="inferred", phase="infer", started=0.0, error="Timeout"))
+
+    phase = aggregator.phases["questions", "index"]
+    assert phase.calls == 3
+    assert phase.prompt_tokens == 300
+    assert phase.cost == pytest.approx(0.03)
+    assert metrics.percentile(phase.latencies, 0.5) == 2.0
+
+    report = aggregator.report("index")
+    assert "questions/index" in report
+    assert "inferred" not in report
+    assert len(aggregator.report().splitlines()) == 3
+
+    aggregator.reset()
+    assert aggregator.report() == ""
+
+
+def test_latencies_are_sampled_within_a_bound():
+    phase = metrics.PhaseMetrics()
+    for i in range(20_000):
+        phase.record(metrics.CallEvent(started=0.0, latency=i / 20_000))
+
+    assert phase.calls == 20_000
+    assert len(phase.latencies) == metrics.LATENCY_SAMPLES
+    assert metrics.percentile(phase.latencies, 0.5) == pytest.approx(0.5, abs=0.1)
+    assert metrics.percentile(phase.latencies, 0.99) == pytest.approx(0.99, abs=0.02)
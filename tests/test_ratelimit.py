@@ -0,0 +1,132 @@
+import asyncio
+import time
+
+import pytest
+
+from hypellm.ratelimit import RateLimiter, TokenBucket, estimate_tokens, is_rate_limit_error
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+
+class FakeCompletions:
+    """Local stand-in for a completion endpoint that returns 429s for the first `failures` calls."""
+
+    def __init__(self, failures: int = 0, latency: float = 0.0):
+        self.failures = failures
+        self.latency = latency
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self) -> str:
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if self.failures > 0:
+                self.failures -= 1
+                raise FakeRateLimitError("rate limited")
+            return "ok"
+        finally:
+            self.in_flight -= 1
+
+
+def test_is_rate_limit_error():
+    assert is_rate_limit_error(FakeRateLimitError())
+    assert not is_rate_limit_error(ValueError())
+
+    try:
+        try:
+            raise FakeRateLimitError()
+        except FakeRateLimitError as e:
+            raise RuntimeError("wrapped") from e
+    except RuntimeError as wrapped:
+        assert is_rate_limit_error(wrapped)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens([{"role": "user", "content": "x" * 400}]) > 100
+
+
+@pytest.mark.asyncio
+async def test_retries_and_backs_off_on_429():
+    limiter = RateLimiter(max_concurrency=8, backoff=0.01)
+    fake = FakeCompletions(failures=3)
+
+    results = await asyncio.gather(*[limiter.run(fake.create) for _ in range(10)])
+
+    assert results == ["ok"] * 10
+    assert fake.calls == 13
+    assert limiter.rate_limited == 3
+    assert limiter.concurrency < 8
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_retries():
+    limiter = RateLimiter(max_retries=2, backoff=0.001)
+    fake = FakeCompletions(failures=10)
+
+    with pytest.raises(FakeRateLimitError):
+        await limiter.run(fake.create)
+    assert fake.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_other_errors_are_not_retried():
+    limiter = RateLimiter()
+    calls = 0
+
+    async def fail():
+        nonlocal calls
+        calls += 1
+        raise ValueError("bad")
+
+    with pytest.raises(ValueError):
+        await limiter.run(fail)
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_limits_concurrency():
+    limiter = RateLimiter(max_concurrency=3)
+    fake = FakeCompletions(latency=0.01)
+
+    await asyncio.gather(*[limiter.run(fake.create) for _ in range(12)])
+    assert fake.max_in_flight == 3
+
+
+@pytest.mark.asyncio
+async def test_enforces_requests_per_minute():
+    limiter = RateLimiter(requests_per_minute=1200, max_concurrency=100)
+    fake = FakeCompletions()
+
+    start = time.monotonic()
+    await asyncio.gather(*[limiter.run(fake.create) for _ in range(30)])
+    assert time.monotonic() - start >= 0.45
+
+
+def test_token_bucket_charges_requests_larger_than_capacity():
+    bucket = TokenBucket(60_000)
+    assert bucket.wait_time(5000) == 0
+    bucket.take(5000)
+    # A second's worth of tokens is available, so the debt takes 4s to repay, then 1s to refill
+    assert bucket.wait_time(5000) == pytest.approx(5.0)
+
+
+def test_run_sync_retries():
+    limiter = RateLimiter(backoff=0.001)
+    failures = 2
+
+    def call() -> str:
+        nonlocal failures
+        if failures:
+            failures -= 1
+            raise FakeRateLimitError()
+        return "ok"
+
+    assert limiter.run_sync(call) == "ok"
+    assert limiter.rate_limited == 2
@@ -75,3 +75,39 @@ def test_questions_sync(mock_data):
     results = hypellm.recipes.questions_sync(mock_data)
     assert isinstance(results, dict)
     assert all(len(questions) == len(mock_data) for questions in results.values())
+
+
+@pytest.mark.asyncio
+async def test_reasoned_stream(mock_data):
+    results = [r async for r in hypellm.recipes.reasoned_stream(iter(mock_data))]
+    assert len(results) == len(mock_data)
+    assert all(r.reasoning == ["step 1", "step 2", "step 3"] for r in results)
+
+
+@pytest.mark.asyncio
+async def test_inverted_stream(mock_data):
+    results = [r async for r in hypellm.recipes.inverted_stream(mock_data)]
+    assert len(results) == len(mock_data)
+    assert {(r.inputs, r.outputs) for r in results} == {(d.outputs, d.inputs) for d in mock_data}
+
+
+@pytest.mark.asyncio
+async def test_questions_stream(mock_data):
+    async def data():
+        for d in mock_data:
+            yield d
+
+    results = [r async for r in hypellm.recipes.questions_stream(data())]
+    assert len(results) == len(mock_data)
+    assert {datum for _, datum in results} == set(mock_data)
+    assert all(len(qs) == 3 for qs, _ in results)
+
+
+@pytest.mark.asyncio
+async def test_inverted_from_store(mock_data, tmp_path):
+    store = hypellm.ExampleStore.write(tmp_path / "data.jsonl", mock_data)
+    prompt, results = await hypellm.recipes.inverted(store)
+    assert len(results) == len(mock_data)
+    assert all(
+        r.inputs == mock.outputs and r.outputs == mock.inputs for r, mock in zip(results, mock_data)
+    )
@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = {"dspy", "instructor", "litellm", "numpy", "tqdm"}
+COLD_IMPORT_BUDGET_US = 1_500_000
+
+
+def import_times(module: str) -> dict[str, int]:
+    """Cumulative import time in microseconds of every module imported by `import module`."""
+    env = {k: v for k, v in os.environ.items() if not k.startswith("HYPELLM_")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("module", ["hypellm", "hypellm.recipes"])
+def test_cold_import(module):
+    times = import_times(module)
+    assert not HEAVY_MODULES & {name.split(".")[0] for name in times}
+    assert times[module.split(".")[0]] < COLD_IMPORT_BUDGET_US
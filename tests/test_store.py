@@ -0,0 +1,85 @@
+import os
+import pickle
+
+import pytest
+
+from hypellm.helpers import amap, pmap
+from hypellm.store import ExampleStore, SequenceView
+from hypellm.types import Example
+
+examples = [Example(inputs=f"Q{i}", outputs=f"A{i}") for i in range(10)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ExampleStore.write(tmp_path / "examples.jsonl", examples)
+    yield store
+    store.close()
+
+
+def test_random_access(store):
+    assert len(store) == 10
+    assert store[3] == examples[3]
+    assert store[-1] == examples[-1]
+    assert store[2:8:3] == examples[2:8:3]
+    assert list(store) == examples
+    with pytest.raises(IndexError):
+        store[10]
+
+
+def test_index_is_cached_and_invalidated(tmp_path, store):
+    index_path = tmp_path / "examples.jsonl.idx"
+    assert index_path.exists()
+    assert ExampleStore(store.path)[5] == examples[5]
+
+    with store.path.open("a") as f:
+        f.write("\n" + Example(inputs="new", outputs="line").json())
+    os.utime(store.path, ns=(0, 0))
+    reopened = ExampleStore(store.path)
+    assert len(reopened) == 11
+    assert reopened[10].inputs == "new"
+
+
+def test_index_falls_back_when_directory_is_read_only(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    path = tmp_path / "examples.jsonl"
+    path.write_text("".join(example.json() + "\n" for example in examples))
+    # The sidecar cannot be written, as it would be in a read-only directory
+    (tmp_path / "examples.jsonl.idx").mkdir()
+
+    store = ExampleStore(path)
+    assert store[4] == examples[4]
+    assert store.index_path.is_relative_to(tmp_path / "cache")
+    assert ExampleStore(path).index_path == store.index_path
+
+    # Without a writable cache directory either, the index is only kept in memory
+    monkeypatch.setenv("XDG_CACHE_HOME", str(path))
+    assert list(ExampleStore(path)) == examples
+
+
+def test_pickles_by_path(store):
+    assert list(pickle.loads(pickle.dumps(store))) == examples
+
+
+def test_empty_store(tmp_path):
+    assert len(ExampleStore.write(tmp_path / "empty.jsonl", [])) == 0
+
+
+def test_sequence_view(store):
+    view = SequenceView(store, [1, 4, 7], lambda datum: datum.outputs)
+    assert len(view) == 3
+    assert view[1] == "A4"
+    assert view[1:] == ["A4", "A7"]
+    assert list(view) == ["A1", "A4", "A7"]
+
+
+@pytest.mark.asyncio
+async def test_amap(store):
+    async def count(batch: list[Example]) -> int:
+        return len(batch)
+
+    assert await amap(count, store, batch_size=4) == [4, 4, 2]
+
+
+def test_pmap(store):
+    assert pmap(len, store, batch_size=4) == [4, 4, 2]
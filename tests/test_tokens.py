@@ -0,0 +1,52 @@
+import pytest
+
+from hypellm import Example, tokens
+from hypellm.store import SequenceView
+from hypellm.tokens import apacked, count_tokens, fits, pack
+
+
+def test_pack_is_best_fit_decreasing():
+    sizes = [6, 5, 4, 3, 2, 1]
+    batches = pack(sizes, budget=7)
+    assert batches == [[0, 5], [1, 4], [2, 3]]
+    assert all(sum(sizes[i] for i in batch) <= 7 for batch in batches)
+
+
+def test_pack_limits_items_and_isolates_oversized_items():
+    assert pack([1, 1, 1, 1, 1], budget=10, max_items=2) == [[0, 1], [2, 3], [4]]
+    assert pack([20, 1, 1], budget=10) == [[0], [1, 2]]
+
+
+def test_fits_takes_at_least_two():
+    assert fits([1, 2, 3, 4], 6, size=lambda x: x) == 3
+    assert fits([9, 9, 9], 6, size=lambda x: x) == 2
+    assert fits([1], 6, size=lambda x: x) == 1
+
+
+def test_pluggable_tokenizer():
+    example = Example(inputs="a b c", outputs="d")
+    assert count_tokens(example) == len(example.json()) // 4 + 1
+
+    tokens.use_tokenizer(lambda text: len(text.split()))
+    try:
+        assert count_tokens("one two three") == 3
+    finally:
+        tokens.use_tokenizer(None)
+    assert count_tokens("one two three") == 4
+
+
+@pytest.mark.asyncio
+async def test_apacked_streams_in_order():
+    async def stream():
+        for size in [3, 3, 3, 8, 1]:
+            yield size
+
+    batches = [batch async for batch in apacked(stream(), 7, size=lambda x: x)]
+    assert batches == [[3, 3], [3], [8], [1]]
+
+    packed = [batch async for batch in apacked([3, 3, 3, 8, 1], 7, size=lambda x: x)]
+    assert packed == [[3, 3, 1], [3], [8]]
+
+    # Lazy sequences, such as stores, are streamed rather than sized up front
+    view = SequenceView([3, 3, 3, 8, 1])
+    assert [batch async for batch in apacked(view, 7, size=lambda x: x)] == batches
@@ -92,3 +92,28 @@ def test_invalid_types():
             reasoning_or_outputs="not a list",  # type: ignore
             outputs_or_none="test",
         )
+
+
+def test_json_is_cached_per_instance():
+    datum = Example(inputs="test", outputs="test")
+    assert datum.json() is datum.json()
+    assert datum.json(exclude_none=False) == '{"inputs":"test","reasoning":null,"outputs":"test"}'
+
+    updated = datum.update(reasoning=["step"])
+    assert updated.json() == '{"inputs":"test","reasoning":["step"],"outputs":"test"}'
+    assert datum.json() == '{"inputs":"test","outputs":"test"}'
+    assert updated == Example(inputs="test", reasoning=["step"], outputs="test")
+
+
+def test_from_records():
+    records = [{"inputs": "a", "outputs": "b"}, {"inputs": {"k": "v"}, "outputs": "c"}]
+    assert Example.from_records(records) == [Example("a", "b"), Example({"k": "v"}, "c")]
+
+    with pytest.raises(ValueError):
+        Example.from_records([{"inputs": "a"}])
+
+
+def test_trusted():
+    datum = Example.trusted(inputs="a", outputs="b")
+    assert datum == Example("a", "b")
+    assert datum.reasoning is None